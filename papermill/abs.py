@@ -6,6 +6,9 @@ import re
 from azure.identity import EnvironmentCredential
 from azure.storage.blob import BlobServiceClient
 
+from .models import FileEntry
+from .utils import glob_regex, split_glob
+
 
 class AzureBlobStore:
     """
@@ -16,7 +19,9 @@ class AzureBlobStore:
     The following are wrapped utilities for Azure storage:
         - read
         - listdir
+        - glob
         - write
+        - delete
     """
 
     def _blob_service_client(self, account_name, sas_token=None):
@@ -62,9 +67,44 @@ class AzureBlobStore:
         container_client = blob_service_client.get_container_client(params["container"])
         return list(container_client.list_blobs(params["blob"]))
 
+    def glob(self, url):
+        """Returns the FileEntry of each blob matching the glob pattern of a url
+
+        The SAS token of the url is kept on the paths of the entries, so ``?``
+        is not a wildcard in blob patterns.
+        """
+        params = self._split_url(url)
+        prefix, recursive = split_glob(params["blob"])
+        matches = glob_regex(params["blob"]).match
+        blob_service_client = self._blob_service_client(params["account"], params["sas_token"])
+        container_client = blob_service_client.get_container_client(params["container"])
+        if recursive:
+            blobs = container_client.list_blobs(name_starts_with=prefix)
+        else:
+            # Blob prefixes, the virtual directories, are skipped by the delimiter
+            blobs = container_client.walk_blobs(name_starts_with=prefix, delimiter='/')
+        base_url = f"abs://{params['account']}.blob.core.windows.net/{params['container']}/"
+        query = f"?{params['sas_token']}" if params["sas_token"] else ""
+        return sorted(
+            FileEntry(
+                f"{base_url}{blob.name}{query}",
+                blob.size,
+                blob.last_modified.timestamp() if blob.last_modified else None,
+                blob.etag.strip('"') if blob.etag else None,
+            )
+            for blob in blobs
+            if hasattr(blob, 'size') and matches(blob.name)
+        )
+
     def write(self, buf, url):
         """Write buffer to storage at a given url"""
         params = self._split_url(url)
         blob_service_client = self._blob_service_client(params["account"], params["sas_token"])
         blob_client = blob_service_client.get_blob_client(params['container'], params['blob'])
         blob_client.upload_blob(data=buf, overwrite=True)
+
+    def delete(self, url):
+        """Delete the blob at a given url"""
+        params = self._split_url(url)
+        blob_service_client = self._blob_service_client(params["account"], params["sas_token"])
+        blob_service_client.get_blob_client(params['container'], params['blob']).delete_blob()
@@ -4,6 +4,9 @@ import re
 
 from azure.datalake.store import core, lib
 
+from .models import FileEntry
+from .utils import glob_regex, split_glob
+
 
 class ADL:
     """
@@ -14,6 +17,7 @@ class ADL:
     The following are wrapped utilities for Azure storage:
     - read
     - listdir
+    - glob
     - write
     """
 
@@ -42,6 +46,28 @@ class ADL:
         adapter = self._create_adapter(store_name)
         return [f"adl://{store_name}.azuredatalakestore.net/{path_to_child}" for path_to_child in adapter.ls(path)]
 
+    def glob(self, url):
+        """Returns the FileEntry of each file matching the glob pattern of a url"""
+        (store_name, pattern) = self._split_url(url)
+        prefix, recursive = split_glob(pattern)
+        directory = prefix.rpartition('/')[0]
+        matches = glob_regex(pattern.lstrip('/')).match
+        adapter = self._create_adapter(store_name)
+        if recursive:
+            files = adapter.walk(directory, details=True)
+        else:
+            files = [f for f in adapter.ls(directory, detail=True) if f['type'] == 'FILE']
+        return sorted(
+            FileEntry(
+                f"adl://{store_name}.azuredatalakestore.net/{f['name']}",
+                f.get('length'),
+                f['modificationTime'] / 1000 if f.get('modificationTime') else None,
+                None,
+            )
+            for f in files
+            if matches(f['name'].lstrip('/'))
+        )
+
     def read(self, url):
         """Read storage at a given url"""
         (store_name, path) = self._split_url(url)
@@ -58,3 +84,8 @@ class ADL:
         adapter = self._create_adapter(store_name)
         with adapter.open(path, 'wb') as f:
             f.write(buf.encode())
+
+    def delete(self, url):
+        """Delete the file at a given url"""
+        (store_name, path) = self._split_url(url)
+        self._create_adapter(store_name).rm(path)
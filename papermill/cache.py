@@ -0,0 +1,328 @@
+"""Caches of executed notebooks and cells keyed by their sources, parameters and kernel."""
+
+import hashlib
+import json
+import time
+
+from .iorw import load_notebook_node, papermill_io, write_ipynb
+from .log import logger
+
+
+class NotebookCache:
+    """Store of executed notebooks reused by identical runs.
+
+    Executed notebooks are stored under `cache_dir` through `papermill_io`, so
+    any io handler (local, S3, GCS, ...) can back a cache shared by several
+    machines. An ``index.json`` file next to them records when each entry was
+    created and last used. The index is updated with a read-modify-write, so
+    concurrent writers can lose each other's updates; the worst outcome is an
+    extra execution or a late eviction.
+
+    Parameters
+    ----------
+    cache_dir : str
+        Location of the cache, for example ``s3://bucket/papermill-cache``
+    ttl : float, optional
+        Age in seconds after which entries are no longer used (default: never expire)
+    max_size : int, optional
+        Total size in bytes of the cached notebooks, least recently used entries
+        are evicted beyond it (default: unbounded)
+    """
+
+    INDEX_NAME = 'index.json'
+
+    def __init__(self, cache_dir, ttl=None, max_size=None):
+        self.cache_dir = str(cache_dir).rstrip('/')
+        self.ttl = ttl
+        self.max_size = max_size
+
+    def __repr__(self):
+        return f"NotebookCache({self.cache_dir!r}, ttl={self.ttl!r}, max_size={self.max_size!r})"
+
+    @staticmethod
+    def key(nb, parameters=None, kernel_name=None, engine_name=None, cwd=None):
+        """Digest identifying the result of executing a prepared notebook.
+
+        Parameters
+        ----------
+        nb : NotebookNode
+            The parameterized notebook, before execution
+        parameters : dict, optional
+            Parameters of the run, the volatile ``pm`` builtins are ignored
+        kernel_name : str, optional
+            Name of the kernel executing the notebook
+        engine_name : str, optional
+            Name of the engine executing the notebook
+        cwd : str, optional
+            Working directory of the execution
+
+        Returns
+        -------
+        str
+            Hex sha256 digest
+        """
+        digest = hashlib.sha256()
+        for cell in nb.cells:
+            digest.update(cell.cell_type.encode('utf-8'))
+            digest.update(b'\0')
+            digest.update(cell.source.encode('utf-8'))
+            digest.update(b'\0')
+        parameters = {name: value for name, value in (parameters or {}).items() if name != 'pm'}
+        digest.update(
+            json.dumps(
+                {
+                    'parameters': parameters,
+                    'kernel_name': kernel_name,
+                    'kernelspec': nb.metadata.get('kernelspec', {}),
+                    'engine_name': engine_name,
+                    'cwd': cwd,
+                },
+                sort_keys=True,
+                default=str,
+            ).encode('utf-8')
+        )
+        return digest.hexdigest()
+
+    @property
+    def index_path(self):
+        return f"{self.cache_dir}/{self.INDEX_NAME}"
+
+    def entry_path(self, key):
+        return f"{self.cache_dir}/{key}.ipynb"
+
+    def load_index(self):
+        try:
+            return json.loads(papermill_io.read(self.index_path, extensions=None))
+        except Exception as e:
+            # Missing or unreadable indexes behave like an empty cache
+            logger.debug(f"Could not read notebook cache index {self.index_path}: {e}")
+            return {}
+
+    def save_index(self, index):
+        papermill_io.write(json.dumps(index, indent=1, sort_keys=True), self.index_path, extensions=None)
+
+    def _expired(self, entry, now):
+        return self.ttl is not None and now - entry['created'] > self.ttl
+
+    def _delete(self, path):
+        # Only handlers able to delete files reclaim space, others just drop the index entry
+        delete = getattr(papermill_io.get_handler(path), 'delete', None)
+        if delete is not None:
+            try:
+                delete(path)
+            except OSError as e:
+                logger.debug(f"Could not delete cached notebook {path}: {e}")
+
+    def evict(self, index, now=None):
+        """Drop expired entries, then the least recently used ones beyond `max_size`.
+
+        Parameters
+        ----------
+        index : dict
+            Cache index, modified in place
+        now : float, optional
+            Current time as a timestamp
+
+        Returns
+        -------
+        list of str
+            Keys of the evicted entries
+        """
+        now = time.time() if now is None else now
+        evicted = [key for key, entry in index.items() if self._expired(entry, now)]
+        if self.max_size is not None:
+            remaining = sorted(
+                (key for key in index if key not in evicted), key=lambda key: index[key]['last_used'], reverse=True
+            )
+            total = 0
+            for key in remaining:
+                total += index[key]['size']
+                if total > self.max_size:
+                    evicted.append(key)
+        for key in evicted:
+            del index[key]
+            self._delete(self.entry_path(key))
+        return evicted
+
+    def get(self, key):
+        """Return the cached notebook for `key`, or None on a miss."""
+        index = self.load_index()
+        entry = index.get(key)
+        now = time.time()
+        if entry is None or self._expired(entry, now):
+            logger.info("Notebook cache miss")
+            return None
+        try:
+            nb = load_notebook_node(self.entry_path(key))
+        except Exception as e:
+            logger.warning(f"Could not read cached notebook {self.entry_path(key)}: {e}")
+            return None
+        entry['last_used'] = now
+        self.save_index(index)
+        logger.info(f"Notebook cache hit: {self.entry_path(key)}")
+        return nb
+
+    def put(self, key, nb):
+        """Store an executed notebook under `key` and evict entries beyond the limits."""
+        makedirs = getattr(papermill_io.get_handler(self.cache_dir), 'makedirs', None)
+        if makedirs is not None:
+            makedirs(self.cache_dir)
+        size = write_ipynb(nb, self.entry_path(key))
+        now = time.time()
+        index = self.load_index()
+        index[key] = {'created': now, 'last_used': now, 'size': size}
+        self.evict(index, now)
+        self.save_index(index)
+
+
+# Cells opting in to the cell-level cache
+CELL_CACHE_TAG = 'cache'
+
+# Defines `_papermill_cell_cache` in python kernels to snapshot and restore the
+# user namespace after a cell. The whole namespace is snapshotted, as a cell can
+# mutate objects bound by earlier cells. Modules are restored by re-importing them.
+CELL_CACHE_KERNEL_HELPER = '''
+class _PapermillCellCache:
+    ignored = ('In', 'Out', 'exit', 'quit', 'get_ipython')
+
+    def __init__(self):
+        # Set up before the first cell, anything bound by then comes with the kernel, like ipykernel's `open`
+        self.initial = dict(globals())
+
+    def names(self):
+        return [
+            name
+            for name, value in globals().items()
+            if not name.startswith('_') and name not in self.ignored and self.initial.get(name, self) is not value
+        ]
+
+    def snapshot(self):
+        import base64, pickle, types
+
+        values, modules = {}, {}
+        for name in self.names():
+            value = globals()[name]
+            if isinstance(value, types.ModuleType):
+                modules[name] = value.__name__
+            else:
+                values[name] = value
+        try:
+            # Pickled at once to keep objects shared by several names shared
+            data = pickle.dumps((values, modules))
+        except Exception:
+            data = None
+        if data is None:
+            # Raised outside of the except block, IPython can't format chained errors of user expressions
+            name = next((name for name, value in values.items() if not self.picklable(value)), None)
+            raise TypeError(f"{name!r} can't be pickled")
+        return base64.b64encode(data).decode('ascii')
+
+    def picklable(self, value):
+        import pickle
+
+        try:
+            pickle.dumps(value)
+        except Exception:
+            return False
+        return True
+
+    def restore(self, data):
+        import base64, importlib, pickle
+
+        values, modules = pickle.loads(base64.b64decode(data))
+        values.update({name: importlib.import_module(module) for name, module in modules.items()})
+        for name in self.names():
+            if name not in values:
+                del globals()[name]
+        globals().update(values)
+
+
+_papermill_cell_cache = _PapermillCellCache()
+'''
+
+
+class CellCache:
+    """Store of the outputs and variables of individual cells.
+
+    Code cells tagged ``cache`` are keyed by a digest of their source chained
+    with the sources of every code cell before them, the parameters and the
+    kernel name. When a key is found the cell's outputs are restored and the
+    kernel namespace is replaced by the one snapshotted after the cell instead
+    of executing it, so an unchanged prefix of expensive cells is skipped while
+    iterating on the end of a notebook.
+
+    The whole namespace is pickled in the kernel, which limits the cache to
+    python kernels and captures objects mutated by the cell as well as the
+    names it binds. Cells executed while any variable can't be pickled are not
+    cached. Snapshots are unpickled into the kernel, so only use cache
+    directories you trust.
+
+    Parameters
+    ----------
+    cache_dir : str
+        Location of the cache, any path supported by `papermill_io`
+    """
+
+    def __init__(self, cache_dir):
+        self.cache_dir = str(cache_dir).rstrip('/')
+
+    def __repr__(self):
+        return f"CellCache({self.cache_dir!r})"
+
+    @staticmethod
+    def cell_keys(nb, kernel_name=None):
+        """Chained keys of the cells opting in to the cache.
+
+        Parameters
+        ----------
+        nb : NotebookNode
+            The parameterized notebook
+        kernel_name : str, optional
+            Name of the kernel executing the notebook
+
+        Returns
+        -------
+        dict
+            Key of each cell tagged ``cache``, by cell index
+        """
+        parameters = nb.metadata.get('papermill', {}).get('parameters', {})
+        seed = json.dumps(
+            {
+                'parameters': {name: value for name, value in parameters.items() if name != 'pm'},
+                'kernel_name': kernel_name,
+            },
+            sort_keys=True,
+            default=str,
+        )
+        key = hashlib.sha256(seed.encode('utf-8')).hexdigest()
+        keys = {}
+        for index, cell in enumerate(nb.cells):
+            if cell.cell_type != 'code':
+                continue
+            key = hashlib.sha256(f"{key}\0{cell.source}".encode()).hexdigest()
+            if CELL_CACHE_TAG in cell.metadata.get('tags', []):
+                keys[index] = key
+        return keys
+
+    def entry_path(self, key):
+        return f"{self.cache_dir}/{key}.json"
+
+    def get(self, key):
+        """Return the cached entry for `key`, or None on a miss.
+
+        Entries are dictionaries with the cell ``outputs``, its
+        ``execution_count`` and the base64 ``snapshot`` of its variables.
+        """
+        try:
+            return json.loads(papermill_io.read(self.entry_path(key), extensions=None))
+        except Exception as e:
+            logger.debug(f"Cell cache miss for {self.entry_path(key)}: {e}")
+            return None
+
+    def put(self, key, cell, snapshot):
+        """Store the outputs of an executed cell and the snapshot of its variables."""
+        makedirs = getattr(papermill_io.get_handler(self.cache_dir), 'makedirs', None)
+        if makedirs is not None:
+            makedirs(self.cache_dir)
+        entry = {'outputs': cell.outputs, 'execution_count': cell.execution_count, 'snapshot': snapshot}
+        papermill_io.write(json.dumps(entry), self.entry_path(key), extensions=None)
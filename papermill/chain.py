@@ -0,0 +1,144 @@
+"""Execute a sequence of notebooks in a single kernel session."""
+
+from jupyter_client import AsyncKernelManager
+from nbclient.util import run_sync
+
+from .engines import papermill_engines
+from .exceptions import PapermillException
+from .execute import execute_notebook
+from .iorw import load_notebook_node
+from .log import logger
+
+# Deletes the user variables of a python kernel, except the names in `keep`
+CLEAR_NAMESPACE_CODE = '''
+def _papermill_clear_namespace(keep):
+    import gc
+
+    shell = globals().get('get_ipython', lambda: None)()
+    hidden = set(getattr(shell, 'user_ns_hidden', ()))
+    for name in list(globals()):
+        if not name.startswith('_') and name not in keep and name not in hidden:
+            del globals()[name]
+    gc.collect()
+
+
+_papermill_clear_namespace({keep!r})
+del _papermill_clear_namespace
+'''
+
+
+def clear_namespace(km, keep=(), timeout=60):
+    """Delete the variables of the kernel managed by `km`, except the names in `keep`.
+
+    Parameters
+    ----------
+    km : KernelManager
+        Manager of a running python kernel
+    keep : iterable of str, optional
+        Names of the variables to keep
+    timeout : int, optional
+        Duration in seconds to wait for the kernel
+    """
+    kc = km.blocking_client()
+    kc.start_channels()
+    try:
+        kc.wait_for_ready(timeout=timeout)
+        reply = kc.execute_interactive(
+            CLEAR_NAMESPACE_CODE.format(keep=sorted(set(keep))), silent=True, store_history=False, timeout=timeout
+        )
+    finally:
+        kc.stop_channels()
+    if reply['content']['status'] != 'ok':
+        raise PapermillException(f"Could not clear the kernel namespace: {reply['content'].get('evalue')}")
+
+
+def execute_notebook_chain(
+    notebooks,
+    kernel_name=None,
+    clear_namespace_between=False,
+    engine_name=None,
+    start_timeout=60,
+    **execute_kwargs,
+):
+    """Execute notebooks one after the other in the same kernel.
+
+    Objects created by a notebook stay in memory for the notebooks after it,
+    so large intermediate results don't have to be written to disk and read
+    back. Each notebook is parameterized and saved to its own output notebook
+    as with `execute_notebook`.
+
+    Parameters
+    ----------
+    notebooks : list of dict
+        The notebooks to execute in order, with their ``input_path``,
+        ``output_path`` and optional ``parameters``. ``exports`` lists the
+        names a notebook hands over to the next ones when
+        `clear_namespace_between` is set
+    kernel_name : str, optional
+        Name of the kernel shared by the notebooks (default: the kernel of the
+        first notebook)
+    clear_namespace_between : bool, optional
+        Delete every variable not exported by a previous notebook before
+        executing the next one (python kernels only)
+    engine_name : str, optional
+        Name of the execution engine, which must run the notebooks with the
+        kernel manager passed as ``km`` like the default nbclient engine
+    start_timeout : int, optional
+        Duration in seconds to wait for kernel start-up
+    **execute_kwargs
+        Keyword arguments passed to `execute_notebook` for every notebook.
+        A ``cwd`` applies to the kernel when it starts with the first notebook.
+
+    Returns
+    -------
+    list of NotebookNode
+        The executed notebooks
+
+    Raises
+    ------
+    PapermillExecutionError
+        If a notebook fails, the notebooks after it are not executed
+    """
+    if not notebooks:
+        return []
+    if execute_kwargs.get('cache') is not None:
+        # A cached notebook would not leave its objects in the kernel for the next ones
+        raise PapermillException("Chained notebooks can't be restored from a notebook cache")
+    for notebook in notebooks:
+        missing = [key for key in ('input_path', 'output_path') if key not in notebook]
+        if missing:
+            raise PapermillException(f"Chained notebook is missing {', '.join(missing)}")
+
+    first_nb = load_notebook_node(notebooks[0]['input_path'])
+    kernel_name = papermill_engines.nb_kernel_name(engine_name=engine_name, nb=first_nb, name=kernel_name)
+    if clear_namespace_between:
+        language = papermill_engines.nb_language(engine_name=engine_name, nb=first_nb)
+        if language != 'python':
+            raise PapermillException(f"Clearing the namespace between notebooks isn't supported for '{language}'")
+
+    km = AsyncKernelManager(kernel_name=kernel_name)
+    exported = set()
+    executed = []
+    try:
+        for index, notebook in enumerate(notebooks):
+            if index and clear_namespace_between:
+                clear_namespace(km, keep=exported, timeout=start_timeout)
+            logger.info(f"Executing chained notebook {index + 1}/{len(notebooks)}")
+            executed.append(
+                execute_notebook(
+                    notebook['input_path'],
+                    notebook['output_path'],
+                    notebook.get('parameters'),
+                    engine_name=engine_name,
+                    kernel_name=kernel_name,
+                    start_timeout=start_timeout,
+                    km=km,
+                    **execute_kwargs,
+                )
+            )
+            exported.update(notebook.get('exports', ()))
+    finally:
+        if km.has_kernel:
+            run_sync(km.shutdown_kernel)()
+        run_sync(km.cleanup_resources)()
+    return executed
@@ -0,0 +1,252 @@
+"""Checkpoints of the kernel namespace for resuming interrupted executions."""
+
+import ast
+import hashlib
+import json
+
+import entrypoints
+
+from .exceptions import PapermillException
+from .iorw import load_notebook_node, papermill_io
+from .log import logger
+from .utils import ERROR_MARKER_TAG
+
+# Cells after which the kernel namespace is checkpointed
+CHECKPOINT_TAG = 'checkpoint'
+
+
+class PapermillCheckpointers:
+    '''
+    The holder which houses any checkpointer registered with the system.
+    This object is used in a singleton manner to save and load particular
+    named Checkpointer objects for reference externally.
+    '''
+
+    def __init__(self):
+        self._checkpointers = {}
+
+    def register(self, language, checkpointer):
+        self._checkpointers[language] = checkpointer
+
+    def register_entry_points(self):
+        """Register entrypoints for a checkpointer
+
+        Load checkpointers provided by other packages
+        """
+        for entrypoint in entrypoints.get_group_all("papermill.checkpointer"):
+            self.register(entrypoint.name, entrypoint.load())
+
+    def find_checkpointer(self, kernel_name, language):
+        if kernel_name in self._checkpointers:
+            return self._checkpointers[kernel_name]
+        elif language in self._checkpointers:
+            return self._checkpointers[language]
+        raise PapermillException(
+            f"No namespace checkpointer specified for kernel '{kernel_name}' or language '{language}'"
+        )
+
+
+class Checkpointer:
+    """Kernel code saving and restoring the namespace of a language.
+
+    `setup_code` runs once in the kernel before saving or restoring,
+    `save_expression` is evaluated as a user expression whose ``text/plain``
+    representation is parsed by `parse_state`, and `restore_code` loads a
+    parsed state back into a fresh kernel.
+    """
+
+    setup_code = None
+
+    @classmethod
+    def save_expression(cls):
+        raise NotImplementedError('save_expression not implemented for {}'.format(cls))
+
+    @classmethod
+    def parse_state(cls, text):
+        raise NotImplementedError('parse_state not implemented for {}'.format(cls))
+
+    @classmethod
+    def restore_code(cls, state):
+        raise NotImplementedError('restore_code not implemented for {}'.format(cls))
+
+
+class PythonCheckpointer(Checkpointer):
+    """Pickles the user namespace, with dill when the kernel has it installed.
+
+    Modules are restored by importing them again. Values which can't be
+    pickled are left out of the checkpoint and reported as skipped.
+    """
+
+    setup_code = '''
+def _papermill_save_namespace():
+    import base64, types
+
+    try:
+        import dill as serializer
+    except ImportError:
+        import pickle as serializer
+
+    # Names IPython defines in the namespace at startup
+    shell = globals().get('get_ipython', lambda: None)()
+    ignored = set(getattr(shell, 'user_ns_hidden', ())) | {'In', 'Out', 'exit', 'quit', 'get_ipython'}
+    values, modules, skipped = {}, {}, []
+    for name, value in list(globals().items()):
+        if name.startswith('_') or name in ignored:
+            continue
+        if isinstance(value, types.ModuleType):
+            modules[name] = value.__name__
+        else:
+            values[name] = value
+    try:
+        data = serializer.dumps((values, modules))
+    except Exception:
+        for name in list(values):
+            try:
+                serializer.dumps(values[name])
+            except Exception:
+                skipped.append(name)
+                del values[name]
+        data = serializer.dumps((values, modules))
+    return {'serializer': serializer.__name__, 'data': base64.b64encode(data).decode('ascii'), 'skipped': skipped}
+
+
+def _papermill_restore_namespace(serializer, data):
+    import base64, importlib
+
+    values, modules = importlib.import_module(serializer).loads(base64.b64decode(data))
+    values.update({name: importlib.import_module(module) for name, module in modules.items()})
+    globals().update(values)
+'''
+
+    @classmethod
+    def save_expression(cls):
+        return '_papermill_save_namespace()'
+
+    @classmethod
+    def parse_state(cls, text):
+        return ast.literal_eval(text)
+
+    @classmethod
+    def restore_code(cls, state):
+        return f"_papermill_restore_namespace({state['serializer']!r}, {state['data']!r})"
+
+
+def checkpoint_path(output_path):
+    """Location of the checkpoint of the notebook executed into `output_path`."""
+    return f"{output_path}.checkpoint"
+
+
+def prefix_digest(nb, cell_index):
+    """Digest of the parameters and the cell sources up to and including `cell_index`."""
+    parameters = nb.metadata.get('papermill', {}).get('parameters', {})
+    digest = hashlib.sha256(
+        json.dumps(
+            {name: value for name, value in parameters.items() if name != 'pm'}, sort_keys=True, default=str
+        ).encode('utf-8')
+    )
+    for cell in nb.cells[: cell_index + 1]:
+        digest.update(f"\0{cell.cell_type}\0{cell.source}".encode())
+    return digest.hexdigest()
+
+
+def write_checkpoint(path, nb, cell_index, language, state):
+    """Write the namespace state saved after `cell_index` executed.
+
+    Returns
+    -------
+    int
+        Number of bytes written
+    """
+    content = json.dumps(
+        {'cell_index': cell_index, 'digest': prefix_digest(nb, cell_index), 'language': language, 'state': state}
+    )
+    papermill_io.write(content, path, extensions=None)
+    return len(content)
+
+
+def read_checkpoint(path):
+    """Read a checkpoint, returning None if there is none at `path`."""
+    try:
+        return json.loads(papermill_io.read(path, extensions=None))
+    except FileNotFoundError:
+        return None
+
+
+def resume_notebook(nb, partial_nb, checkpoint):
+    """Copy the executed prefix of a partial output notebook into `nb`.
+
+    Parameters
+    ----------
+    nb : NotebookNode
+        The parameterized notebook about to be executed
+    partial_nb : NotebookNode
+        The output notebook saved by the interrupted execution
+    checkpoint : dict
+        The checkpoint read with `read_checkpoint`
+
+    Returns
+    -------
+    bool
+        Whether the notebook can resume from the checkpoint. It can't if the
+        parameters or the sources of the checkpointed cells changed.
+    """
+    cell_index = checkpoint['cell_index']
+    if (
+        cell_index >= len(nb.cells)
+        or cell_index >= len(partial_nb.cells)
+        or checkpoint['digest'] != prefix_digest(nb, cell_index)
+        or checkpoint['digest'] != prefix_digest(partial_nb, cell_index)
+    ):
+        logger.warning("The notebook or its parameters changed since the checkpoint was saved, running all cells")
+        return False
+
+    for cell, partial_cell in zip(nb.cells[: cell_index + 1], partial_nb.cells):
+        cell.metadata.papermill = partial_cell.metadata.get('papermill', {})
+        if cell.cell_type == 'code':
+            cell.outputs = partial_cell.outputs
+            cell.execution_count = partial_cell.execution_count
+    if 'results' in partial_nb.metadata.get('papermill', {}):
+        nb.metadata.papermill['results'] = partial_nb.metadata.papermill['results']
+    logger.info(f"Resuming execution after cell {cell_index} from the checkpoint")
+    return True
+
+
+def load_resume_checkpoint(nb, output_path):
+    """Prepare `nb` to resume the interrupted execution saved at `output_path`.
+
+    Returns
+    -------
+    dict or None
+        The checkpoint to resume from, or None if all cells must run
+    """
+    checkpoint = read_checkpoint(checkpoint_path(output_path))
+    if checkpoint is None:
+        logger.info("No checkpoint to resume from, running all cells")
+        return None
+    try:
+        partial_nb = load_notebook_node(output_path, validate=False)
+    except FileNotFoundError:
+        logger.warning(f"Found a checkpoint but no output notebook at {output_path}, running all cells")
+        return None
+    # The error markers of a failed execution shift the cells of the partial notebook
+    partial_nb.cells = [cell for cell in partial_nb.cells if ERROR_MARKER_TAG not in cell.metadata.get('tags', [])]
+    return checkpoint if resume_notebook(nb, partial_nb, checkpoint) else None
+
+
+def remove_checkpoint(output_path):
+    """Delete the checkpoint of a completed execution, if its io handler can delete files.
+
+    Every built-in handler can, except those of http(s) and GitHub paths.
+    """
+    path = checkpoint_path(output_path)
+    if hasattr(papermill_io.get_handler(path), 'delete'):
+        try:
+            papermill_io.delete(path)
+        except FileNotFoundError:
+            pass
+
+
+# Instantiate a PapermillCheckpointers instance, register checkpointers and entrypoints
+papermill_checkpointers = PapermillCheckpointers()
+papermill_checkpointers.register("python", PythonCheckpointer)
+papermill_checkpointers.register_entry_points()
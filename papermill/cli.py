@@ -12,10 +12,12 @@ import click
 import nbclient
 import yaml
 
+from .cache import CellCache, NotebookCache
 from .execute import execute_notebook
 from .inspection import display_notebook_help
-from .iorw import NoDatesSafeLoader, read_yaml_file
+from .iorw import VALIDATE_FIRST_AND_LAST, VALIDATION_POLICIES, NoDatesSafeLoader, read_yaml_file
 from .version import version as papermill_version
+from .workqueue import Worker
 
 click.disable_unicode_literals_warning = True
 
@@ -94,7 +96,27 @@ def print_papermill_version(ctx, param, value):
     help='Language for notebook execution. Ignores language in the notebook document metadata.',
 )
 @click.option('--cwd', default=None, help='Working directory to run notebook in.')
+@click.option(
+    '--prestart-kernel/--no-prestart-kernel',
+    default=False,
+    help="Start the kernel while the input notebook is loaded and parameterized.",
+)
 @click.option('--progress-bar/--no-progress-bar', default=None, help="Flag for turning on the progress bar.")
+@click.option(
+    '--progress-bar-style',
+    default='tqdm',
+    help="Progress bar to show: 'tqdm' or the lightweight 'terminal' bar.",
+)
+@click.option(
+    '--progress-stream',
+    help="File descriptor or path to write execution events to as JSON lines, with the cell index, status and ETA.",
+)
+@click.option(
+    '--status-heartbeat',
+    type=float,
+    help="Seconds between updates of <output>.status.json, a small status document for monitoring (0: cell "
+    "boundaries only).",
+)
 @click.option(
     '--log-output/--no-log-output',
     default=False,
@@ -128,7 +150,55 @@ def print_papermill_version(ctx, param, value):
     type=int,
     help="Time in seconds to wait for each cell before failing execution (default: forever)",
 )
+@click.option(
+    '--execution-deadline',
+    type=float,
+    help="Time in seconds the whole notebook may run before the kernel is interrupted and the remaining cells are "
+    "skipped (default: forever)",
+)
+@click.option(
+    '--resource-sample-interval',
+    type=float,
+    help="Seconds between samples of the kernel's memory, CPU time and open files, recorded per cell "
+    "(requires psutil).",
+)
 @click.option('--report-mode/--no-report-mode', default=False, help="Flag for hiding input.")
+@click.option(
+    '--offload-threshold',
+    type=int,
+    help="Size in bytes above which display outputs are stored next to the output notebook instead of inline.",
+)
+@click.option(
+    '--validation-policy',
+    type=click.Choice(VALIDATION_POLICIES),
+    default=VALIDATE_FIRST_AND_LAST,
+    help="When to validate the notebook against the nbformat schema.",
+)
+@click.option(
+    '--results-path',
+    help="Local CSV, Parquet or SQLite table to append the parameters and recorded results of the run to.",
+)
+@click.option(
+    '--cache-dir',
+    help="Location of a cache of executed notebooks reused by runs with the same sources, parameters and kernel.",
+)
+@click.option('--cache-ttl', type=float, help="Age in seconds after which cached notebooks are not reused.")
+@click.option(
+    '--cache-max-size', type=int, help="Size in bytes beyond which least recently used cache entries are evicted."
+)
+@click.option(
+    '--cell-cache-dir',
+    help="Location of a cache restoring the outputs and variables of unchanged cells tagged 'cache'.",
+)
+@click.option(
+    '--history-path',
+    help="Local SQLite index of cell durations, recorded after the run and used to estimate the time remaining.",
+)
+@click.option(
+    '--resume/--no-resume',
+    default=False,
+    help="Resume an interrupted execution into OUTPUT_PATH after its last completed cell tagged 'checkpoint'.",
+)
 @click.option(
     '--version',
     is_flag=True,
@@ -157,12 +227,27 @@ def papermill(
     kernel,
     language,
     cwd,
+    prestart_kernel,
     progress_bar,
+    progress_bar_style,
+    progress_stream,
+    status_heartbeat,
     log_output,
     log_level,
     start_timeout,
     execution_timeout,
+    execution_deadline,
+    resource_sample_interval,
     report_mode,
+    offload_threshold,
+    validation_policy,
+    results_path,
+    cache_dir,
+    cache_ttl,
+    cache_max_size,
+    cell_cache_dir,
+    history_path,
+    resume,
     stdout_file,
     stderr_file,
 ):
@@ -209,6 +294,12 @@ def papermill(
     elif progress_bar is None:
         progress_bar = not log_output
 
+    if progress_bar and progress_bar_style != 'tqdm':
+        progress_bar = progress_bar_style
+    if progress_stream is not None and progress_stream.isdigit():
+        # A file descriptor inherited from the orchestrator
+        progress_stream = int(progress_stream)
+
     logging.basicConfig(level=log_level, format="%(message)s")
 
     # Read in Parameters
@@ -231,6 +322,12 @@ def papermill(
     if help_notebook:
         sys.exit(display_notebook_help(click_ctx, notebook_path, parameters_final))
 
+    cache = None
+    if cache_dir:
+        cache = NotebookCache(cache_dir, ttl=cache_ttl, max_size=cache_max_size)
+    elif cache_ttl is not None or cache_max_size is not None:
+        raise click.UsageError("--cache-ttl and --cache-max-size require --cache-dir")
+
     try:
         execute_notebook(
             input_path=input_path,
@@ -249,7 +346,19 @@ def papermill(
             start_timeout=start_timeout,
             report_mode=report_mode,
             cwd=cwd,
+            prestart_kernel=prestart_kernel,
             execution_timeout=execution_timeout,
+            execution_deadline=execution_deadline,
+            resource_sample_interval=resource_sample_interval,
+            offload_threshold=offload_threshold,
+            validation_policy=validation_policy,
+            results_path=results_path,
+            cache=cache,
+            cell_cache=CellCache(cell_cache_dir) if cell_cache_dir else None,
+            resume=resume,
+            history=history_path,
+            progress_stream=progress_stream,
+            status_heartbeat=status_heartbeat,
         )
     except nbclient.exceptions.DeadKernelError:
         # Exiting with a special exit code for dead kernels
@@ -257,6 +366,40 @@ def papermill(
         sys.exit(138)
 
 
+@click.command(context_settings=dict(help_option_names=['-h', '--help']))
+@click.argument('queue_url')
+@click.option('--worker-id', help='Name of the worker recorded on its jobs (default: host name and process id).')
+@click.option('--poll-interval', type=float, default=1.0, help='Seconds to wait before polling an empty queue again.')
+@click.option('--max-jobs', type=int, help='Stop after running this many jobs.')
+@click.option('--idle-timeout', type=float, help='Stop once the queue stayed empty for this many seconds.')
+@click.option(
+    '--requeue-stale',
+    type=float,
+    help='At startup, queue again the jobs running for more than this many seconds, left by a worker which died.',
+)
+@click.option(
+    '--log-level',
+    type=click.Choice(['NOTSET', 'DEBUG', 'INFO', 'WARNING', 'ERROR', 'CRITICAL']),
+    default='INFO',
+    help='Set log level',
+)
+def worker(queue_url, worker_id, poll_interval, max_jobs, idle_timeout, requeue_stale, log_level):
+    """Run the notebook executions queued at QUEUE_URL.
+
+    Jobs are enqueued with `papermill.workqueue.enqueue_notebook`, for example
+    into `sqlite:///shared/queue.db`, and any number of workers can process
+    the same queue. Each worker reports its throughput and the time jobs
+    waited in the queue.
+    """
+    if 'PYDEVD_DISABLE_FILE_VALIDATION' not in os.environ:
+        os.environ['PYDEVD_DISABLE_FILE_VALIDATION'] = '1'
+    logging.basicConfig(level=log_level, format="%(message)s")
+    stats = Worker(queue_url, worker_id=worker_id, poll_interval=poll_interval, requeue_stale=requeue_stale).run(
+        max_jobs=max_jobs, idle_timeout=idle_timeout
+    )
+    sys.exit(1 if stats.failed else 0)
+
+
 def _resolve_type(value):
     if value == "True":
         return True
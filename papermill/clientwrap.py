@@ -1,9 +1,20 @@
+import ast
 import asyncio
 import sys
+from time import monotonic
 
+import nbformat
 from nbclient import NotebookClient
-from nbclient.exceptions import CellExecutionError
-from traitlets import Bool, Instance
+from nbclient.exceptions import CellExecutionError, CellTimeoutError
+from nbclient.util import ensure_async
+from traitlets import Bool, Float, Instance
+
+from .cache import CELL_CACHE_KERNEL_HELPER
+from .checkpoint import CHECKPOINT_TAG, papermill_checkpointers
+from .exceptions import PapermillDeadlineExceeded, PapermillException
+from .resources import ResourceSampler, kernel_pid
+from .results import extract_results
+from .utils import cell_timeout
 
 
 class PapermillNotebookClient(NotebookClient):
@@ -15,6 +26,16 @@ class PapermillNotebookClient(NotebookClient):
     log_output = Bool(False).tag(config=True)
     stdout_file = Instance(object, default_value=None).tag(config=True)
     stderr_file = Instance(object, default_value=None).tag(config=True)
+    resource_sample_interval = Float(
+        None,
+        allow_none=True,
+        help="Seconds between samples of the kernel's memory, CPU time and open files while cells run (default: off)",
+    ).tag(config=True)
+    execution_deadline = Float(
+        None,
+        allow_none=True,
+        help="Seconds the whole notebook may run, including the kernel start, before the kernel is interrupted",
+    ).tag(config=True)
 
     def __init__(self, nb_man, km=None, raise_on_iopub_timeout=True, **kw):
         """Initializes the execution manager.
@@ -29,12 +50,19 @@ class PapermillNotebookClient(NotebookClient):
         """
         super().__init__(nb_man.nb, km=km, raise_on_iopub_timeout=raise_on_iopub_timeout, **kw)
         self.nb_man = nb_man
+        self._checkpointer = None
+        self._resource_sampler = None
+        self._deadline = None
+        self._deadline_limited = False
+        self._deadline_exceeded = False
 
     def execute(self, **kwargs):
         """
         Wraps the parent class process call slightly
         """
         self.reset_execution_trackers()
+        if self.execution_deadline is not None:
+            self._deadline = monotonic() + self.execution_deadline
 
         # See https://bugs.python.org/issue37373 :(
         if sys.version_info[0] == 3 and sys.version_info[1] >= 8 and sys.platform.startswith('win'):
@@ -42,11 +70,20 @@ class PapermillNotebookClient(NotebookClient):
 
         with self.setup_kernel(**kwargs):
             self.log.info(f"Executing notebook with kernel: {self.kernel_name}")
-            self.papermill_execute_cells()
+            self.start_resource_sampler()
+            try:
+                self.papermill_execute_cells()
+            finally:
+                self.stop_resource_sampler()
             info_msg = self.wait_for_reply(self.kc.kernel_info())
             self.nb.metadata['language_info'] = info_msg['content']['language_info']
             self.set_widgets_metadata()
 
+        if not self.owns_km and self.kc is not None:
+            # The kernel of a caller's manager keeps running, only close the channels opened for this notebook
+            self.kc.stop_channels()
+            self.kc = None
+
         return self.nb
 
     def papermill_execute_cells(self):
@@ -60,21 +97,236 @@ class PapermillNotebookClient(NotebookClient):
            traceback even though a `CellExecutionError` was encountered.
 
         2. We want to write the notebook as cells are executed. We inject our
-           logic for that here.
+           logic for that here. Markdown, raw, empty and skipped cells don't
+           reach the kernel, so they are marked completed without saving.
 
         3. We want to include timing and execution status information with the
            metadata of each cell.
+
+        4. Cells opting in to the cell cache are restored instead of executed
+           when their chained key is found.
+
+        5. The kernel namespace is checkpointed after cells tagged
+           ``checkpoint``, and execution resumes after the restored cells of
+           a checkpoint.
+
+        6. Cells can override the execution timeout, and the kernel is
+           interrupted when the notebook's execution deadline runs out.
         """
-        # Execute each cell and update the output in real time.
+        for cell in self.nb.cells:
+            # Fail before executing anything rather than on reaching a cell with an invalid timeout
+            cell_timeout(cell)
+        # Set up before restoring a checkpoint, so the cell cache snapshots its variables too
+        cell_keys = self.cell_cache_keys()
+        resume_index = self.restore_checkpoint()
+
+        # Execute each cell and update the output in real time. Cells which never reach the
+        # kernel are marked completed in batches instead of being saved one by one.
+        skipped_cells = []
         for index, cell in enumerate(self.nb.cells):
+            if index < resume_index:
+                continue
+            if not self.is_executable_cell(cell):
+                # Still let nbclient run its hooks for the cell
+                self.execute_cell(cell, index)
+                skipped_cells.append(cell)
+                continue
+            if skipped_cells:
+                self.nb_man.mark_cells_completed(skipped_cells)
+                skipped_cells = []
+            if self._deadline is not None and monotonic() >= self._deadline:
+                self.stop_at_deadline(index)
             try:
                 self.nb_man.cell_start(cell, index)
-                self.execute_cell(cell, index)
+                if self._resource_sampler is not None:
+                    self._resource_sampler.cell_start()
+                if index in cell_keys:
+                    self.execute_cached_cell(cell, index, cell_keys[index])
+                else:
+                    self.execute_cell(cell, index)
             except CellExecutionError as ex:
                 self.nb_man.cell_exception(self.nb.cells[index], cell_index=index, exception=ex)
                 break
+            except CellTimeoutError as ex:
+                # The kernel didn't go idle after the deadline interrupt, the cell is failed all the same
+                if not self._deadline_exceeded:
+                    raise
+                self.nb_man.cell_exception(self.nb.cells[index], cell_index=index, exception=ex)
+                break
             finally:
+                if self._resource_sampler is not None:
+                    self.nb.cells[index].metadata.papermill['resources'] = self._resource_sampler.cell_complete()
                 self.nb_man.cell_complete(self.nb.cells[index], cell_index=index)
+            if CHECKPOINT_TAG in cell.metadata.get('tags', []):
+                self.save_checkpoint(index)
+        else:
+            self.nb_man.mark_cells_completed(skipped_cells)
+        if self._deadline_exceeded:
+            self.stop_at_deadline(index + 1)
+
+    def _get_timeout(self, cell):
+        """Timeout of a cell: its own override or the execution timeout, cut short by the deadline."""
+        if cell is None:
+            return super()._get_timeout(cell)
+        timeout = cell_timeout(cell)
+        if timeout is None:
+            timeout = super()._get_timeout(cell)
+        elif timeout <= 0:
+            timeout = None
+        self._deadline_limited = False
+        if self._deadline is not None:
+            remaining = max(self._deadline - monotonic(), 0.0)
+            if timeout is None or remaining < timeout:
+                timeout = remaining
+                self._deadline_limited = True
+        return timeout
+
+    async def _async_handle_timeout(self, timeout, cell=None):
+        if not self._deadline_limited:
+            return await super()._async_handle_timeout(timeout, cell)
+        self.log.error(f"Execution deadline of {self.execution_deadline}s exceeded, interrupting the kernel")
+        self._deadline_exceeded = True
+        await ensure_async(self.km.interrupt_kernel())
+        # Reply in place of the interrupted execution, failing the cell
+        return {
+            "content": {
+                "status": "error",
+                "ename": "DeadlineExceeded",
+                "evalue": f"Execution deadline of {self.execution_deadline}s exceeded",
+                "traceback": [],
+            }
+        }
+
+    def stop_at_deadline(self, cell_index):
+        """Mark the cells from `cell_index` on as skipped and stop the execution."""
+        self._deadline_exceeded = True
+        self.nb_man.deadline_exceeded(cell_index)
+        raise PapermillDeadlineExceeded(self.execution_deadline, cell_index)
+
+    def start_resource_sampler(self):
+        """Start sampling the kernel's process tree, if a sample interval is set and the kernel runs locally."""
+        if self.resource_sample_interval is None:
+            return
+        pid = kernel_pid(self.km)
+        if pid is None:
+            self.log.warning("Not sampling resources, the kernel does not run in a local process")
+            return
+        self._resource_sampler = ResourceSampler(pid, self.resource_sample_interval)
+        self._resource_sampler.start()
+
+    def stop_resource_sampler(self):
+        """Stop sampling and record the notebook's resource totals."""
+        if self._resource_sampler is None:
+            return
+        self._resource_sampler.stop()
+        self.nb.metadata.papermill['resources'] = dict(
+            self._resource_sampler.totals, sample_interval=self.resource_sample_interval
+        )
+        self._resource_sampler = None
+
+    def is_executable_cell(self, cell):
+        """Whether the cell is sent to the kernel, mirroring the checks of `execute_cell`."""
+        return (
+            cell.cell_type == "code"
+            and bool(cell.source.strip())
+            and self.skip_cells_with_tag not in cell.metadata.get("tags", [])
+        )
+
+    def cell_cache_keys(self):
+        """Keys of the cells to look up in the manager's cell cache, by cell index."""
+        cell_cache = getattr(self.nb_man, 'cell_cache', None)
+        if cell_cache is None:
+            return {}
+        language = self.nb.metadata.get('kernelspec', {}).get('language')
+        if language != 'python':
+            self.log.warning(f"The cell cache only supports python kernels, not '{language}'")
+            return {}
+        cell_keys = {
+            index: key
+            for index, key in cell_cache.cell_keys(self.nb, self.kernel_name).items()
+            if self.is_executable_cell(self.nb.cells[index])
+        }
+        if cell_keys:
+            reply = self.execute_silently(CELL_CACHE_KERNEL_HELPER)
+            if reply['status'] != 'ok':
+                self.log.warning("Could not set up the cell cache in the kernel")
+                return {}
+        return cell_keys
+
+    def execute_silently(self, code, user_expressions=None):
+        """Run code in the kernel without recording it in the notebook, returning the reply content."""
+        msg_id = self.kc.execute(code, silent=True, store_history=False, user_expressions=user_expressions or {})
+        return self.wait_for_reply(msg_id)['content']
+
+    def execute_cached_cell(self, cell, cell_index, key):
+        """Restore a cell from the cell cache, or execute it and store its outputs and the kernel namespace."""
+        cell_cache = self.nb_man.cell_cache
+        entry = cell_cache.get(key)
+        if entry is not None:
+            reply = self.execute_silently(f"_papermill_cell_cache.restore({entry['snapshot']!r})")
+            if reply['status'] == 'ok':
+                cell.outputs = [nbformat.from_dict(output) for output in entry['outputs']]
+                cell.execution_count = entry['execution_count']
+                for output in cell.outputs:
+                    for name, value in extract_results(output, cell, cell_index):
+                        self.nb_man.record_result(name, value)
+                self.nb_man.cell_cached(cell, cell_index, hit=True)
+                return
+            self.log.warning(f"Could not restore cell {cell_index} from the cell cache: {reply.get('evalue')}")
+
+        self.nb_man.cell_cached(cell, cell_index, hit=False)
+        self.execute_cell(cell, cell_index)
+
+        snapshot = self.execute_silently('', user_expressions={'snapshot': '_papermill_cell_cache.snapshot()'})
+        result = snapshot['user_expressions']['snapshot']
+        if result['status'] != 'ok':
+            self.log.warning(
+                f"Not caching cell {cell_index}, the kernel namespace can't be pickled: {result.get('evalue')}"
+            )
+            return
+        cell_cache.put(key, cell, ast.literal_eval(result['data']['text/plain']))
+
+    def find_checkpointer(self):
+        """The checkpointer of the kernel's language, set up in the kernel on first use."""
+        if self._checkpointer is None:
+            language = self.nb.metadata.get('kernelspec', {}).get('language')
+            checkpointer = papermill_checkpointers.find_checkpointer(self.kernel_name, language)
+            if checkpointer.setup_code:
+                reply = self.execute_silently(checkpointer.setup_code)
+                if reply['status'] != 'ok':
+                    raise PapermillException(f"Could not set up namespace checkpoints: {reply.get('evalue')}")
+            self._checkpointer = checkpointer
+        return self._checkpointer
+
+    def restore_checkpoint(self):
+        """Load the namespace of the manager's resume checkpoint, returning the index of the next cell to run."""
+        checkpoint = getattr(self.nb_man, 'resume_checkpoint', None)
+        if not checkpoint:
+            return 0
+        reply = self.execute_silently(self.find_checkpointer().restore_code(checkpoint['state']))
+        if reply['status'] != 'ok':
+            raise PapermillException(f"Could not restore the checkpointed namespace: {reply.get('evalue')}")
+        return self.nb_man.resume_index
+
+    def save_checkpoint(self, cell_index):
+        """Save the kernel namespace after a cell tagged ``checkpoint`` completed."""
+        if not getattr(self.nb_man, 'checkpoint_path', None) or self.nb_man.execution_error is not None:
+            return
+        try:
+            checkpointer = self.find_checkpointer()
+        except PapermillException as e:
+            self.log.warning(f"Not saving a checkpoint after cell {cell_index}: {e}")
+            return
+        reply = self.execute_silently('', user_expressions={'state': checkpointer.save_expression()})
+        result = reply['user_expressions']['state']
+        if result['status'] != 'ok':
+            self.log.warning(f"Could not save a checkpoint after cell {cell_index}: {result.get('evalue')}")
+            return
+        state = checkpointer.parse_state(result['data']['text/plain'])
+        if state.get('skipped'):
+            self.log.warning(f"Variables left out of the checkpoint: {', '.join(state['skipped'])}")
+        language = self.nb.metadata.get('kernelspec', {}).get('language')
+        self.nb_man.save_checkpoint(cell_index, language, state)
 
     def log_output_message(self, output):
         """
@@ -102,8 +354,11 @@ class PapermillNotebookClient(NotebookClient):
         elif self.log_output and ("data" in output and "text/plain" in output.data):
             self.log.info("".join(output.data['text/plain']))
 
-    def process_message(self, *arg, **kwargs):
-        output = super().process_message(*arg, **kwargs)
+    def process_message(self, msg, cell, cell_index):
+        output = super().process_message(msg, cell, cell_index)
+        if output:
+            for name, value in extract_results(output, cell, cell_index):
+                self.nb_man.record_result(name, value)
         self.nb_man.autosave_cell()
         if output and (self.log_output or self.stderr_file or self.stdout_file):
             self.log_output_message(output)
@@ -2,16 +2,22 @@
 
 import datetime
 import sys
+import threading
 from functools import wraps
 
 import dateutil
 import entrypoints
+from jupyter_client import AsyncKernelManager
 
+from .checkpoint import checkpoint_path, write_checkpoint
 from .clientwrap import PapermillNotebookClient
-from .exceptions import PapermillException
-from .iorw import write_ipynb
+from .exceptions import PapermillException, missing_dependency_generator
+from .iorw import VALIDATE_ALWAYS, VALIDATE_FIRST_AND_LAST, VALIDATE_NEVER, write_ipynb
 from .log import logger
-from .utils import merge_kwargs, nb_kernel_name, nb_language, remove_args
+from .offload import offload_outputs
+from .progress import papermill_progress_bars, tqdm_progress_bar
+from .status import StatusHeartbeat, status_path, write_status
+from .utils import add_error_markers, find_cell_error, merge_kwargs, nb_kernel_name, nb_language, remove_args
 
 
 class PapermillEngines:
@@ -56,6 +62,18 @@ class PapermillEngines:
         """Fetch language from the document by dropping-down into the provided engine."""
         return self.get_engine(engine_name).nb_language(nb, language)
 
+    def kernel_manager(self, engine_name, kernel_name):
+        """Create a kernel manager to start ahead of the execution by dropping-down into the provided engine."""
+        return self.get_engine(engine_name).kernel_manager(kernel_name)
+
+    def saves_output(self, engine_name):
+        """Whether the provided engine writes the final notebook to the output path it executes with."""
+        return self.get_engine(engine_name).saves_output()
+
+    def supports_cwd(self, engine_name):
+        """Whether the provided engine accepts a `cwd` to start its kernel in."""
+        return self.get_engine(engine_name).supports_cwd()
+
 
 def catch_nb_assignment(func):
     """
@@ -74,6 +92,10 @@ def catch_nb_assignment(func):
         if nb:
             # Reassign if executing notebook object was replaced
             self.nb = nb
+        if nb or func.__name__ not in ('save', 'notebook_complete'):
+            # Callbacks other than saves update the notebook. The completion only finalizes
+            # the notebook its final save writes, unless nothing changed since a previous one.
+            self.generation += 1
         return func(self, *args, **kwargs)
 
     return wrapper
@@ -95,11 +117,51 @@ class NotebookExecutionManager:
     RUNNING = "running"
     COMPLETED = "completed"
     FAILED = "failed"
+    SKIPPED = "skipped"
 
-    def __init__(self, nb, output_path=None, log_output=False, progress_bar=True, autosave_cell_every=30):
+    def __init__(
+        self,
+        nb,
+        output_path=None,
+        log_output=False,
+        progress_bar=True,
+        autosave_cell_every=30,
+        offload_threshold=None,
+        validation_policy=VALIDATE_FIRST_AND_LAST,
+        error_markers=False,
+        cell_cache=None,
+        resume_checkpoint=None,
+        history=None,
+        progress_stream=None,
+        status_heartbeat=None,
+    ):
         self.nb = nb
         self.output_path = output_path
         self.log_output = log_output
+        self.offload_threshold = offload_threshold
+        self.validation_policy = validation_policy
+        self.error_markers = error_markers
+        self.cell_cache = cell_cache
+        self.cell_cache_hits = 0
+        self.resume_checkpoint = resume_checkpoint
+        self.history = history
+        # Expected seconds of each cell from previous runs, the progress bar then counts seconds
+        self.cell_estimates = history.cell_estimates(nb) if history is not None else None
+        self.progress_stream = progress_stream
+        self.cell_descriptions = {}
+        # Seconds between updates of the status sidecar while a cell runs, None disables the sidecar
+        self.status_heartbeat = status_heartbeat
+        self.status_path = status_path(output_path) if output_path and status_heartbeat is not None else None
+        self.current_cell_index = None
+        self._status_lock = threading.Lock()
+        self._heartbeat = None
+        self.execution_error = None
+        self.bytes_written = 0
+        self.saves_avoided = 0
+        # Changes to the notebook, a final save is skipped if nothing changed since the last one
+        self.generation = 0
+        self.saved_generation = None
+        self.offloaded_paths = set()
         self.start_time = None
         self.end_time = None
         self.autosave_cell_every = autosave_cell_every
@@ -107,20 +169,36 @@ class NotebookExecutionManager:
         self.last_save_time = self.now()  # Not exactly true, but simplifies testing logic
         self.pbar = None
         if progress_bar:
-            # lazy import due to implicit slow ipython import
-            from tqdm.auto import tqdm
-
+            if self.cell_estimates is not None:
+                _progress_bar = {
+                    "unit": "s",
+                    "desc": "Executing",
+                    "total": round(sum(filter(None, self.cell_estimates)), 2),
+                }
+            else:
+                _progress_bar = {"unit": "cell", "desc": "Executing", "total": len(self.nb.cells)}
             if isinstance(progress_bar, bool):
-                self.pbar = tqdm(total=len(self.nb.cells), unit="cell", desc="Executing")
+                self.pbar = papermill_progress_bars.get_progress_bar("tqdm")(**_progress_bar)
+            elif isinstance(progress_bar, str):
+                self.pbar = papermill_progress_bars.get_progress_bar(progress_bar)(**_progress_bar)
             elif isinstance(progress_bar, dict):
-                _progress_bar = {"unit": "cell", "desc": "Executing"}
                 _progress_bar.update(progress_bar)
-                self.pbar = tqdm(total=len(self.nb.cells), **_progress_bar)
+                self.pbar = tqdm_progress_bar(**_progress_bar)
             else:
                 raise TypeError(
-                    f"progress_bar must be instance of bool or dict, but actual type '{type(progress_bar)}'."
+                    f"progress_bar must be instance of bool, str or dict, but actual type '{type(progress_bar)}'."
                 )
 
+    @property
+    def checkpoint_path(self):
+        """Location of the namespace checkpoints, next to the output notebook."""
+        return checkpoint_path(self.output_path) if self.output_path else None
+
+    @property
+    def resume_index(self):
+        """Index of the first cell to execute, after the cells restored from a checkpoint."""
+        return self.resume_checkpoint['cell_index'] + 1 if self.resume_checkpoint else 0
+
     def now(self):
         """Helper to return current UTC time"""
         return datetime.datetime.now(datetime.timezone.utc)
@@ -136,7 +214,7 @@ class NotebookExecutionManager:
         self.end_time = None
 
     @catch_nb_assignment
-    def save(self, **kwargs):
+    def save(self, final=False, **kwargs):
         """
         Saves the wrapped notebook state.
 
@@ -148,9 +226,28 @@ class NotebookExecutionManager:
 
         For example, you may want to save the notebook every 10 minutes when running
         a 5 hour cell execution to capture output messages in the notebook.
+
+        If an offload threshold is set, large display outputs are moved out of
+        the notebook before it is written so saves only rewrite small JSON.
+
+        Intermediate saves are written as compact JSON and are only validated
+        under the 'always' validation policy. Pass `final=True` to write the
+        indented document, validated unless the policy is 'never'. A final
+        save of a notebook unchanged since the previous final save is skipped.
         """
+        if final and self.saved_generation == self.generation:
+            logger.debug("Skipping final save of an unchanged notebook")
+            return
         if self.output_path:
-            write_ipynb(self.nb, self.output_path)
+            if self.offload_threshold is not None:
+                offload_outputs(self.nb, self.output_path, self.offload_threshold, written=self.offloaded_paths)
+            if final:
+                validate = self.validation_policy != VALIDATE_NEVER
+            else:
+                validate = self.validation_policy == VALIDATE_ALWAYS
+            self.bytes_written += write_ipynb(self.nb, self.output_path, compact=not final, validate=validate)
+            if final:
+                self.saved_generation = self.generation
         self.last_save_time = self.now()
 
     @catch_nb_assignment
@@ -182,18 +279,28 @@ class NotebookExecutionManager:
 
         When starting a notebook, this initializes and clears the metadata for
         the notebook and its cells, and saves the notebook to the given
-        output path.
+        output path. When resuming from a checkpoint, the cells restored from
+        the previous execution and its results are kept.
 
         Called by Engine when execution begins.
         """
         self.set_timer()
+        resume_index = self.resume_index
 
         self.nb.metadata.papermill['start_time'] = self.start_time.isoformat()
         self.nb.metadata.papermill['end_time'] = None
         self.nb.metadata.papermill['duration'] = None
         self.nb.metadata.papermill['exception'] = None
-
-        for cell in self.nb.cells:
+        self.nb.metadata.papermill.pop('exception_cell_index', None)
+        self.nb.metadata.papermill.pop('deadline_exceeded', None)
+        if resume_index:
+            self.nb.metadata.papermill['resumed_from'] = resume_index
+        else:
+            self.nb.metadata.papermill.pop('results', None)
+            self.nb.metadata.papermill.pop('resumed_from', None)
+        self.execution_error = None
+
+        for cell in self.nb.cells[resume_index:]:
             # Reset the cell execution counts.
             if cell.get("cell_type") == "code":
                 cell.execution_count = None
@@ -209,7 +316,21 @@ class NotebookExecutionManager:
             if cell.get("cell_type") == "code":
                 cell.outputs = []
 
+        if self.pbar:
+            # Parsed once rather than on every cell start
+            self.cell_descriptions = {
+                index: description
+                for index, cell in enumerate(self.nb.cells)
+                if (description := self.get_cell_description(cell)) is not None
+            }
+        if resume_index:
+            self.advance_pbar(range(resume_index))
         self.save()
+        self.emit_progress("notebook_start", next_index=resume_index)
+        self.update_status()
+        if self.status_path and self.status_heartbeat:
+            self._heartbeat = StatusHeartbeat(self.status_heartbeat, self.update_status)
+            self._heartbeat.start()
 
     @catch_nb_assignment
     def cell_start(self, cell, cell_index=None, **kwargs):
@@ -226,13 +347,20 @@ class NotebookExecutionManager:
         cell.metadata.papermill['start_time'] = self.now().isoformat()
         cell.metadata.papermill["status"] = self.RUNNING
         cell.metadata.papermill['exception'] = False
+        self.current_cell_index = cell_index
 
-        # injects optional description of the current cell directly in the tqdm
-        cell_description = self.get_cell_description(cell)
-        if cell_description is not None and hasattr(self, 'pbar') and self.pbar:
-            self.pbar.set_description(f"Executing {cell_description}")
+        # injects optional description of the current cell directly in the progress bar
+        if hasattr(self, 'pbar') and self.pbar:
+            if cell_index is not None:
+                cell_description = self.cell_descriptions.get(cell_index)
+            else:
+                cell_description = self.get_cell_description(cell)
+            if cell_description is not None:
+                self.pbar.set_description(f"Executing {cell_description}")
 
         self.save()
+        self.emit_progress("cell_start", cell_index=cell_index, status=self.RUNNING, next_index=cell_index)
+        self.update_status()
 
     @catch_nb_assignment
     def cell_exception(self, cell, cell_index=None, **kwargs):
@@ -270,10 +398,98 @@ class NotebookExecutionManager:
             cell.metadata.papermill['duration'] = (end_time - start_time).total_seconds()
         if cell.metadata.papermill['status'] != self.FAILED:
             cell.metadata.papermill['status'] = self.COMPLETED
+        if self.execution_error is None and cell_index is not None:
+            # Only the cell that just ran needs inspecting to find the first failure
+            self.execution_error = find_cell_error(cell, cell_index)
 
         self.save()
-        if self.pbar:
-            self.pbar.update(1)
+        self.advance_pbar([cell_index], durations=[cell.metadata.papermill.get('duration') or 0.0])
+        self.emit_progress(
+            "cell_complete",
+            cell_index=cell_index,
+            status=cell.metadata.papermill['status'],
+            next_index=cell_index + 1 if cell_index is not None else None,
+        )
+        self.update_status()
+
+    @catch_nb_assignment
+    def mark_cells_completed(self, cells, **kwargs):
+        """
+        Mark cells that were not executed by the kernel as completed.
+
+        Called by engines for markdown, raw and empty cells in place of the
+        `cell_start` and `cell_complete` callbacks, which would each save
+        the notebook.
+        """
+        if not cells:
+            return
+        now = self.now().isoformat()
+        for cell in cells:
+            cell.metadata.papermill['start_time'] = now
+            cell.metadata.papermill['end_time'] = now
+            cell.metadata.papermill['duration'] = 0.0
+            cell.metadata.papermill['exception'] = False
+            cell.metadata.papermill['status'] = self.COMPLETED
+        self.saves_avoided += 2 * len(cells)
+        if self.pbar and self.cell_estimates is None:
+            # Their expected duration is 0 when the progress bar counts seconds
+            self.pbar.update(len(cells))
+
+    @catch_nb_assignment
+    def deadline_exceeded(self, cell_index, **kwargs):
+        """
+        Record that the execution deadline ran out.
+
+        Called by engines when they stop executing a notebook because of its
+        execution deadline. The cells from `cell_index` on which did not run
+        are marked skipped, and the notebook is saved by `notebook_complete`.
+        """
+        self.nb.metadata.papermill['deadline_exceeded'] = True
+        self.nb.metadata.papermill['exception'] = True
+        for cell in self.nb.cells[cell_index:]:
+            if cell.metadata.papermill['status'] == self.PENDING:
+                cell.metadata.papermill['status'] = self.SKIPPED
+
+    @catch_nb_assignment
+    def record_result(self, name, value, **kwargs):
+        """
+        Record a named result produced by the notebook.
+
+        Called by engines when a cell records a value with
+        `papermill.results.record` or a cell tagged ``results`` produces an
+        execute result. Results are kept in the notebook metadata and saved
+        with the next save.
+        """
+        self.nb.metadata.papermill.setdefault('results', {})[name] = value
+
+    @catch_nb_assignment
+    def cell_cached(self, cell, cell_index=None, hit=False, **kwargs):
+        """
+        Record whether a cell opting in to the cell cache was restored.
+
+        Called by engines between `cell_start` and `cell_complete` for cells
+        tagged ``cache``. The outcome is kept in the cell's papermill metadata
+        as ``'hit'`` when the cell was restored from the cache or ``'miss'``
+        when it was executed.
+        """
+        cell.metadata.papermill['cache'] = 'hit' if hit else 'miss'
+        if hit:
+            self.cell_cache_hits += 1
+
+    @catch_nb_assignment
+    def save_checkpoint(self, cell_index, language, state, **kwargs):
+        """
+        Write a checkpoint of the kernel namespace.
+
+        Called by engines after a cell tagged ``checkpoint`` completed, with
+        the namespace state saved by the language's checkpointer. The
+        checkpoint is written next to the output notebook so an interrupted
+        execution can resume after the cell.
+        """
+        if not self.checkpoint_path:
+            return
+        self.bytes_written += write_checkpoint(self.checkpoint_path, self.nb, cell_index, language, state)
+        logger.info(f"Saved a checkpoint after cell {cell_index} to {self.checkpoint_path}")
 
     @catch_nb_assignment
     def notebook_complete(self, **kwargs):
@@ -281,8 +497,15 @@ class NotebookExecutionManager:
         Finalize the metadata for a notebook and save the notebook to
         the output path.
 
+        The index of the first failing cell and the bytes written by the
+        previous saves are recorded in the notebook metadata and, if
+        requested, the error markers are added before the final save.
+
         Called by Engine when execution concludes, regardless of exceptions.
         """
+        if self._heartbeat is not None:
+            self._heartbeat.stop()
+            self._heartbeat = None
         self.end_time = self.now()
         self.nb.metadata.papermill['end_time'] = self.end_time.isoformat()
         if self.nb.metadata.papermill.get('start_time'):
@@ -298,8 +521,36 @@ class NotebookExecutionManager:
         self.complete_pbar()
         self.cleanup_pbar()
 
+        if self.history is not None:
+            try:
+                self.history.record(self.nb, resumed_from=self.resume_index)
+            except Exception as e:
+                logger.warning(f"Could not record the cell durations in {self.history}: {e}")
+
+        if self.execution_error is not None:
+            self.nb.metadata.papermill['exception_cell_index'] = self.execution_error.cell_index
+            if self.error_markers and self.output_path:
+                # Include the error markers in the final save rather than rewriting the notebook afterwards
+                add_error_markers(self.nb, self.execution_error)
+        if self.output_path:
+            # Bytes written by the saves during execution, the final save is the output notebook itself
+            self.nb.metadata.papermill['bytes_written'] = self.bytes_written
+
+        if self.cell_cache_hits:
+            logger.info(f"Restored {self.cell_cache_hits} cells from the cell cache")
+        if self.saves_avoided:
+            logger.debug(f"Avoided {self.saves_avoided} saves for cells not executed by the kernel")
+
         # Force a final sync
-        self.save()
+        self.save(final=True)
+        self.emit_progress(
+            "notebook_complete",
+            status=self.FAILED if self.nb.metadata.papermill.get('exception') else self.COMPLETED,
+            next_index=len(self.nb.cells),
+        )
+        if self.progress_stream is not None:
+            self.progress_stream.close()
+        self.update_status()
 
     def get_cell_description(self, cell, escape_str="papermill_description="):
         """Fetches cell description if present"""
@@ -312,10 +563,102 @@ class NotebookExecutionManager:
 
         return cell_code.split(escape_str)[1].split()[0]
 
+    def eta(self, next_index):
+        """Seconds expected before the cells from `next_index` on are executed, None if unknown.
+
+        Uses the durations of previous runs when available, otherwise the
+        average duration of the cells executed so far.
+        """
+        if next_index is None or self.start_time is None:
+            return None
+        if self.cell_estimates is not None:
+            return round(sum(filter(None, self.cell_estimates[next_index:])), 3)
+        remaining = len(self.nb.cells) - next_index
+        executed = next_index - self.resume_index
+        if not remaining:
+            return 0.0
+        if executed <= 0:
+            return None
+        return round((self.now() - self.start_time).total_seconds() / executed * remaining, 3)
+
+    def emit_progress(self, event, cell_index=None, status=None, next_index=None):
+        """Write an execution event to the progress stream, if any."""
+        if self.progress_stream is None:
+            return
+        elapsed = (self.now() - self.start_time).total_seconds() if self.start_time else 0.0
+        try:
+            self.progress_stream.emit(
+                event,
+                notebook=self.nb.metadata.get('papermill', {}).get('input_path'),
+                cell_index=cell_index,
+                status=status,
+                total=len(self.nb.cells),
+                elapsed=round(elapsed, 3),
+                eta=self.eta(next_index),
+            )
+        except OSError as e:
+            # The stream is only informative, a closed pipe must not fail the execution
+            logger.warning(f"Could not write to the progress stream {self.progress_stream}, disabling it: {e}")
+            self.progress_stream = None
+
+    def update_status(self):
+        """Write the status sidecar next to the output notebook, if enabled.
+
+        Called at notebook and cell boundaries, and from the heartbeat thread
+        while cells run.
+        """
+        if not self.status_path:
+            return
+        metadata = self.nb.metadata.get('papermill', {})
+        if self.end_time is None:
+            status = self.RUNNING
+        else:
+            status = self.FAILED if metadata.get('exception') else self.COMPLETED
+        current_cell = self.nb.cells[self.current_cell_index] if self.current_cell_index is not None else None
+        with self._status_lock:
+            try:
+                write_status(
+                    self.status_path,
+                    {
+                        'status': status,
+                        'input_path': metadata.get('input_path'),
+                        'output_path': self.output_path,
+                        'current_cell': self.current_cell_index,
+                        'current_cell_status': current_cell.metadata.papermill.get('status') if current_cell else None,
+                        'total_cells': len(self.nb.cells),
+                        'start_time': self.start_time.isoformat() if self.start_time else None,
+                        'end_time': self.end_time.isoformat() if self.end_time else None,
+                        'updated_at': self.now().isoformat(),
+                        'exception': bool(metadata.get('exception')),
+                        'bytes_written': self.bytes_written,
+                    },
+                )
+            except Exception as e:
+                # The status is only informative, failing to write it must not fail the execution
+                logger.warning(f"Could not write the status to {self.status_path}: {e}")
+
+    def advance_pbar(self, cell_indices, durations=None):
+        """Advance the progress bar past completed cells.
+
+        The bar counts cells, or seconds when cell durations are estimated from
+        previous runs. The estimate of a completed cell is then replaced by its
+        actual duration, so the remaining time shown is the expected duration of
+        the remaining cells.
+        """
+        if not self.pbar:
+            return
+        if self.cell_estimates is None:
+            self.pbar.update(len(cell_indices))
+            return
+        estimated = [(self.cell_estimates[index] or 0.0) if index is not None else 0.0 for index in cell_indices]
+        durations = estimated if durations is None else durations
+        self.pbar.total = round(self.pbar.total + sum(durations) - sum(estimated), 2)
+        self.pbar.update(round(sum(durations), 2))
+
     def complete_pbar(self):
         """Refresh progress bar"""
         if hasattr(self, 'pbar') and self.pbar:
-            self.pbar.n = len(self.nb.cells)
+            self.pbar.n = self.pbar.total if self.cell_estimates is not None else len(self.nb.cells)
             self.pbar.refresh()
 
     def cleanup_pbar(self):
@@ -348,6 +691,14 @@ class Engine:
         progress_bar=True,
         log_output=False,
         autosave_cell_every=30,
+        offload_threshold=None,
+        validation_policy=VALIDATE_FIRST_AND_LAST,
+        error_markers=False,
+        cell_cache=None,
+        resume_checkpoint=None,
+        history=None,
+        progress_stream=None,
+        status_heartbeat=None,
         **kwargs,
     ):
         """
@@ -364,6 +715,14 @@ class Engine:
             progress_bar=progress_bar,
             log_output=log_output,
             autosave_cell_every=autosave_cell_every,
+            offload_threshold=offload_threshold,
+            validation_policy=validation_policy,
+            error_markers=error_markers,
+            cell_cache=cell_cache,
+            resume_checkpoint=resume_checkpoint,
+            history=history,
+            progress_stream=progress_stream,
+            status_heartbeat=status_heartbeat,
         )
 
         nb_man.notebook_start()
@@ -390,6 +749,29 @@ class Engine:
         """Use default implementation to fetch programming language from the notebook object"""
         return nb_language(nb, language)
 
+    @classmethod
+    def kernel_manager(cls, kernel_name):
+        """Kernel manager of a kernel started ahead of the execution and passed as `km`,
+        or None if the engine starts its own kernels."""
+        return None
+
+    @classmethod
+    def saves_output(cls):
+        """Whether `execute_notebook` writes the final notebook to its `output_path`.
+
+        The `NotebookExecutionManager` of `Engine.execute_notebook` does, engines
+        overriding `execute_notebook` are saved by papermill afterwards.
+        """
+        return cls.execute_notebook.__func__ is Engine.execute_notebook.__func__
+
+    @classmethod
+    def supports_cwd(cls):
+        """Whether `execute_notebook` accepts a `cwd` keyword argument to start the kernel in.
+
+        Engines which don't are executed with `cwd` as the process working directory.
+        """
+        return False
+
 
 class NBClientEngine(Engine):
     """
@@ -409,6 +791,7 @@ class NBClientEngine(Engine):
         stderr_file=None,
         start_timeout=60,
         execution_timeout=None,
+        cwd=None,
         **kwargs,
     ):
         """
@@ -421,6 +804,7 @@ class NBClientEngine(Engine):
                                configured logger.
             start_timeout (int): Duration to wait for kernel start-up.
             execution_timeout (int): Duration to wait before failing execution (default: never).
+            cwd (str): Working directory of the kernel (default: the notebook's metadata path).
         """
 
         # Exclude parameters that are unused downstream
@@ -440,11 +824,94 @@ class NBClientEngine(Engine):
             stdout_file=stdout_file,
             stderr_file=stderr_file,
         )
-        return PapermillNotebookClient(nb_man, **final_kwargs).execute()
+        if cwd is not None:
+            # nbclient starts the kernel in the path of the resources' metadata
+            resources = final_kwargs.get('resources') or {}
+            final_kwargs['resources'] = {**resources, 'metadata': {**resources.get('metadata', {}), 'path': cwd}}
+        return cls.notebook_client(nb_man, **final_kwargs).execute()
+
+    @classmethod
+    def supports_cwd(cls):
+        return True
+
+    @classmethod
+    def notebook_client(cls, nb_man, **kwargs):
+        """Create the nbclient client executing the notebook."""
+        return PapermillNotebookClient(nb_man, **kwargs)
+
+    @classmethod
+    def kernel_manager(cls, kernel_name):
+        return AsyncKernelManager(kernel_name=kernel_name)
+
+
+class GatewayEngine(NBClientEngine):
+    """
+    A notebook engine executing against the kernels of a remote Jupyter kernel gateway.
+
+    Kernels are started over the gateway's HTTP API and notebooks run over its
+    websocket, so kernels never run on the executing machine.
+    Python kernels are kept running after an execution and reused, with a
+    cleared namespace, by the next execution of the same kernelspec.
+    """
+
+    @classmethod
+    def execute_managed_notebook(
+        cls,
+        nb_man,
+        kernel_name,
+        gateway_url=None,
+        gateway_auth_token=None,
+        reuse_kernel=True,
+        **kwargs,
+    ):
+        """
+        Performs the actual execution of the parameterized notebook on a gateway kernel.
+
+        Args:
+            nb_man (NotebookExecutionManager): Wrapper for execution state of a notebook.
+            kernel_name (str): Name of kernel to execute the notebook against.
+            gateway_url (str): Base URL of the gateway (default: JUPYTER_GATEWAY_URL environment variable).
+            gateway_auth_token (str): Token of the gateway (default: JUPYTER_GATEWAY_AUTH_TOKEN environment variable).
+            reuse_kernel (bool): Flag for whether or not to run on a kernel kept from a previous execution.
+        """
+        if kwargs.get('km') is not None:
+            # The kernel is started on the gateway, a local kernel manager such as a chain's can't be used
+            raise PapermillException("The gateway engine manages its own kernels and doesn't accept a kernel manager")
+        try:
+            # jupyter_server is slow to import, it is only loaded once a notebook runs on a gateway
+            from .gateway import gateway_kernels
+        except ImportError:
+            missing_dependency_generator("jupyter_server", "gateway")()
+
+        # Only the namespace of python kernels can be cleared before a reuse
+        reuse_kernel = reuse_kernel and nb_language(nb_man.nb) == 'python'
+        km, reused = gateway_kernels.acquire(
+            kernel_name, url=gateway_url, auth_token=gateway_auth_token, reuse=reuse_kernel
+        )
+        completed = False
+        try:
+            nb = super().execute_managed_notebook(nb_man, kernel_name, km=km, reset_namespace=reused, **kwargs)
+            completed = True
+        finally:
+            # A kernel interrupted mid-execution may still be busy, don't hand it to another notebook
+            gateway_kernels.release(km, reuse=reuse_kernel and completed)
+        return nb
+
+    @classmethod
+    def notebook_client(cls, nb_man, **kwargs):
+        from .gateway import GatewayNotebookClient
+
+        return GatewayNotebookClient(nb_man, **kwargs)
+
+    @classmethod
+    def kernel_manager(cls, kernel_name):
+        # Gateway kernels come from the pool of kernels kept between executions
+        return None
 
 
 # Instantiate a PapermillEngines instance, register Handlers and entrypoints
 papermill_engines = PapermillEngines()
 papermill_engines.register(None, NBClientEngine)
 papermill_engines.register('nbclient', NBClientEngine)
+papermill_engines.register('gateway', GatewayEngine)
 papermill_engines.register_entry_points()
@@ -43,6 +43,15 @@ class PapermillExecutionError(PapermillException):
         return message
 
 
+class PapermillDeadlineExceeded(PapermillException):
+    """Raised when a notebook did not complete within its execution deadline."""
+
+    def __init__(self, deadline, cell_index):
+        self.deadline = deadline
+        self.cell_index = cell_index
+        super().__init__(f"Execution deadline of {deadline}s exceeded at cell {cell_index}")
+
+
 class PapermillRateLimitException(PapermillException):
     """Raised when an io request has been rate limited"""
 
@@ -80,7 +89,7 @@ def strip_color(text):
 
 
 def missing_dependency_generator(package, dep):
-    def missing_dep():
+    def missing_dep(*args, **kwargs):
         raise PapermillOptionalDependencyException(
             f"The {package} optional dependency is missing. "
             f"Please run pip install papermill[{dep}] to install this dependency"
@@ -90,7 +99,7 @@ def missing_dependency_generator(package, dep):
 
 
 def missing_environment_variable_generator(package, env_key):
-    def missing_dep():
+    def missing_dep(*args, **kwargs):
         raise PapermillOptionalDependencyException(
             f"The {package} optional dependency is present, but the environment "
             f"variable {env_key} is not set. Please set this variable as "
@@ -1,14 +1,36 @@
 from pathlib import Path
 
-import nbformat
-
+from .cache import CellCache, NotebookCache
+from .checkpoint import load_resume_checkpoint, remove_checkpoint
 from .engines import papermill_engines
-from .exceptions import PapermillExecutionError
+from .history import DurationHistory
 from .inspection import _infer_parameters
-from .iorw import get_pretty_path, load_notebook_node, local_file_io_cwd, write_ipynb
+from .iorw import (
+    VALIDATE_FIRST_AND_LAST,
+    VALIDATE_NEVER,
+    check_validation_policy,
+    get_pretty_path,
+    load_notebook_node,
+    local_file_io_cwd,
+    upgrade_notebook,
+    write_ipynb,
+)
 from .log import logger
+from .offload import offload_directory, offload_outputs
 from .parameterize import add_builtin_parameters, parameterize_notebook, parameterize_path
-from .utils import chdir
+from .prestart import KernelPrestart
+from .progress import ProgressStream
+from .results import append_results, get_results_writer
+from .utils import (
+    ERROR_ANCHOR_MSG,  # noqa: F401
+    ERROR_MARKER_TAG,
+    ERROR_MESSAGE_TEMPLATE,  # noqa: F401
+    ERROR_STYLE,  # noqa: F401
+    add_error_markers,
+    chdir,
+    find_cell_error,
+    has_error_markers,
+)
 
 
 def execute_notebook(
@@ -27,6 +49,16 @@ def execute_notebook(
     start_timeout=60,
     report_mode=False,
     cwd=None,
+    offload_threshold=None,
+    validation_policy=VALIDATE_FIRST_AND_LAST,
+    results_path=None,
+    cache=None,
+    cell_cache=None,
+    resume=False,
+    history=None,
+    progress_stream=None,
+    status_heartbeat=None,
+    prestart_kernel=False,
     **engine_kwargs,
 ):
     """Executes a single notebook locally.
@@ -51,8 +83,10 @@ def execute_notebook(
         Name of kernel to execute the notebook against
     language : str, optional
         Programming language of the notebook
-    progress_bar : bool, optional
-        Flag for whether or not to show the progress bar.
+    progress_bar : bool or str or dict, optional
+        Flag for whether or not to show the progress bar, the name of a
+        registered progress bar ('tqdm', the default, or the lightweight
+        'terminal' bar) or keyword arguments of a tqdm progress bar
     log_output : bool, optional
         Flag for whether or not to write notebook output to the configured logger
     start_timeout : int, optional
@@ -61,6 +95,44 @@ def execute_notebook(
         Flag for whether or not to hide input.
     cwd : str or Path, optional
         Working directory to use when executing the notebook
+    offload_threshold : int, optional
+        Size in bytes above which display outputs are written next to the output
+        notebook and replaced by a reference (default: never offload)
+    validation_policy : str, optional
+        When to validate the notebook against the nbformat schema: 'always',
+        'first-and-last' (on load and final save, the default) or 'never'
+    results_path : str or Path, optional
+        Local CSV, Parquet or SQLite table to append the parameters and recorded
+        results of a successful run to
+    cache : str or Path or NotebookCache, optional
+        Cache of executed notebooks, or its location. When the same notebook
+        sources were executed with the same parameters and kernel, the cached
+        output is written to `output_path` instead of running the notebook
+    cell_cache : str or Path or CellCache, optional
+        Cache of the outputs and variables of cells tagged ``cache``, or its
+        location. Cells whose source, preceding code cells and parameters are
+        unchanged are restored instead of executed (python kernels only)
+    resume : bool, optional
+        Resume an interrupted execution into `output_path` after the last cell
+        tagged ``checkpoint`` it completed, restoring the checkpointed kernel
+        namespace and the outputs already saved
+    history : str or Path or DurationHistory, optional
+        Local SQLite index of the durations of previous runs, or its path. The
+        durations of this run are recorded in it and the progress bar shows the
+        time remaining expected from previous runs of the same cells
+    progress_stream : int or str or Path or ProgressStream, optional
+        File descriptor, path or stream to write the execution events to as
+        JSON lines, with the cell index, status, elapsed time and ETA
+    status_heartbeat : float, optional
+        Maintain a small ``<output_path>.status.json`` document with the current
+        cell, status, timestamps, error flag and bytes written, updated at cell
+        boundaries and every `status_heartbeat` seconds while a cell runs
+        (0: at cell boundaries only, default: no status document)
+    prestart_kernel : bool, optional
+        Start the kernel in the background as soon as its name is known, from
+        `kernel_name` or the notebook metadata, while the input notebook is
+        loaded and parameterized. Only for engines executing with a kernel
+        manager passed as ``km``, like the default nbclient engine
     **kwargs
         Arbitrary keyword arguments to pass to the notebook engine
 
@@ -75,18 +147,48 @@ def execute_notebook(
         output_path = str(output_path)
     if isinstance(cwd, Path):
         cwd = str(cwd)
+    if isinstance(results_path, Path):
+        results_path = str(results_path)
+    if isinstance(cache, (str, Path)):
+        cache = NotebookCache(cache)
+    if isinstance(cell_cache, (str, Path)):
+        cell_cache = CellCache(cell_cache)
+    if isinstance(history, (str, Path)):
+        history = DurationHistory(history)
+    if progress_stream is not None and not isinstance(progress_stream, ProgressStream):
+        progress_stream = ProgressStream(progress_stream)
 
     path_parameters = add_builtin_parameters(parameters)
     input_path = parameterize_path(input_path, path_parameters)
     output_path = parameterize_path(output_path, path_parameters)
+    check_validation_policy(validation_policy)
+    if results_path is not None:
+        # Fail before execution if the results table format is unknown
+        get_results_writer(results_path)
+    validate = validation_policy != VALIDATE_NEVER
+    if offload_threshold is not None and output_path is not None:
+        # Fail before execution if outputs can't be stored next to the output notebook
+        offload_directory(output_path)
 
     logger.info(f"Input Notebook:  {get_pretty_path(input_path)}")
     logger.info(f"Output Notebook: {get_pretty_path(output_path)}")
-    with local_file_io_cwd():
+    with (
+        local_file_io_cwd(),
+        KernelPrestart(
+            engine_name,
+            cwd=cwd,
+            enabled=prestart_kernel and not prepare_only and 'km' not in engine_kwargs,
+            extra_arguments=engine_kwargs.get('extra_arguments', []),
+        ) as prestart,
+    ):
+        if kernel_name is not None:
+            # Known without the notebook, the kernel starts while the input notebook is fetched
+            prestart.start(kernel_name)
         if cwd is not None:
             logger.info(f"Working directory: {get_pretty_path(cwd)}")
 
-        nb = load_notebook_node(input_path)
+        nb = load_notebook_node(input_path, validate=validate)
+        prestart.start_for_notebook(nb, kernel_name)
 
         # Parameterize the Notebook.
         if parameters:
@@ -108,30 +210,83 @@ def execute_notebook(
         # clear out any existing error markers from previous papermill runs
         nb = remove_error_markers(nb)
 
+        cache_key = None
+        cached_nb = None
+        resume_checkpoint = None
+        if resume and not prepare_only and output_path:
+            resume_checkpoint = load_resume_checkpoint(nb, output_path)
+
         if not prepare_only:
             # Dropdown to the engine to fetch the kernel name from the notebook document
             kernel_name = papermill_engines.nb_kernel_name(engine_name=engine_name, nb=nb, name=kernel_name)
-            # Execute the Notebook in `cwd` if it is set
-            with chdir(cwd):
-                nb = papermill_engines.execute_notebook_with_engine(
-                    engine_name,
-                    nb,
-                    input_path=input_path,
-                    output_path=output_path if request_save_on_cell_execute else None,
-                    kernel_name=kernel_name,
-                    progress_bar=progress_bar,
-                    log_output=log_output,
-                    start_timeout=start_timeout,
-                    stdout_file=stdout_file,
-                    stderr_file=stderr_file,
-                    **engine_kwargs,
-                )
+            if cache is not None:
+                cache_key = cache.key(nb, parameters, kernel_name=kernel_name, engine_name=engine_name, cwd=cwd)
+                cached_nb = cache.get(cache_key)
+
+            if cached_nb is not None:
+                nb = prepare_notebook_metadata(cached_nb, input_path, output_path, report_mode)
+            else:
+                km = prestart.kernel_manager(kernel_name)
+                if km is not None:
+                    engine_kwargs = dict(engine_kwargs, km=km)
+                engine_cwd = cwd is not None and papermill_engines.supports_cwd(engine_name)
+                if engine_cwd:
+                    # The kernel starts in `cwd`, papermill's own working directory is left unchanged
+                    engine_kwargs = dict(engine_kwargs, cwd=cwd)
+                # Other engines execute in `cwd` as the process working directory
+                with chdir(None if engine_cwd else cwd):
+                    nb = papermill_engines.execute_notebook_with_engine(
+                        engine_name,
+                        nb,
+                        input_path=input_path,
+                        output_path=output_path if request_save_on_cell_execute else None,
+                        kernel_name=kernel_name,
+                        progress_bar=progress_bar,
+                        log_output=log_output,
+                        start_timeout=start_timeout,
+                        stdout_file=stdout_file,
+                        stderr_file=stderr_file,
+                        offload_threshold=offload_threshold,
+                        validation_policy=validation_policy,
+                        error_markers=True,
+                        cell_cache=cell_cache,
+                        resume_checkpoint=resume_checkpoint,
+                        history=history,
+                        progress_stream=progress_stream,
+                        status_heartbeat=status_heartbeat,
+                        **engine_kwargs,
+                    )
+
+        # The engine's execution manager offloaded the outputs and wrote the final notebook
+        engine_saved = (
+            request_save_on_cell_execute
+            and not prepare_only
+            and cached_nb is None
+            and papermill_engines.saves_output(engine_name)
+        )
+        if offload_threshold is not None and output_path is not None and not prepare_only and not engine_saved:
+            nb = offload_outputs(nb, output_path, offload_threshold)
 
+        if not prepare_only:
             # Check for errors first (it saves on error before raising)
-            raise_for_execution_errors(nb, output_path)
+            raise_for_execution_errors(nb, output_path, validate=validate)
 
         # Write final output in case the engine didn't write it on cell completion.
-        write_ipynb(nb, output_path)
+        if not engine_saved:
+            write_ipynb(nb, output_path, validate=validate)
+        elif output_path:
+            # The execution completed, a later resume must not skip its cells
+            remove_checkpoint(output_path)
+
+        if cache_key is not None and cached_nb is None:
+            try:
+                cache.put(cache_key, nb)
+            except Exception as e:
+                # The cache is an optimization, the run succeeded and its output is written
+                logger.warning(f"Storing the notebook in the cache failed: {e}")
+
+        if results_path is not None and not prepare_only:
+            append_results(results_path, nb)
 
         return nb
 
@@ -164,27 +319,13 @@ def prepare_notebook_metadata(nb, input_path, output_path, report_mode=False):
     return nb
 
 
-ERROR_MARKER_TAG = "papermill-error-cell-tag"
-
-ERROR_STYLE = 'style="color:red; font-family:Helvetica Neue, Helvetica, Arial, sans-serif; font-size:2em;"'
-
-ERROR_MESSAGE_TEMPLATE = (
-    f"<span {ERROR_STYLE}>An Exception was encountered at '<a href=\"#papermill-error-cell\">In [%s]</a>'.</span>"
-)
-
-ERROR_ANCHOR_MSG = (
-    f'<span id="papermill-error-cell" {ERROR_STYLE}>'
-    'Execution using papermill encountered an exception here and stopped:'
-    '</span>'
-)
-
-
 def remove_error_markers(nb):
     nb.cells = [cell for cell in nb.cells if ERROR_MARKER_TAG not in cell.metadata.get("tags", [])]
+    nb.metadata.get('papermill', {}).pop('exception_cell_index', None)
     return nb
 
 
-def raise_for_execution_errors(nb, output_path):
+def raise_for_execution_errors(nb, output_path, validate=True):
     """Assigned parameters into the appropriate place in the input notebook
 
     Parameters
@@ -193,59 +334,26 @@ def raise_for_execution_errors(nb, output_path):
        Executable notebook object
     output_path : str
        Path to write executed notebook
+    validate : bool, optional
+       Whether to validate the notebook when writing the error markers
     """
     error = None
-    for index, cell in enumerate(nb.cells):
-        has_sys_exit = False
-        # check if there is any cell error output
-        if "outputs" in cell:
-            for output in cell.outputs:
-                if output.output_type == "error":
-                    if output.ename == "SystemExit" and (output.evalue == "" or output.evalue == "0"):
-                        has_sys_exit = True
-                        continue
-                    error = PapermillExecutionError(
-                        cell_index=index,
-                        exec_count=cell.execution_count,
-                        source=cell.source,
-                        ename=output.ename,
-                        evalue=output.evalue,
-                        traceback=output.traceback,
-                    )
-                    break
-
-        # handle the CellExecutionError exceptions raised that didn't produce a cell error output
-        if (
-            error is None
-            and not has_sys_exit
-            and cell.get("metadata", {}).get("papermill", {}).get("exception") is True
-        ):
-            error = PapermillExecutionError(
-                cell_index=index,
-                exec_count=cell.execution_count,
-                source=cell.source,
-                ename="CellExecutionError",
-                evalue="",
-                traceback=[],
-            )
-            break
+    markers_saved = False
+    # Engines using the execution manager report the failing cell as it happens
+    index = nb.metadata.get('papermill', {}).get('exception_cell_index')
+    if index is not None:
+        markers_saved = has_error_markers(nb)
+        error = find_cell_error(nb.cells[index + 2 if markers_saved else index], index)
+    else:
+        for index, cell in enumerate(nb.cells):
+            error = find_cell_error(cell, index)
+            if error:
+                break
 
     if error:
-        # Write notebook back out with the Error Message at the top of the Notebook, and a link to
-        # the relevant cell (by adding a note just before the failure with an HTML anchor)
-        error_msg = ERROR_MESSAGE_TEMPLATE % str(error.exec_count)
-        error_msg_cell = nbformat.v4.new_markdown_cell(error_msg)
-        error_msg_cell.metadata['tags'] = [ERROR_MARKER_TAG]
-        error_anchor_cell = nbformat.v4.new_markdown_cell(ERROR_ANCHOR_MSG)
-        error_anchor_cell.metadata['tags'] = [ERROR_MARKER_TAG]
-
-        # Upgrade the Notebook to the latest v4 before writing into it
-        nb = nbformat.v4.upgrade(nb)
-
-        # put the anchor before the cell with the error, before all the indices change due to the
-        # heading-prepending
-        nb.cells.insert(error.cell_index, error_anchor_cell)
-        nb.cells.insert(0, error_msg_cell)
-
-        write_ipynb(nb, output_path)
+        if not markers_saved:
+            # Write notebook back out with the Error Message at the top of the Notebook, and a link to
+            # the relevant cell (by adding a note just before the failure with an HTML anchor)
+            nb = add_error_markers(upgrade_notebook(nb), error)
+            write_ipynb(nb, output_path, validate=validate)
         raise error
@@ -0,0 +1,181 @@
+"""Kernels of a remote Jupyter kernel gateway, kept running between executions."""
+
+import atexit
+import threading
+
+import requests
+import websocket
+from jupyter_client.asynchronous import AsyncKernelClient
+from jupyter_core.utils import ensure_async
+from jupyter_server.gateway.gateway_client import GatewayClient
+from jupyter_server.gateway.managers import GatewayKernelClient, GatewayKernelManager
+from jupyter_server.utils import url_escape, url_path_join
+from nbclient.util import run_sync
+from traitlets import Bool
+
+from .clientwrap import PapermillNotebookClient
+from .exceptions import PapermillException
+from .log import logger
+
+# Deletes the user variables of a reused IPython kernel
+RESET_NAMESPACE_CODE = "get_ipython().run_line_magic('reset', '-f')"
+
+
+class PapermillGatewayKernelClient(GatewayKernelClient):
+    """Gateway kernel client which authenticates its websocket like its HTTP requests.
+
+    The websocket opened by the jupyter_server client doesn't carry the
+    authorization header, which token protected gateways refuse.
+    """
+
+    async def start_channels(self, shell=True, iopub=True, stdin=True, hb=True, control=True):
+        gateway = GatewayClient.instance()
+        ws_url = url_path_join(gateway.ws_url or "", gateway.kernels_endpoint, url_escape(self.kernel_id), "channels")
+        self.channel_socket = websocket.create_connection(
+            ws_url,
+            timeout=gateway.KERNEL_LAUNCH_TIMEOUT,
+            enable_multithread=True,
+            header=gateway.load_connection_args().get('headers', {}),
+            sslopt={"ca_certs": gateway.ca_certs, "certfile": gateway.client_cert, "keyfile": gateway.client_key},
+        )
+        # Skip GatewayKernelClient.start_channels, which would open a second websocket
+        await ensure_async(
+            AsyncKernelClient.start_channels(self, shell=shell, iopub=iopub, stdin=stdin, hb=hb, control=control)
+        )
+        self.response_router = threading.Thread(target=self._route_responses)
+        self.response_router.start()
+
+
+class GatewayNotebookClient(PapermillNotebookClient):
+    """Notebook client which clears the namespace of a reused gateway kernel first."""
+
+    reset_namespace = Bool(False).tag(config=True)
+
+    def papermill_execute_cells(self):
+        if self.reset_namespace:
+            reply = self.execute_silently(RESET_NAMESPACE_CODE)
+            if reply['status'] != 'ok':
+                raise PapermillException(f"Could not reset the namespace of the reused kernel: {reply.get('evalue')}")
+        super().papermill_execute_cells()
+
+
+def configure_gateway(url=None, auth_token=None):
+    """Point the process wide jupyter_server gateway client at `url`.
+
+    Parameters
+    ----------
+    url : str, optional
+        Base URL of the gateway (default: the ``JUPYTER_GATEWAY_URL`` environment variable)
+    auth_token : str, optional
+        Token authorizing the requests (default: the ``JUPYTER_GATEWAY_AUTH_TOKEN`` environment variable)
+
+    Returns
+    -------
+    str
+        URL of the kernels endpoint of the gateway
+    """
+    gateway = GatewayClient.instance()
+    if url is not None and url != gateway.url:
+        gateway.url = url
+        # The websocket URL defaults to the first URL the client was configured with
+        gateway.ws_url = url.replace('http', 'ws', 1)
+    if auth_token is not None:
+        gateway.auth_token = auth_token
+    if not gateway.url:
+        raise PapermillException(
+            "No kernel gateway configured: pass gateway_url or set the JUPYTER_GATEWAY_URL environment variable"
+        )
+    return url_path_join(gateway.url, gateway.kernels_endpoint)
+
+
+class GatewayKernelPool:
+    """Kernels started on kernel gateways, kept running between notebook executions.
+
+    Idle kernels are pooled by gateway and kernel name. A kernel released after
+    an execution is handed to the next execution of the same kernelspec, which
+    saves the kernel start-up. Pooled kernels are shut down when the process
+    exits.
+
+    Parameters
+    ----------
+    max_idle : int, optional
+        Maximum number of idle kernels kept per gateway and kernel name
+    """
+
+    def __init__(self, max_idle=4):
+        self.max_idle = max_idle
+        self._idle = {}
+        self._lock = threading.Lock()
+
+    def idle_count(self, kernel_name=None):
+        """Number of idle kernels, optionally only those of `kernel_name`."""
+        with self._lock:
+            return sum(len(kms) for (_, name), kms in self._idle.items() if kernel_name in (None, name))
+
+    def acquire(self, kernel_name, url=None, auth_token=None, reuse=True):
+        """Take an idle kernel of `kernel_name` from the pool, or start one on the gateway.
+
+        Returns
+        -------
+        tuple of (GatewayKernelManager, bool)
+            The manager of the running kernel and whether it ran a previous notebook
+        """
+        key = (configure_gateway(url, auth_token), kernel_name)
+        while reuse:
+            with self._lock:
+                idle = self._idle.get(key)
+                km = idle.pop() if idle else None
+            if km is None:
+                break
+            # The gateway may have culled the kernel while it was idle
+            if run_sync(km.refresh_model)() is not None and km.execution_state != 'dead':
+                logger.info(f"Reusing gateway kernel {km.kernel_id}")
+                return km, True
+            logger.info(f"Discarding gateway kernel {km.kernel_id}, it is no longer running")
+
+        km = GatewayKernelManager(kernel_name=kernel_name, client_factory=PapermillGatewayKernelClient)
+        run_sync(km.start_kernel)(kernel_name=kernel_name)
+        logger.info(f"Started gateway kernel {km.kernel_id}")
+        return km, False
+
+    def release(self, km, reuse=True):
+        """Return a kernel to the pool after an execution, or shut it down if it can't be reused."""
+        key = (km.kernels_url, km.kernel_name)
+        if reuse:
+            with self._lock:
+                idle = self._idle.setdefault(key, [])
+                if len(idle) < self.max_idle:
+                    idle.append(km)
+                    return
+        self._shutdown(km)
+
+    def shutdown(self):
+        """Shut down every idle kernel.
+
+        This runs when the process exits, once the executors of the async HTTP
+        client are stopped, so the kernels are deleted with blocking requests.
+        """
+        with self._lock:
+            kms = [km for idle in self._idle.values() for km in idle]
+            self._idle.clear()
+        if not kms:
+            return
+        gateway = GatewayClient.instance()
+        headers = gateway.load_connection_args().get('headers', {})
+        for km in kms:
+            try:
+                requests.delete(
+                    km.kernel_url, headers=headers, verify=gateway.validate_cert, timeout=gateway.request_timeout
+                ).raise_for_status()
+            except requests.RequestException as e:
+                logger.warning(f"Could not shut down gateway kernel {km.kernel_id}: {e}")
+
+    def _shutdown(self, km):
+        try:
+            run_sync(km.shutdown_kernel)()
+        except Exception as e:
+            logger.warning(f"Could not shut down gateway kernel {km.kernel_id}: {e}")
+
+
+gateway_kernels = GatewayKernelPool()
+atexit.register(gateway_kernels.shutdown)
@@ -0,0 +1,157 @@
+"""Durations of previous executions, for progress estimates and scheduling."""
+
+import hashlib
+import os
+import sqlite3
+import time
+from contextlib import closing, contextmanager
+
+# Weight of the latest run in the recorded durations, older runs decay geometrically
+HISTORY_SMOOTHING = 0.5
+
+
+def history_path_key(input_path):
+    """Identify an input notebook, local paths being made absolute."""
+    if not isinstance(input_path, str):
+        return None
+    if '://' in input_path:
+        return input_path
+    return os.path.abspath(input_path)
+
+
+def cell_source_hash(cell):
+    """Digest of the type and source of a cell."""
+    return hashlib.sha256(f"{cell.cell_type}\0{cell.source}".encode()).hexdigest()
+
+
+class DurationHistory:
+    """Local SQLite index of the durations of executed notebooks and cells.
+
+    Cells are keyed by input notebook and source hash, so editing a cell only
+    forgets the duration of that cell. Each recorded duration is an
+    exponentially weighted average of the runs, following slow drifts of
+    the data a notebook processes.
+
+    Parameters
+    ----------
+    path : str
+        Path of the database, created if missing
+    """
+
+    def __init__(self, path):
+        self.path = str(path)
+        with self._connect() as conn:
+            conn.execute(
+                'CREATE TABLE IF NOT EXISTS cells (input_path TEXT, source_hash TEXT, duration REAL, runs INTEGER, '
+                'updated_at REAL, PRIMARY KEY (input_path, source_hash))'
+            )
+            conn.execute(
+                'CREATE TABLE IF NOT EXISTS notebooks (input_path TEXT PRIMARY KEY, duration REAL, runs INTEGER, '
+                'updated_at REAL)'
+            )
+
+    def __repr__(self):
+        return f"DurationHistory({self.path!r})"
+
+    @contextmanager
+    def _connect(self):
+        # Commit the transaction, or roll it back on error, and close the connection
+        with closing(sqlite3.connect(self.path)) as conn, conn:
+            yield conn
+
+    def record(self, nb, resumed_from=0):
+        """Record the durations of an executed notebook.
+
+        Only completed code cells are recorded, except the injected parameters
+        whose source changes with every run. The notebook duration is recorded
+        when the whole notebook ran and completed without error.
+
+        Parameters
+        ----------
+        nb : NotebookNode
+            The executed notebook, with its papermill metadata
+        resumed_from : int, optional
+            Index of the first executed cell, the cells before it were restored
+            from an interrupted execution
+        """
+        metadata = nb.metadata.get('papermill', {})
+        input_path = history_path_key(metadata.get('input_path'))
+        if input_path is None:
+            return
+        now = time.time()
+        rows = [
+            (input_path, cell_source_hash(cell), cell.metadata.papermill['duration'], now)
+            for cell in nb.cells[resumed_from:]
+            if cell.cell_type == 'code'
+            and 'injected-parameters' not in cell.metadata.get('tags', [])
+            and cell.metadata.get('papermill', {}).get('status') == 'completed'
+            and cell.metadata.papermill.get('duration') is not None
+        ]
+        upsert = (
+            'INSERT INTO {table} VALUES ({values}, 1, ?) ON CONFLICT ({key}) DO UPDATE SET '
+            f'duration = duration + {HISTORY_SMOOTHING} * (excluded.duration - duration), '
+            'runs = runs + 1, updated_at = excluded.updated_at'
+        )
+        with self._connect() as conn:
+            conn.executemany(upsert.format(table='cells', values='?, ?, ?', key='input_path, source_hash'), rows)
+            if not resumed_from and not metadata.get('exception') and metadata.get('duration') is not None:
+                conn.execute(
+                    upsert.format(table='notebooks', values='?, ?', key='input_path'),
+                    (input_path, metadata['duration'], now),
+                )
+
+    def cell_estimates(self, nb):
+        """Expected duration of each cell of a notebook about to be executed.
+
+        Returns
+        -------
+        list of float or None
+            Expected seconds by cell index, None for code cells never recorded
+            and 0 for other cells. None if no cell of the notebook was recorded.
+        """
+        input_path = history_path_key(nb.metadata.get('papermill', {}).get('input_path'))
+        if input_path is None:
+            return None
+        with self._connect() as conn:
+            durations = dict(
+                conn.execute('SELECT source_hash, duration FROM cells WHERE input_path = ?', (input_path,)).fetchall()
+            )
+        if not durations:
+            return None
+        return [durations.get(cell_source_hash(cell)) if cell.cell_type == 'code' else 0.0 for cell in nb.cells]
+
+    def expected_duration(self, input_path):
+        """Average duration in seconds of the complete executions of a notebook, or None if never recorded."""
+        with self._connect() as conn:
+            row = conn.execute(
+                'SELECT duration FROM notebooks WHERE input_path = ?', (history_path_key(input_path),)
+            ).fetchone()
+        return row[0] if row else None
+
+
+def longest_first(items, history, input_path=lambda item: item):
+    """Order executions by decreasing expected duration.
+
+    Starting the longest runs first keeps a long run from being started last
+    while the other workers sit idle, reducing the time to finish a batch.
+    Runs never recorded are started first since they may be the longest.
+
+    Parameters
+    ----------
+    items : iterable
+        The executions to order
+    history : DurationHistory
+        Durations of previous executions
+    input_path : callable, optional
+        Returns the input notebook path of an item (default: the item itself)
+
+    Returns
+    -------
+    list
+        The items, longest expected first. Items with equal expectations keep
+        their order.
+    """
+    items = list(items)
+    expected = [history.expected_duration(input_path(item)) for item in items]
+    order = sorted(range(len(items)), key=lambda i: float('-inf') if expected[i] is None else -expected[i])
+    return [items[i] for i in order]
@@ -1,15 +1,23 @@
+import copy
+import errno
 import fnmatch
 import json
+import mmap
 import os
+import stat
 import sys
+import uuid
 import warnings
-from contextlib import contextmanager
+from contextlib import contextmanager, suppress
+from urllib.parse import urlparse
 
 import entrypoints
 import nbformat
 import requests
 import yaml
-from tenacity import retry, retry_if_exception_type, stop_after_attempt, wait_exponential
+from nbformat.v4.nbjson import BytesEncoder
+from nbformat.v4.rwbase import split_lines, strip_transient
+from nbformat.validator import ValidationError
 
 from .exceptions import (
     PapermillException,
@@ -18,7 +26,9 @@ from .exceptions import (
     missing_environment_variable_generator,
 )
 from .log import logger
-from .utils import chdir
+from .models import FileEntry
+from .retry import RetryMetrics, RetryPolicy, is_not_found
+from .utils import glob_regex, split_glob
 from .version import version as __version__
 
 try:
@@ -56,6 +66,16 @@ try:
 except ImportError:
     Github = missing_dependency_generator("pygithub", "github")
 
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import ujson
+except ImportError:
+    ujson = None
+
 
 def fallback_gs_is_retriable(e):
     try:
@@ -80,6 +100,9 @@ try:
 except NameError:
     FileNotFoundError = IOError
 
+# Local files from this size are memory mapped instead of read into a buffer
+MMAP_THRESHOLD = 64 * 1024 * 1024
+
 
 class PapermillIO:
     '''
@@ -93,22 +116,93 @@ class PapermillIO:
 
     def read(self, path, extensions=['.ipynb', '.json']):
         # Handle https://github.com/nteract/papermill/issues/317
-        notebook_metadata = self.get_handler(path, extensions).read(path)
+        notebook_metadata = self._call('read', path, extensions)
         if isinstance(notebook_metadata, (bytes, bytearray)):
             return notebook_metadata.decode('utf-8')
         return notebook_metadata
 
     def write(self, buf, path, extensions=['.ipynb', '.json']):
-        return self.get_handler(path, extensions).write(buf, path)
+        return self._call('write', path, extensions, buf)
 
     def listdir(self, path):
-        return self.get_handler(path).listdir(path)
+        return self._call('listdir', path)
+
+    def delete(self, path):
+        return self._call('delete', path)
+
+    def _call(self, operation, path, extensions=None, *args):
+        scheme, handler = self._match(path, extensions)
+        method = getattr(handler, operation)
+        policy = self.get_retry_policy(scheme) if scheme is not None else None
+        try:
+            if policy is None:
+                return method(*args, path)
+            return policy.call(method, *args, path, scheme=scheme, operation=operation, metrics=self.retry_metrics)
+        except Exception as e:
+            if isinstance(e, FileNotFoundError) or not is_not_found(e):
+                raise
+            # Each backend reports missing files with its own error, callers only handle FileNotFoundError
+            raise FileNotFoundError(errno.ENOENT, f"No such file: {path}") from e
+
+    def glob(self, pattern):
+        '''List the files matching a glob pattern
+
+        ``*``, ``?`` and ``[...]`` match within a path segment, ``**`` matches any
+        number of segments. Handlers without a `glob` method can only match the
+        file names of one directory, listed with `listdir`.
+
+        Parameters
+        ----------
+        pattern : str
+            Path pattern, e.g. ``s3://bucket/runs/**/*.ipynb``
+
+        Raises
+        ------
+        PapermillException: If the handler cannot list the pattern
+
+        Returns
+        -------
+        list of FileEntry
+            Sorted by path
+        '''
+        handler = self.get_handler(pattern)
+        if hasattr(handler, 'glob'):
+            return self._call('glob', pattern)
+        prefix, recursive = split_glob(pattern)
+        if recursive:
+            raise PapermillException(f'recursive glob is not supported by {type(handler).__name__}')
+        matches = glob_regex(pattern).match
+        paths = self.listdir(prefix.rpartition('/')[0] or '.')
+        return sorted(FileEntry(path, None, None, None) for path in paths if matches(path))
 
     def pretty_path(self, path):
         return self.get_handler(path).pretty_path(path)
 
     def reset(self):
         self._handlers = []
+        self._retry_policies = {}
+        self.retry_policy = RetryPolicy()
+        self.retry_metrics = RetryMetrics()
+
+    def set_retry_policy(self, policy, scheme=None):
+        '''Set the retry policy of the reads, writes and listings of a scheme
+
+        Parameters
+        ----------
+        policy : papermill.retry.RetryPolicy or None
+            Policy to apply, None to not retry
+        scheme : str, optional
+            Scheme the handler was registered with, e.g. ``s3://``, default:
+            the policy of the schemes without one of their own
+        '''
+        if scheme is None:
+            self.retry_policy = policy
+        else:
+            self._retry_policies[scheme] = policy
+
+    def get_retry_policy(self, scheme):
+        '''Retry policy of a scheme, None if its operations are not retried'''
+        return self._retry_policies.get(scheme, self.retry_policy)
 
     def register(self, scheme, handler):
         # Keep these ordered as LIFO
@@ -138,11 +232,15 @@ class PapermillIO:
         -------
         I/O Handler
         '''
+        return self._match(path, extensions)[1]
+
+    def _match(self, path, extensions=None):
+        # The scheme of the handler matching the path, None for the built-in object handlers
         if path is None:
-            return NoIOHandler()
+            return None, NoIOHandler()
 
         if isinstance(path, nbformat.NotebookNode):
-            return NotebookNodeHandler()
+            return None, NotebookNodeHandler()
 
         if extensions:
             if not fnmatch.fnmatch(os.path.basename(path).split('?')[0], '*.*'):
@@ -156,23 +254,29 @@ class PapermillIO:
                 local_handler = handler
 
             if path.startswith(scheme):
-                return handler
+                return scheme, handler
 
         if local_handler is None:
             raise PapermillException(f"Could not find a registered schema handler for: {path}")
 
-        return local_handler
+        return 'local', local_handler
 
 
 class HttpHandler:
     @classmethod
     def read(cls, path):
-        return requests.get(path, headers={'Accept': 'application/json'}).text
+        result = requests.get(path, headers={'Accept': 'application/json'})
+        result.raise_for_status()
+        return result.text
 
     @classmethod
     def listdir(cls, path):
         raise PapermillException('listdir is not supported by HttpHandler')
 
+    @classmethod
+    def glob(cls, pattern):
+        raise PapermillException('glob is not supported by HttpHandler')
+
     @classmethod
     def write(cls, buf, path):
         result = requests.put(path, json=json.loads(buf))
@@ -184,61 +288,169 @@ class HttpHandler:
 
 
 class LocalHandler:
-    def __init__(self):
+    """Handler for local paths, also reading notebooks passed in as JSON strings.
+
+    Relative paths are resolved against the directory set with `cwd`, without
+    changing the process working directory. Writes go to a temporary file in
+    the destination folder which then replaces the destination, so readers and
+    crashes never see a partially written notebook.
+
+    Args:
+        fsync (str): When to flush writes to disk, one of ``'never'`` (leave it to the
+            operating system), ``'file'`` (the written file) or ``'directory'`` (the
+            file, then the folder entry of the replace). Defaults to the
+            ``PAPERMILL_LOCAL_FSYNC`` environment variable, otherwise ``'never'``.
+        mmap_threshold (int): Size in bytes from which files are memory mapped instead
+            of read into a buffer, None to never memory map.
+    """
+
+    FSYNC_POLICIES = ('never', 'file', 'directory')
+
+    def __init__(self, fsync=None, mmap_threshold=MMAP_THRESHOLD):
+        fsync = fsync or os.environ.get('PAPERMILL_LOCAL_FSYNC', 'never')
+        if fsync not in self.FSYNC_POLICIES:
+            raise PapermillException(f"Unknown fsync policy '{fsync}', expected one of {self.FSYNC_POLICIES}")
+        self.fsync = fsync
+        self.mmap_threshold = mmap_threshold
         self._cwd = None
 
+    def _resolve(self, path):
+        if self._cwd is None or os.path.isabs(path):
+            return path
+        return os.path.join(self._cwd, path)
+
     def read(self, path):
-        try:
-            with chdir(self._cwd):
-                with open(path, encoding="utf-8") as f:
-                    return f.read()
-        except OSError as e:
-            try:
-                # Check if path could be a notebook passed in as a
-                # string
-                json.loads(path)
-                return path
-            except ValueError:
-                # Propagate the IOError
-                raise e
+        # Notebooks can be passed in as a JSON string instead of a path
+        if path.lstrip().startswith('{') and not os.path.exists(self._resolve(path)):
+            return path
+        with open(self._resolve(path), 'rb') as f:
+            size = os.fstat(f.fileno()).st_size
+            if self.mmap_threshold is None or size < self.mmap_threshold:
+                return f.read().decode('utf-8')
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as buf:
+                with memoryview(buf) as view:
+                    return str(view, 'utf-8')
 
     def listdir(self, path):
-        with chdir(self._cwd):
-            return [os.path.join(path, fn) for fn in os.listdir(path)]
+        return [os.path.join(path, fn) for fn in os.listdir(self._resolve(path))]
+
+    def glob(self, pattern):
+        prefix, recursive = split_glob(pattern)
+        matches = glob_regex(pattern).match
+        entries = []
+        directories = [os.path.dirname(prefix)]
+        while directories:
+            directory = directories.pop()
+            try:
+                scan = os.scandir(self._resolve(directory or '.'))
+            except (FileNotFoundError, NotADirectoryError):
+                continue
+            with scan:
+                for entry in scan:
+                    path = os.path.join(directory, entry.name)
+                    if not path.startswith(prefix[: len(path)]):
+                        continue
+                    if entry.is_dir():
+                        if recursive:
+                            directories.append(path)
+                    elif matches(path):
+                        info = entry.stat()
+                        entries.append(FileEntry(path, info.st_size, info.st_mtime, None))
+        return sorted(entries)
 
     def write(self, buf, path):
-        with chdir(self._cwd):
-            dirname = os.path.dirname(path)
-            if dirname and not os.path.exists(dirname):
-                raise FileNotFoundError(f"output folder {dirname} doesn't exist.")
-            with open(path, 'w', encoding="utf-8") as f:
-                f.write(buf)
+        path = self._resolve(path)
+        if os.path.islink(path):
+            # Replace the file linked to rather than the link
+            path = os.path.realpath(path)
+        dirname, basename = os.path.split(path)
+        if dirname and not os.path.exists(dirname):
+            raise FileNotFoundError(f"output folder {dirname} doesn't exist.")
+        data = buf.encode('utf-8')
+        try:
+            mode = os.stat(path).st_mode
+        except FileNotFoundError:
+            mode = None
+        if mode is not None and not stat.S_ISREG(mode):
+            # Devices and pipes, like /dev/stdout, cannot be replaced
+            with open(path, 'wb') as f:
+                return f.write(data)
+
+        tmp_path = os.path.join(dirname or '.', f'.{basename}.{uuid.uuid4().hex[:8]}.tmp')
+        # Created like `open` would, with the permissions allowed by the umask
+        fd = os.open(tmp_path, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o666)
+        try:
+            with open(fd, 'wb') as f:
+                f.write(data)
+                f.flush()
+                if mode is not None:
+                    os.chmod(fd, stat.S_IMODE(mode))
+                if self.fsync != 'never':
+                    os.fsync(fd)
+            os.replace(tmp_path, path)
+        except BaseException:
+            with suppress(FileNotFoundError):
+                os.remove(tmp_path)
+            raise
+        if self.fsync == 'directory':
+            self._fsync_directory(dirname or '.')
+        return len(data)
+
+    @staticmethod
+    def _fsync_directory(dirname):
+        try:
+            fd = os.open(dirname, os.O_RDONLY)
+        except OSError:
+            # Folders cannot be opened on Windows, where the replace is durable on its own
+            return
+        try:
+            os.fsync(fd)
+        finally:
+            os.close(fd)
 
     def pretty_path(self, path):
         return path
 
+    def makedirs(self, path):
+        os.makedirs(self._resolve(path), exist_ok=True)
+
+    def delete(self, path):
+        os.remove(self._resolve(path))
+
     def cwd(self, new_path):
-        '''Sets the cwd during reads and writes'''
+        '''Sets the directory relative paths are resolved against'''
         old_cwd = self._cwd
         self._cwd = new_path
         return old_cwd
 
 
 class S3Handler:
-    @classmethod
-    def read(cls, path):
-        return "\n".join(S3().read(path))
+    """Handler for ``s3://`` paths.
 
-    @classmethod
-    def listdir(cls, path):
-        return S3().listdir(path)
+    Args:
+        **s3_options: Client options of `papermill.s3.S3`, e.g. ``endpoint_url`` and ``profile``
+            to register a handler per S3 compatible store.
+    """
 
-    @classmethod
-    def write(cls, buf, path):
-        return S3().cp_string(buf, path)
+    def __init__(self, **s3_options):
+        self.s3_options = s3_options
 
-    @classmethod
-    def pretty_path(cls, path):
+    def read(self, path):
+        return "\n".join(S3(**self.s3_options).read(path))
+
+    def listdir(self, path):
+        return S3(**self.s3_options).listdir(path)
+
+    def glob(self, pattern):
+        return S3(**self.s3_options).glob(pattern)
+
+    def write(self, buf, path):
+        return S3(**self.s3_options).cp_string(buf, path)
+
+    def delete(self, path):
+        return S3(**self.s3_options).delete(path)
+
+    def pretty_path(self, path):
         return path
 
 
@@ -258,9 +470,15 @@ class ADLHandler:
     def listdir(self, path):
         return self._get_client().listdir(path)
 
+    def glob(self, pattern):
+        return self._get_client().glob(pattern)
+
     def write(self, buf, path):
         return self._get_client().write(buf, path)
 
+    def delete(self, path):
+        return self._get_client().delete(path)
+
     def pretty_path(self, path):
         return path
 
@@ -281,57 +499,112 @@ class ABSHandler:
     def listdir(self, path):
         return self._get_client().listdir(path)
 
+    def glob(self, pattern):
+        return self._get_client().glob(pattern)
+
     def write(self, buf, path):
         return self._get_client().write(buf, path)
 
+    def delete(self, path):
+        return self._get_client().delete(path)
+
     def pretty_path(self, path):
         return path
 
 
 class GCSHandler:
-    RATE_LIMIT_RETRIES = 3
-    RETRY_DELAY = 1
-    RETRY_MULTIPLIER = 1
-    RETRY_MAX_DELAY = 4
+    """Handler for ``gs://`` paths.
 
-    def __init__(self):
+    Args:
+        project (str, optional): Google Cloud project of the client.
+        token (str or dict, optional): Authentication method or credentials of gcsfs, e.g.
+            ``'cache'`` to reuse the tokens cached by a previous browser login.
+        block_size (int, optional): Bytes fetched per request when reading.
+        consistency (str, optional): Check of uploaded files, one of ``'none'``, ``'size'``,
+            ``'md5'`` or ``'crc32c'``.
+        upload_chunk_size (int, optional): Notebooks larger than this are written in a resumable
+            upload of chunks of this many bytes, a multiple of 256 KiB.
+        **client_kwargs: Other arguments of the gcsfs `GCSFileSystem`.
+    """
+
+    UPLOAD_CHUNK_SIZE = 8 * 2**20
+    # Resumable uploads are sent in multiples of this size
+    UPLOAD_CHUNK_ALIGNMENT = 2**18
+
+    def __init__(
+        self, project=None, token=None, block_size=None, consistency=None, upload_chunk_size=None, **client_kwargs
+    ):
+        options = {'project': project, 'token': token, 'block_size': block_size, 'consistency': consistency}
+        self.client_kwargs = {key: value for key, value in options.items() if value is not None}
+        self.client_kwargs.update(client_kwargs)
+        self.upload_chunk_size = upload_chunk_size or self.UPLOAD_CHUNK_SIZE
+        if self.upload_chunk_size % self.UPLOAD_CHUNK_ALIGNMENT:
+            raise PapermillException(
+                f"GCS upload chunk size must be a multiple of {self.UPLOAD_CHUNK_ALIGNMENT} bytes, "
+                f"got {self.upload_chunk_size}"
+            )
         self._client = None
 
     def _get_client(self):
         if self._client is None:
-            self._client = GCSFileSystem()
+            self._client = GCSFileSystem(**self.client_kwargs)
         return self._client
 
-    def read(self, path):
-        with self._get_client().open(path) as f:
+    def _call(self, func, *args):
+        # Errors gcsfs retried until giving up are raised as PapermillRateLimitException, which a
+        # retry policy set for gs:// in papermill_io would retry
+        try:
+            return func(*args)
+        except Exception as e:
+            try:
+                message = e.message
+            except AttributeError:
+                message = f"Generic exception {type(e)} raised"
+            if gs_is_retriable(e):
+                raise PapermillRateLimitException(message)
+            # Reraise the original exception without retries
+            raise
+
+    def _read(self, path):
+        with self._get_client().open(path, 'rb') as f:
             return f.read()
 
+    def _write(self, data, path):
+        # Smaller documents are sent in a single request when the file closes
+        with self._get_client().open(path, 'wb', block_size=self.upload_chunk_size) as f:
+            return f.write(data)
+
+    def read(self, path):
+        return self._call(self._read, path)
+
     def listdir(self, path):
-        return self._get_client().ls(path)
+        return self._call(self._get_client().ls, path)
+
+    def _glob(self, pattern):
+        prefix, recursive = split_glob(pattern)
+        directory, _, name_prefix = prefix.rpartition('/')
+        client = self._get_client()
+        if recursive:
+            infos = client.find(directory, prefix=name_prefix, detail=True).values()
+        else:
+            infos = client.ls(directory, detail=True, prefix=name_prefix)
+        matches = glob_regex(pattern).match
+        entries = []
+        for info in infos:
+            path = f"gs://{info['name']}"
+            if info['type'] == 'file' and matches(path):
+                mtime = info.get('mtime')
+                entries.append(FileEntry(path, info['size'], mtime.timestamp() if mtime else None, info.get('etag')))
+        return sorted(entries)
+
+    def glob(self, pattern):
+        return self._call(self._glob, pattern)
 
     def write(self, buf, path):
-        # Wrapped so we can mock retry options during testing
-        @retry(
-            retry=retry_if_exception_type(PapermillRateLimitException),
-            stop=stop_after_attempt(self.RATE_LIMIT_RETRIES),
-            wait=wait_exponential(multiplier=self.RETRY_MULTIPLIER, min=self.RETRY_DELAY, max=self.RETRY_MAX_DELAY),
-            reraise=True,
-        )
-        def retry_write():
-            try:
-                with self._get_client().open(path, 'w') as f:
-                    return f.write(buf)
-            except Exception as e:
-                try:
-                    message = e.message
-                except AttributeError:
-                    message = f"Generic exception {type(e)} raised"
-                if gs_is_retriable(e):
-                    raise PapermillRateLimitException(message)
-                # Reraise the original exception without retries
-                raise
+        return self._call(self._write, buf.encode('utf-8'), path)
 
-        return retry_write()
+    def delete(self, path):
+        return self._call(self._get_client().rm, path)
 
     def pretty_path(self, path):
         return path
@@ -353,10 +626,24 @@ class HDFSHandler:
     def listdir(self, path):
         return [f.path for f in self._get_client().get_file_info(FileSelector(path))]
 
+    def glob(self, pattern):
+        prefix, recursive = split_glob(pattern)
+        selector = FileSelector(prefix.rpartition('/')[0] or '/', allow_not_found=True, recursive=recursive)
+        # Listed paths have no scheme or authority
+        matches = glob_regex(urlparse(pattern).path if pattern.startswith('hdfs://') else pattern).match
+        return sorted(
+            FileEntry(f.path, f.size, f.mtime.timestamp() if f.mtime else None, None)
+            for f in self._get_client().get_file_info(selector)
+            if f.is_file and matches(f.path)
+        )
+
     def write(self, buf, path):
         with self._get_client().open_output_stream(path) as f:
             return f.write(str.encode(buf))
 
+    def delete(self, path):
+        self._get_client().delete_file(path)
+
     def pretty_path(self, path):
         return path
 
@@ -387,6 +674,9 @@ class GithubHandler:
     def listdir(self, path):
         raise PapermillException('listdir is not supported by GithubHandler')
 
+    def glob(self, pattern):
+        raise PapermillException('glob is not supported by GithubHandler')
+
     def write(self, buf, path):
         raise PapermillException('write is not supported by GithubHandler')
 
@@ -403,6 +693,9 @@ class StreamHandler:
     def listdir(self, path):
         raise PapermillException('listdir is not supported by Stream Handler')
 
+    def glob(self, pattern):
+        raise PapermillException('glob is not supported by Stream Handler')
+
     def write(self, buf, path):
         try:
             return sys.stdout.buffer.write(buf.encode('utf-8'))
@@ -424,6 +717,9 @@ class NotebookNodeHandler:
     def listdir(self, path):
         raise PapermillException('listdir is not supported by NotebookNode Handler')
 
+    def glob(self, pattern):
+        raise PapermillException('glob is not supported by NotebookNode Handler')
+
     def write(self, buf, path):
         raise PapermillException('write is not supported by NotebookNode Handler')
 
@@ -440,6 +736,9 @@ class NoIOHandler:
     def listdir(self, path):
         raise PapermillException('listdir is not supported by NoIOHandler')
 
+    def glob(self, pattern):
+        raise PapermillException('glob is not supported by NoIOHandler')
+
     def write(self, buf, path):
         return
 
@@ -447,6 +746,179 @@ class NoIOHandler:
         return 'Notebook will not be saved'
 
 
+class JSONBackend:
+    """Notebook JSON (de)serialization using the standard library `json` module.
+
+    Indented output matches the on-disk layout produced by `nbformat.writes`.
+    Compact output drops indentation for intermediate saves.
+    """
+
+    name = 'json'
+
+    def loads(self, buf):
+        return json.loads(buf)
+
+    def dumps(self, obj, compact=False):
+        if compact:
+            return json.dumps(obj, cls=BytesEncoder, sort_keys=True, separators=(',', ':'), ensure_ascii=False)
+        return json.dumps(obj, cls=BytesEncoder, indent=1, sort_keys=True, separators=(',', ': '), ensure_ascii=False)
+
+
+def _orjson_default(obj):
+    if isinstance(obj, bytes):
+        return obj.decode('ascii')
+    raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
+
+
+class OrjsonBackend(JSONBackend):
+    """Notebook JSON (de)serialization using `orjson`.
+
+    orjson only supports two space indentation, so indented documents are still
+    written by the standard library to keep the nbformat layout stable.
+    """
+
+    name = 'orjson'
+
+    def loads(self, buf):
+        return orjson.loads(buf)
+
+    def dumps(self, obj, compact=False):
+        if not compact:
+            return super().dumps(obj)
+        return orjson.dumps(obj, default=_orjson_default, option=orjson.OPT_SORT_KEYS).decode('utf-8')
+
+
+class UjsonBackend(JSONBackend):
+    """Notebook JSON (de)serialization using `ujson`."""
+
+    name = 'ujson'
+
+    def loads(self, buf):
+        return ujson.loads(buf)
+
+    def dumps(self, obj, compact=False):
+        if not compact:
+            return super().dumps(obj)
+        return ujson.dumps(obj, sort_keys=True, ensure_ascii=False, escape_forward_slashes=False)
+
+
+# Available backends, in order of preference when none is requested explicitly
+json_backends = {}
+if orjson is not None:
+    json_backends['orjson'] = OrjsonBackend()
+if ujson is not None:
+    json_backends['ujson'] = UjsonBackend()
+json_backends['json'] = JSONBackend()
+
+
+def get_json_backend(name=None):
+    """Fetch a registered JSON backend.
+
+    Parameters
+    ----------
+    name : str, optional
+        Name of the backend. Defaults to the `PAPERMILL_JSON_BACKEND` environment
+        variable, or the fastest available backend if that is not set either.
+
+    Raises
+    ------
+    PapermillException: If the requested backend is not available
+
+    Returns
+    -------
+    JSONBackend
+    """
+    name = name or os.environ.get('PAPERMILL_JSON_BACKEND')
+    if name is None:
+        return next(iter(json_backends.values()))
+    try:
+        return json_backends[name]
+    except KeyError:
+        raise PapermillException(f"JSON backend '{name}' is not available, choose one of {list(json_backends)}")
+
+
+# Validation policies controlling when notebooks are checked against the nbformat schema
+VALIDATE_ALWAYS = 'always'
+VALIDATE_FIRST_AND_LAST = 'first-and-last'
+VALIDATE_NEVER = 'never'
+VALIDATION_POLICIES = (VALIDATE_ALWAYS, VALIDATE_FIRST_AND_LAST, VALIDATE_NEVER)
+
+
+def check_validation_policy(validation_policy):
+    """Raises a PapermillException if `validation_policy` is not a known policy."""
+    if validation_policy not in VALIDATION_POLICIES:
+        raise PapermillException(
+            f"Unknown validation policy '{validation_policy}', choose one of {list(VALIDATION_POLICIES)}"
+        )
+    return validation_policy
+
+
+def upgrade_notebook(nb):
+    """Upgrades a notebook to the current v4 format, skipping notebooks that already are.
+
+    Args:
+        nb (nbformat.NotebookNode): Notebook object to upgrade, modified in place.
+
+    Returns:
+        nbformat.NotebookNode
+    """
+    if nb.get('nbformat') == nbformat.v4.nbformat and nb.get('nbformat_minor') == nbformat.v4.nbformat_minor:
+        return nb
+    nb_upgraded = nbformat.v4.upgrade(nb)
+    return nb if nb_upgraded is None else nb_upgraded
+
+
+def _validate_notebook(nb):
+    # Mirror nbformat, which logs rather than raises on invalid documents
+    try:
+        nbformat.validate(nb)
+    except ValidationError as e:
+        logger.error("Notebook JSON is invalid: %s", e)
+
+
+def notebook_loads(buf, validate=True):
+    """Parses a notebook document, upgrading it to the v4 format.
+
+    Args:
+        buf (str): JSON content of the notebook.
+        validate (bool): Whether to validate the notebook against the nbformat schema.
+
+    Returns:
+        nbformat.NotebookNode
+    """
+    nb_dict = get_json_backend().loads(buf)
+    major, minor = nbformat.reader.get_version(nb_dict)
+    if major != 4:
+        # Older formats go through the full nbformat conversion path
+        return nbformat.reads(buf, as_version=4)
+
+    nb = nbformat.v4.to_notebook_json(nb_dict, minor=minor)
+    if validate:
+        _validate_notebook(nb)
+    return nb
+
+
+def notebook_dumps(nb, compact=False, validate=True):
+    """Serializes a notebook document.
+
+    Args:
+        nb (nbformat.NotebookNode): Notebook object to serialize.
+        compact (bool): Skip indentation and the defensive copy used to split
+            multi-line strings, for fast intermediate saves.
+        validate (bool): Whether to validate the notebook against the nbformat schema.
+
+    Returns:
+        str
+    """
+    if validate:
+        _validate_notebook(nb)
+    if compact:
+        # Multi-line strings are valid notebook JSON either joined or split
+        return get_json_backend().dumps(nb, compact=True)
+    # don't modify in-memory notebook
+    return get_json_backend().dumps(strip_transient(split_lines(copy.deepcopy(nb))))
+
+
 # Hack to make YAML loader not auto-convert datetimes
 # https://stackoverflow.com/a/52312810
 class NoDatesSafeLoader(yaml.SafeLoader):
@@ -459,7 +931,7 @@ class NoDatesSafeLoader(yaml.SafeLoader):
 # Instantiate a PapermillIO instance and register Handlers.
 papermill_io = PapermillIO()
 papermill_io.register("local", LocalHandler())
-papermill_io.register("s3://", S3Handler)
+papermill_io.register("s3://", S3Handler())
 papermill_io.register("adl://", ADLHandler())
 papermill_io.register("abs://", ABSHandler())
 papermill_io.register("http://", HttpHandler)
@@ -469,6 +941,11 @@ papermill_io.register("hdfs://", HDFSHandler())
 papermill_io.register("http://github.com/", GithubHandler())
 papermill_io.register("https://github.com/", GithubHandler())
 papermill_io.register("-", StreamHandler())
+# Local files and streams have no transient errors, and stdin cannot be read twice
+papermill_io.set_retry_policy(None, "local")
+papermill_io.set_retry_policy(None, "-")
+# gcsfs retries each request, including the block reads and upload chunks, on its own
+papermill_io.set_retry_policy(None, "gs://")
 papermill_io.register_entry_points()
 
 
@@ -477,29 +954,38 @@ def read_yaml_file(path):
     return yaml.load(papermill_io.read(path, ['.json', '.yaml', '.yml']), Loader=NoDatesSafeLoader)
 
 
-def write_ipynb(nb, path):
+def write_ipynb(nb, path, compact=False, validate=True):
     """Saves a notebook object to the specified path.
     Args:
         nb_node (nbformat.NotebookNode): Notebook object to save.
         notebook_path (str): Path to save the notebook object to.
+        compact (bool): Write non-indented JSON, used for intermediate saves.
+        validate (bool): Whether to validate the notebook before saving.
+
+    Returns:
+        int: Number of bytes written.
     """
-    papermill_io.write(nbformat.writes(nb), path)
+    buf = notebook_dumps(nb, compact=compact, validate=validate)
+    written = papermill_io.write(buf, path)
+    if type(written) is int:
+        # Handlers encoding the document return the number of bytes they wrote
+        return written
+    # ASCII documents are as long as their UTF-8 encoding, which is then not computed again
+    return len(buf) if buf.isascii() else len(buf.encode('utf-8'))
 
 
-def load_notebook_node(notebook_path):
+def load_notebook_node(notebook_path, validate=True):
     """Returns a notebook object with papermill metadata loaded from the specified path.
 
     Args:
         notebook_path (str): Path to the notebook file.
+        validate (bool): Whether to validate the notebook against the nbformat schema.
 
     Returns:
         nbformat.NotebookNode
 
     """
-    nb = nbformat.reads(papermill_io.read(notebook_path), as_version=4)
-    nb_upgraded = nbformat.v4.upgrade(nb)
-    if nb_upgraded is not None:
-        nb = nb_upgraded
+    nb = upgrade_notebook(notebook_loads(papermill_io.read(notebook_path), validate=validate))
 
     if not hasattr(nb.metadata, 'papermill'):
         nb.metadata['papermill'] = {
@@ -519,9 +1005,10 @@ def load_notebook_node(notebook_path):
     return nb
 
 
-def list_notebook_files(path):
-    """Returns a list of all the notebook files in a directory."""
-    return [p for p in papermill_io.listdir(path) if p.endswith('.ipynb')]
+def list_notebook_files(path, recursive=False):
+    """Returns a list of all the notebook files in a directory, and its subdirectories if `recursive`."""
+    pattern = '**/*.ipynb' if recursive else '*.ipynb'
+    return [entry.path for entry in papermill_io.glob(f"{path.rstrip('/')}/{pattern}")]
 
 
 def get_pretty_path(path):
@@ -11,3 +11,13 @@ Parameter = namedtuple(
         'help',
     ],
 )
+
+FileEntry = namedtuple(
+    'FileEntry',
+    [
+        'path',  # full path of the file, including its scheme
+        'size',  # bytes, or None if unknown
+        'mtime',  # POSIX timestamp of the last modification, or None if unknown
+        'etag',  # version identifier from the storage, or None if it has none
+    ],
+)
@@ -0,0 +1,166 @@
+"""Offloading of large display outputs to external storage."""
+
+import hashlib
+import mimetypes
+
+from .exceptions import PapermillException
+from .iorw import load_notebook_node, papermill_io, write_ipynb
+from .log import logger
+
+# Mimetypes whose payloads are base64 encoded binary data inside notebooks
+BINARY_MIMETYPE_PREFIXES = ('image/', 'audio/', 'video/', 'application/pdf')
+TEXT_IMAGE_MIMETYPES = ('image/svg+xml',)
+
+# Output types that carry a mimebundle in their `data` field
+OFFLOADABLE_OUTPUT_TYPES = ('display_data', 'execute_result')
+
+
+def offload_directory(output_path):
+    """Return the sibling location where offloaded outputs for a notebook are stored.
+
+    Parameters
+    ----------
+    output_path : str
+        Path of the output notebook
+
+    Returns
+    -------
+    str
+        Location next to the output notebook, e.g. ``s3://bucket/out_files`` for ``s3://bucket/out.ipynb``
+    """
+    if not isinstance(output_path, str) or output_path == '-':
+        raise PapermillException(f"Outputs can not be offloaded next to output path: {output_path}")
+    base = output_path.split('?')[0]
+    if base.endswith('.ipynb'):
+        base = base[: -len('.ipynb')]
+    return f"{base}_files"
+
+
+def _is_binary_mimetype(mimetype):
+    return mimetype not in TEXT_IMAGE_MIMETYPES and mimetype.startswith(BINARY_MIMETYPE_PREFIXES)
+
+
+def _blob_name(digest, mimetype):
+    if _is_binary_mimetype(mimetype):
+        # The payload is kept base64 encoded so that text based io handlers can store it
+        return f"{digest}.b64"
+    return f"{digest}{mimetypes.guess_extension(mimetype) or '.txt'}"
+
+
+def offload_outputs(nb, output_path, threshold, written=None):
+    """Move display data larger than `threshold` bytes out of the notebook.
+
+    Each payload is written once, content-addressed by its sha256 digest, next
+    to the output notebook through the same `papermill_io` handler. The output
+    keeps a reference to the blob in ``output.metadata.papermill.offloaded``.
+
+    Parameters
+    ----------
+    nb : NotebookNode
+        Notebook whose outputs should be offloaded, modified in place
+    output_path : str
+        Path of the output notebook, used to derive the blob location
+    threshold : int
+        Minimum payload size in bytes for an output to be offloaded
+    written : set, optional
+        Blob paths already persisted, used to skip rewriting identical payloads
+
+    Returns
+    -------
+    nb : NotebookNode
+        The notebook with offloaded outputs replaced by references
+    """
+    if written is None:
+        written = set()
+    directory = None
+
+    for cell in nb.cells:
+        for output in cell.get('outputs', []):
+            if output.get('output_type') not in OFFLOADABLE_OUTPUT_TYPES:
+                continue
+            data = output.get('data', {})
+            for mimetype in list(data):
+                value = data[mimetype]
+                if isinstance(value, list):
+                    value = ''.join(value)
+                if not isinstance(value, str):
+                    # JSON mimebundles are structured values, leave them inline
+                    continue
+                payload = value.encode('utf-8')
+                if len(payload) < threshold:
+                    continue
+
+                if directory is None:
+                    directory = offload_directory(output_path)
+                    # Handlers without directories (object stores) don't need this step
+                    makedirs = getattr(papermill_io.get_handler(directory), 'makedirs', None)
+                    if makedirs is not None:
+                        makedirs(directory)
+                digest = hashlib.sha256(payload).hexdigest()
+                blob_path = f"{directory}/{_blob_name(digest, mimetype)}"
+                if blob_path not in written:
+                    papermill_io.write(value, blob_path, extensions=None)
+                    written.add(blob_path)
+
+                papermill_metadata = output.setdefault('metadata', {}).setdefault('papermill', {})
+                papermill_metadata.setdefault('offloaded', {})[mimetype] = {
+                    'path': blob_path,
+                    'sha256': digest,
+                    'size': len(payload),
+                }
+                del data[mimetype]
+                logger.debug(f"Offloaded {mimetype} output ({len(payload)} bytes) to {blob_path}")
+
+    return nb
+
+
+def rehydrate_outputs(nb):
+    """Restore outputs previously moved out of the notebook by `offload_outputs`.
+
+    Parameters
+    ----------
+    nb : NotebookNode
+        Notebook with offloaded output references, modified in place
+
+    Returns
+    -------
+    nb : NotebookNode
+        The notebook with all offloaded payloads inlined again
+    """
+    for cell in nb.cells:
+        for output in cell.get('outputs', []):
+            papermill_metadata = output.get('metadata', {}).get('papermill', {})
+            offloaded = papermill_metadata.get('offloaded')
+            if not offloaded:
+                continue
+            for mimetype, reference in offloaded.items():
+                value = papermill_io.read(reference['path'], extensions=None)
+                if hashlib.sha256(value.encode('utf-8')).hexdigest() != reference['sha256']:
+                    raise PapermillException(f"Offloaded output {reference['path']} does not match its digest")
+                output.setdefault('data', {})[mimetype] = value
+            del papermill_metadata['offloaded']
+            if not papermill_metadata:
+                del output.metadata['papermill']
+
+    return nb
+
+
+def rehydrate_notebook(notebook_path, output_path=None):
+    """Load a notebook, inline its offloaded outputs and optionally save the result.
+
+    Parameters
+    ----------
+    notebook_path : str
+        Path to a notebook written with offloaded outputs
+    output_path : str, optional
+        Path to write the rehydrated notebook to
+
+    Returns
+    -------
+    nb : NotebookNode
+        The rehydrated notebook
+    """
+    nb = rehydrate_outputs(load_notebook_node(notebook_path))
+    if output_path is not None:
+        write_ipynb(nb, output_path)
+    return nb
@@ -5,7 +5,7 @@ import nbformat
 
 from .engines import papermill_engines
 from .exceptions import PapermillMissingParameterException
-from .iorw import read_yaml_file
+from .iorw import read_yaml_file, upgrade_notebook
 from .log import logger
 from .translators import translate_parameters
 from .utils import find_first_tagged_cell_index
@@ -90,7 +90,7 @@ def parameterize_notebook(
     param_content = translate_parameters(kernel_name, language, parameters, comment)
 
     # Upgrade the Notebook to the latest v4 before writing into it
-    nb = nbformat.v4.upgrade(nb)
+    nb = upgrade_notebook(nb)
 
     newcell = nbformat.v4.new_code_cell(source=param_content)
     newcell.metadata['tags'] = ['injected-parameters']
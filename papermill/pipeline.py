@@ -0,0 +1,370 @@
+"""Run a pipeline of dependent notebooks described by a YAML spec."""
+
+import hashlib
+import json
+import threading
+import time
+from collections import namedtuple
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from pathlib import Path
+
+from .engines import papermill_engines
+from .exceptions import PapermillException
+from .execute import execute_notebook
+from .history import DurationHistory, longest_first
+from .iorw import papermill_io, read_yaml_file
+from .log import logger
+from .parameterize import parameterize_path
+
+# Keys of a stage spec which are not forwarded to `execute_notebook`
+STAGE_KEYS = ('input', 'output', 'parameters', 'depends_on')
+
+StageResult = namedtuple('StageResult', ['name', 'output_path', 'duration', 'skipped'])
+
+
+class Stage:
+    """A notebook execution in a pipeline.
+
+    Parameters
+    ----------
+    name : str
+        Unique name of the stage, used to reference its output path downstream
+    input_path : str
+        Path to the input notebook
+    output_path : str
+        Path to save the executed notebook, formatted with the stage parameters
+    parameters : dict, optional
+        Parameters of the notebook. String values are formatted with the output
+        paths of the upstream stages, e.g. ``'{extract}'``
+    depends_on : list of str, optional
+        Names of the stages to run before this one
+    **execute_kwargs
+        Keyword arguments passed to `execute_notebook`
+    """
+
+    def __init__(self, name, input_path, output_path, parameters=None, depends_on=None, **execute_kwargs):
+        self.name = name
+        self.input_path = input_path
+        self.output_path = output_path
+        self.parameters = parameters or {}
+        self.depends_on = list(depends_on or [])
+        self.execute_kwargs = execute_kwargs
+
+    def __repr__(self):
+        return f"Stage({self.name!r}, {self.input_path!r}, {self.output_path!r}, depends_on={self.depends_on!r})"
+
+    def resolve(self, upstream_outputs):
+        """Return the output path and parameters once upstream outputs are known."""
+        parameters = {
+            key: parameterize_path(value, upstream_outputs) if isinstance(value, str) else value
+            for key, value in self.parameters.items()
+        }
+        return parameterize_path(self.output_path, parameters), parameters
+
+
+class PipelineReport:
+    """Timings of a pipeline run and its critical path.
+
+    Attributes
+    ----------
+    stages : dict
+        `StageResult` of each stage which ran or was skipped, by name
+    wall_time : float
+        Duration of the whole run in seconds
+    critical_path : list of str
+        Chain of dependent stages with the longest total duration
+    critical_path_duration : float
+        Sum of the durations of the stages on the critical path
+    """
+
+    def __init__(self, pipeline, stages, wall_time):
+        self.stages = stages
+        self.wall_time = wall_time
+        self.critical_path, self.critical_path_duration = pipeline.critical_path(
+            {name: result.duration for name, result in stages.items()}
+        )
+
+    def format(self):
+        """Render the report as text."""
+        lines = [f"Pipeline finished in {self.wall_time:.2f}s"]
+        for name, result in self.stages.items():
+            status = 'skipped (unchanged)' if result.skipped else f'{result.duration:.2f}s'
+            lines.append(f"  {name}: {status}")
+        lines.append(
+            f"Critical path ({self.critical_path_duration:.2f}s): {' -> '.join(self.critical_path) or '(none)'}"
+        )
+        return '\n'.join(lines)
+
+
+class Pipeline:
+    """A set of notebook stages and the dependencies between them.
+
+    Parameters
+    ----------
+    stages : list of Stage
+        Stages of the pipeline
+    state_path : str, optional
+        JSON file recording the fingerprint of each successful stage. Stages
+        whose input notebook, parameters and upstream stages are unchanged since
+        the recorded run are skipped. Without it every stage always runs.
+    """
+
+    def __init__(self, stages, state_path=None):
+        self.stages = {}
+        for stage in stages:
+            if stage.name in self.stages:
+                raise PapermillException(f"Duplicate pipeline stage '{stage.name}'")
+            self.stages[stage.name] = stage
+        self.state_path = state_path
+        self.order = self._topological_order()
+
+    @classmethod
+    def from_spec(cls, spec, state_path=None):
+        """Build a pipeline from a spec dictionary or the path to a YAML spec.
+
+        The spec has a ``stages`` mapping of stage names to their ``input``,
+        ``output``, ``parameters``, ``depends_on`` and any other
+        `execute_notebook` keyword argument. Top level ``parameters`` are
+        shared by all stages.
+        """
+        if isinstance(spec, str):
+            spec = read_yaml_file(spec)
+        stage_specs = spec.get('stages') or {}
+        if not stage_specs:
+            raise PapermillException("Pipeline spec has no stages")
+
+        stages = []
+        for name, stage_spec in stage_specs.items():
+            missing = [key for key in ('input', 'output') if key not in stage_spec]
+            if missing:
+                raise PapermillException(f"Pipeline stage '{name}' is missing {', '.join(missing)}")
+            execute_kwargs = {key: value for key, value in stage_spec.items() if key not in STAGE_KEYS}
+            stages.append(
+                Stage(
+                    name,
+                    stage_spec['input'],
+                    stage_spec['output'],
+                    parameters={**spec.get('parameters', {}), **stage_spec.get('parameters', {})},
+                    depends_on=stage_spec.get('depends_on'),
+                    **execute_kwargs,
+                )
+            )
+        return cls(stages, state_path=state_path or spec.get('state_path'))
+
+    def _topological_order(self):
+        order = []
+        visiting = set()
+        visited = set()
+
+        def visit(name, chain):
+            if name in visited:
+                return
+            if name in visiting:
+                raise PapermillException(f"Pipeline has a dependency cycle: {' -> '.join(chain + [name])}")
+            visiting.add(name)
+            for dependency in self.stages[name].depends_on:
+                if dependency not in self.stages:
+                    raise PapermillException(f"Pipeline stage '{name}' depends on unknown stage '{dependency}'")
+                visit(dependency, chain + [name])
+            visiting.discard(name)
+            visited.add(name)
+            order.append(name)
+
+        for name in self.stages:
+            visit(name, [])
+        return order
+
+    def critical_path(self, durations):
+        """Find the chain of dependent stages with the longest total duration.
+
+        Parameters
+        ----------
+        durations : dict
+            Duration in seconds of each stage, missing stages count as 0
+
+        Returns
+        -------
+        tuple of (list of str, float)
+            Names of the stages on the critical path and its total duration
+        """
+        finish = {}
+        previous = {}
+        for name in self.order:
+            upstream = max(self.stages[name].depends_on, key=lambda dep: finish[dep], default=None)
+            finish[name] = durations.get(name, 0.0) + (finish[upstream] if upstream else 0.0)
+            previous[name] = upstream
+
+        end = max(finish, key=finish.get, default=None)
+        duration = finish[end] if end is not None else 0.0
+        path = []
+        while end is not None:
+            path.insert(0, end)
+            end = previous[end]
+        return path, duration
+
+    def load_state(self):
+        if self.state_path is None:
+            return {}
+        try:
+            return json.loads(papermill_io.read(self.state_path, extensions=None))
+        except (FileNotFoundError, ValueError):
+            return {}
+
+    def save_state(self, state):
+        if self.state_path is not None:
+            papermill_io.write(json.dumps(state, indent=1, sort_keys=True), self.state_path, extensions=None)
+
+    def fingerprint(self, stage, output_path, parameters, upstream_fingerprints):
+        """Digest of everything which determines the output of a stage."""
+        digest = hashlib.sha256()
+        digest.update(papermill_io.read(stage.input_path).encode('utf-8'))
+        digest.update(
+            json.dumps(
+                [output_path, parameters, stage.execute_kwargs, upstream_fingerprints], sort_keys=True, default=str
+            ).encode('utf-8')
+        )
+        return digest.hexdigest()
+
+    @staticmethod
+    def changes_process_cwd(stage, execute_kwargs):
+        """Whether the execution of `stage` changes the process working directory to its `cwd`."""
+        kwargs = {**execute_kwargs, **stage.execute_kwargs}
+        return kwargs.get('cwd') is not None and not papermill_engines.supports_cwd(kwargs.get('engine_name'))
+
+    @staticmethod
+    def output_exists(output_path):
+        """Whether the output notebook of a previous run is still stored at `output_path`."""
+        try:
+            return any(entry.path == output_path for entry in papermill_io.glob(output_path))
+        except PapermillException:
+            # Handlers unable to list their paths are read instead
+            try:
+                papermill_io.read(output_path)
+            except Exception:
+                return False
+            return True
+
+    def run(self, max_workers=None, force=False, **execute_kwargs):
+        """Execute the stages, running independent stages concurrently.
+
+        Parameters
+        ----------
+        max_workers : int, optional
+            Maximum number of stages running at once (default: number of stages)
+        force : bool, optional
+            Run every stage, even if it is unchanged since the last run and its
+            output notebook still exists
+        **execute_kwargs
+            Keyword arguments passed to `execute_notebook` for every stage,
+            overridden by the stage's own arguments. With a duration
+            ``history``, the stages ready to run are started longest expected
+            first.
+
+        Returns
+        -------
+        PipelineReport
+            Timings of the run
+
+        Raises
+        ------
+        Exception
+            The first error raised by a stage, once the stages already running
+            finished. No new stage is started after a failure.
+        """
+        execute_kwargs.setdefault('progress_bar', False)
+        history = execute_kwargs.get('history')
+        if isinstance(history, (str, Path)):
+            history = execute_kwargs['history'] = DurationHistory(history)
+        max_workers = max_workers or len(self.stages)
+        if max_workers > 1 and any(self.changes_process_cwd(stage, execute_kwargs) for stage in self.stages.values()):
+            logger.warning(
+                "Stages setting 'cwd' with an engine which doesn't support it change the process working directory, "
+                "use max_workers=1"
+            )
+
+        state = self.load_state()
+        state_lock = threading.Lock()
+        outputs = {}
+        fingerprints = {}
+        results = {}
+        pending = list(self.order)
+        running = {}
+        error = None
+        start = time.monotonic()
+
+        def run_stage(stage, output_path, parameters, fingerprint):
+            if not force and fingerprint is not None and state.get(stage.name) == fingerprint:
+                if self.output_exists(output_path):
+                    logger.info(f"Skipping unchanged pipeline stage '{stage.name}'")
+                    return StageResult(stage.name, output_path, 0.0, True)
+                logger.info(f"Output of pipeline stage '{stage.name}' is missing, running it again")
+            logger.info(f"Running pipeline stage '{stage.name}'")
+            stage_start = time.monotonic()
+            execute_notebook(stage.input_path, output_path, parameters, **{**execute_kwargs, **stage.execute_kwargs})
+            if fingerprint is not None:
+                with state_lock:
+                    state[stage.name] = fingerprint
+                    self.save_state(state)
+            return StageResult(stage.name, output_path, time.monotonic() - stage_start, False)
+
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            while running or (pending and error is None):
+                # Submit every stage whose upstream stages all finished
+                ready = [
+                    name
+                    for name in (pending if error is None else [])
+                    if all(dependency in results for dependency in self.stages[name].depends_on)
+                ]
+                if history is not None:
+                    ready = longest_first(ready, history, input_path=lambda name: self.stages[name].input_path)
+                for name in ready:
+                    stage = self.stages[name]
+                    pending.remove(name)
+                    output_path, parameters = stage.resolve({dep: outputs[dep] for dep in stage.depends_on})
+                    outputs[name] = output_path
+                    fingerprints[name] = None
+                    if self.state_path is not None:
+                        fingerprints[name] = self.fingerprint(
+                            stage, output_path, parameters, [fingerprints[dep] for dep in stage.depends_on]
+                        )
+                    running[executor.submit(run_stage, stage, output_path, parameters, fingerprints[name])] = name
+
+                done, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in done:
+                    name = running.pop(future)
+                    try:
+                        results[name] = future.result()
+                    except Exception as e:
+                        logger.error(f"Pipeline stage '{name}' failed")
+                        error = error or e
+
+        report = PipelineReport(self, results, time.monotonic() - start)
+        logger.info(report.format())
+        if error is not None:
+            raise error
+        return report
+
+
+def run_pipeline(spec, max_workers=None, state_path=None, force=False, **execute_kwargs):
+    """Run the notebooks of a pipeline spec in dependency order.
+
+    Parameters
+    ----------
+    spec : str or dict
+        Path to a YAML pipeline spec, or its parsed content
+    max_workers : int, optional
+        Maximum number of stages running at once
+    state_path : str, optional
+        JSON file used to skip stages unchanged since their last successful run
+    force : bool, optional
+        Run every stage, even if it is unchanged since the last run
+    **execute_kwargs
+        Keyword arguments passed to `execute_notebook` for every stage
+
+    Returns
+    -------
+    PipelineReport
+        Timings of the run
+    """
+    pipeline = Pipeline.from_spec(spec, state_path=state_path)
+    return pipeline.run(max_workers=max_workers, force=force, **execute_kwargs)
@@ -0,0 +1,108 @@
+"""Start kernels while the input notebook is loaded and parameterized."""
+
+import os
+import threading
+
+from nbclient.util import run_sync
+
+from .engines import papermill_engines
+from .log import logger
+
+
+class KernelPrestart:
+    """Kernel started in a background thread, handed to the engine once the notebook is ready.
+
+    Loading a remote notebook and starting a kernel each take seconds. Starting
+    the kernel as soon as its name is known overlaps the two. The kernel is
+    shut down when leaving the context, whether or not the engine used it.
+
+    Parameters
+    ----------
+    engine_name : str
+        Name of the execution engine, which creates the kernel manager
+    cwd : str, optional
+        Working directory of the kernel (default: the current directory)
+    enabled : bool, optional
+        Whether to start a kernel at all, otherwise `start` does nothing
+    **start_kwargs
+        Keyword arguments of the kernel manager's ``start_kernel``
+    """
+
+    def __init__(self, engine_name, cwd=None, enabled=True, **start_kwargs):
+        self.engine_name = engine_name
+        self.cwd = cwd
+        self.enabled = enabled
+        self.start_kwargs = start_kwargs
+        self.kernel_name = None
+        self.km = None
+        self._thread = None
+        self._error = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.shutdown()
+
+    @property
+    def started(self):
+        return self._thread is not None
+
+    def start(self, kernel_name):
+        """Start a `kernel_name` kernel in the background, unless one was already started."""
+        if not self.enabled or self.started:
+            return
+        self.km = papermill_engines.kernel_manager(self.engine_name, kernel_name)
+        if self.km is None:
+            # The engine starts its own kernels
+            self.enabled = False
+            return
+        self.kernel_name = kernel_name
+        # The engine runs in `cwd`, resolve it before the current directory changes
+        cwd = os.path.abspath(self.cwd) if self.cwd else os.getcwd()
+        self._thread = threading.Thread(target=self._start, args=(cwd,), name='papermill-kernel-prestart', daemon=True)
+        self._thread.start()
+
+    def start_for_notebook(self, nb, kernel_name=None):
+        """Start the kernel named by `kernel_name` or the notebook metadata, if it names one."""
+        if not self.enabled or self.started:
+            return
+        try:
+            kernel_name = papermill_engines.nb_kernel_name(engine_name=self.engine_name, nb=nb, name=kernel_name)
+        except ValueError:
+            # Reported by the execution itself
+            return
+        self.start(kernel_name)
+
+    def _start(self, cwd):
+        try:
+            run_sync(self.km.start_kernel)(cwd=cwd, **self.start_kwargs)
+        except Exception as e:
+            self._error = e
+
+    def kernel_manager(self, kernel_name):
+        """Wait for the kernel to start and return its manager, None if no `kernel_name` kernel was started.
+
+        Raises the error of a failed start, which the engine would have
+        raised starting the kernel itself.
+        """
+        if not self.started:
+            return None
+        self._thread.join()
+        if self._error is not None:
+            raise self._error
+        if kernel_name != self.kernel_name:
+            logger.warning(f"Not using the prestarted '{self.kernel_name}' kernel to execute with '{kernel_name}'")
+            self.shutdown()
+            return None
+        return self.km
+
+    def shutdown(self):
+        """Shut down the kernel, waiting for it to start first."""
+        if not self.started:
+            return
+        self._thread.join()
+        km, self.km, self._thread = self.km, None, None
+        if km.has_kernel:
+            run_sync(km.shutdown_kernel)()
+        run_sync(km.cleanup_resources)()
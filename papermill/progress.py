@@ -0,0 +1,193 @@
+"""Progress bars and machine-readable progress streams of notebook executions."""
+
+import json
+import os
+import sys
+import time
+
+import entrypoints
+
+from .exceptions import PapermillException
+
+
+class PapermillProgressBars:
+    '''
+    The holder which houses any progress bar registered with the system.
+    This object is used in a singleton manner to save and load particular
+    named progress bar factories for reference externally.
+
+    A progress bar factory is called with tqdm's ``total``, ``unit`` and
+    ``desc`` keyword arguments and returns an object providing the subset of
+    the tqdm interface used by papermill: the ``n`` and ``total`` attributes
+    and the ``update``, ``set_description``, ``refresh`` and ``close`` methods.
+    '''
+
+    def __init__(self):
+        self._progress_bars = {}
+
+    def register(self, name, progress_bar):
+        self._progress_bars[name] = progress_bar
+
+    def register_entry_points(self):
+        """Register entrypoints for a progress bar
+
+        Load progress bars provided by other packages
+        """
+        for entrypoint in entrypoints.get_group_all("papermill.progress_bar"):
+            self.register(entrypoint.name, entrypoint.load())
+
+    def get_progress_bar(self, name):
+        if name not in self._progress_bars:
+            raise PapermillException(
+                f"No progress bar named '{name}', available: {', '.join(sorted(self._progress_bars))}"
+            )
+        return self._progress_bars[name]
+
+
+def tqdm_progress_bar(**kwargs):
+    """A tqdm progress bar, rendered as a widget when running inside IPython.
+
+    ``tqdm.auto`` imports IPython to detect notebooks, which is slow. Outside of
+    an IPython process IPython was never imported, so the plain terminal bar is
+    used without paying for the import.
+    """
+    if 'IPython' in sys.modules:
+        from tqdm.auto import tqdm
+    else:
+        from tqdm.std import tqdm
+    return tqdm(**kwargs)
+
+
+def format_seconds(seconds):
+    """Format a duration as ``[H:]MM:SS``."""
+    minutes, seconds = divmod(int(seconds), 60)
+    hours, minutes = divmod(minutes, 60)
+    return f"{hours:d}:{minutes:02d}:{seconds:02d}" if hours else f"{minutes:02d}:{seconds:02d}"
+
+
+class TerminalProgressBar:
+    """Lightweight single line progress bar.
+
+    Imports nothing and redraws at most every `mininterval` seconds, however
+    often it is updated. Implements the subset of the tqdm interface papermill
+    uses.
+
+    Parameters
+    ----------
+    total : float
+        Number of units to complete
+    unit : str, optional
+        Name of the units counted
+    desc : str, optional
+        Prefix of the line
+    file : file-like, optional
+        Where to draw the bar (default: stderr)
+    mininterval : float, optional
+        Minimum seconds between redraws
+    """
+
+    def __init__(self, total, unit="it", desc=None, file=None, mininterval=0.5):
+        self.total = total
+        self.unit = unit
+        self.desc = desc
+        self.file = file if file is not None else sys.stderr
+        self.mininterval = mininterval
+        self.n = 0
+        self.start_t = time.monotonic()
+        self.last_print_t = None
+        self.last_len = 0
+        self.closed = False
+
+    def __repr__(self):
+        return self.format_line()
+
+    def format_line(self):
+        elapsed = time.monotonic() - self.start_t
+        line = f"{self.desc}: " if self.desc else ""
+        if self.total:
+            line += f"{min(self.n / self.total, 1):4.0%} "
+        line += f"{self.n:g}/{self.total:g} {self.unit} [{format_seconds(elapsed)}"
+        if self.total and self.n:
+            line += f"<{format_seconds(max(self.total - self.n, 0) * elapsed / self.n)}"
+        return line + "]"
+
+    def update(self, n=1):
+        self.n += n
+        self.refresh(force=False)
+
+    def set_description(self, desc=None, refresh=True):
+        self.desc = desc
+        if refresh:
+            self.refresh(force=False)
+
+    def refresh(self, force=True):
+        """Redraw the bar, unless it was drawn less than `mininterval` ago and `force` is False."""
+        now = time.monotonic()
+        if self.closed or (not force and self.last_print_t is not None and now - self.last_print_t < self.mininterval):
+            return
+        self.last_print_t = now
+        line = self.format_line()
+        # Pad with spaces to erase the end of a longer previous line
+        self.file.write(f"\r{line}{' ' * max(self.last_len - len(line), 0)}")
+        self.file.flush()
+        self.last_len = len(line)
+
+    def close(self):
+        if self.closed:
+            return
+        self.refresh()
+        self.file.write("\n")
+        self.file.flush()
+        self.closed = True
+
+
+class ProgressStream:
+    """Stream of execution events as JSON lines, for orchestration systems.
+
+    Each line is a JSON object with the ``event`` (``notebook_start``,
+    ``cell_start``, ``cell_complete`` or ``notebook_complete``), the input
+    ``notebook``, the ``cell_index`` and ``status`` of the cell, the ``total``
+    number of cells, the ``elapsed`` seconds since the notebook started and
+    the ``eta``, seconds expected before it completes (None until it can be
+    estimated).
+
+    Parameters
+    ----------
+    target : int or str or Path or file-like
+        A file descriptor, such as a pipe opened by the orchestrator, a path
+        appended to, or an open text file
+    """
+
+    def __init__(self, target):
+        if isinstance(target, os.PathLike):
+            target = str(target)
+        # Relative paths are opened during the execution, possibly in another working directory
+        self.target = os.path.abspath(target) if isinstance(target, str) else target
+        self._file = None
+
+    def __repr__(self):
+        return f"ProgressStream({self.target!r})"
+
+    def emit(self, event, **fields):
+        line = json.dumps({"event": event, **fields}) + "\n"
+        if isinstance(self.target, int):
+            # A single unbuffered write per line, pipe readers never see partial events
+            os.write(self.target, line.encode())
+            return
+        if self._file is None:
+            self._file = open(self.target, "a") if isinstance(self.target, str) else self.target
+        self._file.write(line)
+        self._file.flush()
+
+    def close(self):
+        """Close the file opened for a path target; the stream reopens it on the next event."""
+        if self._file is not None and self._file is not self.target:
+            self._file.close()
+        self._file = None
+
+
+# Instantiate a PapermillProgressBars instance, register progress bars and entrypoints
+papermill_progress_bars = PapermillProgressBars()
+papermill_progress_bars.register("tqdm", tqdm_progress_bar)
+papermill_progress_bars.register("terminal", TerminalProgressBar)
+papermill_progress_bars.register_entry_points()
@@ -0,0 +1,132 @@
+"""Resource usage of the kernel process tree during cell executions."""
+
+import threading
+
+from .exceptions import missing_dependency_generator
+
+try:
+    import psutil
+except ImportError:
+    psutil = None
+
+
+def kernel_pid(km):
+    """Process id of a kernel started locally by `km`, None if the kernel runs elsewhere."""
+    provisioner = getattr(km, 'provisioner', None)
+    return getattr(provisioner, 'pid', None)
+
+
+class ResourceSample:
+    """Resource usage of a process tree at one point in time."""
+
+    __slots__ = ('rss', 'cpu_time', 'open_files')
+
+    def __init__(self, rss=0, cpu_time=0.0, open_files=0):
+        self.rss = rss
+        self.cpu_time = cpu_time
+        self.open_files = open_files
+
+
+class ResourceSampler:
+    """Samples the resident memory, CPU time and open file descriptors of a
+    kernel's process tree.
+
+    A background thread samples every `interval` seconds between `cell_start`
+    and `cell_complete` to catch the memory peak of a cell, which may be gone
+    by the time it completes. CPU time and open files are compared between the
+    start and the end of each cell.
+
+    Parameters
+    ----------
+    pid : int
+        Process id of the kernel
+    interval : float
+        Seconds between samples while a cell runs
+    """
+
+    def __init__(self, pid, interval):
+        if psutil is None:
+            missing_dependency_generator("psutil", "resources")()
+        self.process = psutil.Process(pid)
+        self.interval = interval
+        self._lock = threading.Lock()
+        self._cell_running = threading.Event()
+        self._stopped = threading.Event()
+        self._thread = None
+        self._start = None
+        self._peak = None
+        self.totals = {'peak_rss': 0, 'cpu_time': 0.0, 'peak_open_files': 0}
+
+    def sample(self):
+        """Sum the usage of the kernel and its children, skipping processes which exited meanwhile."""
+        total = ResourceSample()
+        try:
+            processes = [self.process, *self.process.children(recursive=True)]
+        except psutil.NoSuchProcess:
+            return total
+        for process in processes:
+            try:
+                with process.oneshot():
+                    total.rss += process.memory_info().rss
+                    cpu_times = process.cpu_times()
+                    total.cpu_time += cpu_times.user + cpu_times.system
+                    total.open_files += process.num_fds() if hasattr(process, 'num_fds') else process.num_handles()
+            except (psutil.NoSuchProcess, psutil.AccessDenied):
+                continue
+        return total
+
+    def _record_peak(self, sample):
+        with self._lock:
+            if self._peak is not None:
+                self._peak.rss = max(self._peak.rss, sample.rss)
+                self._peak.open_files = max(self._peak.open_files, sample.open_files)
+
+    def _run(self):
+        while not self._stopped.is_set():
+            self._cell_running.wait()
+            if self._stopped.wait(self.interval):
+                break
+            if self._cell_running.is_set():
+                self._record_peak(self.sample())
+
+    def start(self):
+        self._thread = threading.Thread(target=self._run, name='papermill-resource-sampler', daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stopped.set()
+        # Release the thread waiting for a cell to start
+        self._cell_running.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def cell_start(self):
+        sample = self.sample()
+        with self._lock:
+            self._start = sample
+            self._peak = ResourceSample(sample.rss, sample.cpu_time, sample.open_files)
+        self._cell_running.set()
+
+    def cell_complete(self):
+        """Stop sampling the cell, returning its peak and delta usage."""
+        self._cell_running.clear()
+        end = self.sample()
+        self._record_peak(end)
+        with self._lock:
+            start, peak = self._start, self._peak
+            self._start = self._peak = None
+        if start is None:
+            return None
+        usage = {
+            'peak_rss': peak.rss,
+            'rss_delta': end.rss - start.rss,
+            # CPU time of children which exited during the cell is not counted
+            'cpu_time': round(max(end.cpu_time - start.cpu_time, 0.0), 3),
+            'peak_open_files': peak.open_files,
+            'open_files_delta': end.open_files - start.open_files,
+        }
+        self.totals['peak_rss'] = max(self.totals['peak_rss'], usage['peak_rss'])
+        self.totals['cpu_time'] = round(self.totals['cpu_time'] + usage['cpu_time'], 3)
+        self.totals['peak_open_files'] = max(self.totals['peak_open_files'], usage['peak_open_files'])
+        return usage
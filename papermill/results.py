@@ -0,0 +1,313 @@
+"""Capture of scalar results recorded by notebooks and their storage in a results table."""
+
+import ast
+import csv
+import io
+import json
+import os
+import sqlite3
+import time
+import uuid
+from contextlib import contextmanager
+
+from .exceptions import PapermillException, missing_dependency_generator
+from .log import logger
+
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+    import msvcrt
+
+try:
+    import pyarrow
+    import pyarrow.parquet
+except ImportError:
+    pyarrow = None
+
+# Mimetype of the display data emitted by `record`
+RESULT_MIMETYPE = 'application/papermill.record+json'
+# Mimetype of the display data emitted by scrapbook's `glue`
+SCRAPBOOK_MIMETYPE = 'application/scrapbook.scrap.json+json'
+# Cells with this tag have their execute result captured
+RESULTS_TAG = 'results'
+
+SQLITE_TABLE = 'results'
+# Empty part file of a parquet results dataset holding the schema of all its runs
+PARQUET_SCHEMA_PART = 'part-0-schema.parquet'
+
+
+def record(name, value):
+    """Record a named value from inside a running notebook.
+
+    The value is sent to papermill as display data and stored in the output
+    notebook metadata under ``metadata.papermill.results``.
+
+    Parameters
+    ----------
+    name : str
+        Name of the result, used as column name in results tables
+    value : JSON serializable object
+        Value of the result, usually a scalar
+    """
+    # lazy import as this is only available inside a kernel
+    from IPython.display import display
+
+    display({RESULT_MIMETYPE: {'name': name, 'value': value}}, raw=True)
+
+
+def _parse_text(text):
+    try:
+        return ast.literal_eval(text)
+    except (ValueError, SyntaxError):
+        return text
+
+
+def extract_results(output, cell, cell_index=None):
+    """Find the results carried by a cell output.
+
+    Parameters
+    ----------
+    output : NotebookNode
+        Output produced by the cell
+    cell : NotebookNode
+        Cell which produced the output
+    cell_index : int, optional
+        Index of the cell, naming results of tagged cells which have neither
+        a ``result_name`` metadata entry nor a cell id
+
+    Returns
+    -------
+    list of (str, object)
+        Names and values of the results in the output
+    """
+    data = output.get('data', {})
+    if output.get('output_type') == 'display_data':
+        if RESULT_MIMETYPE in data:
+            return [(data[RESULT_MIMETYPE]['name'], data[RESULT_MIMETYPE]['value'])]
+        scrap = data.get(SCRAPBOOK_MIMETYPE)
+        if scrap and scrap.get('encoder') == 'json':
+            return [(scrap['name'], scrap['data'])]
+    elif output.get('output_type') == 'execute_result' and RESULTS_TAG in cell.metadata.get('tags', []):
+        name = cell.metadata.get('result_name') or cell.get('id') or f'cell_{cell_index}'
+        if 'application/json' in data:
+            return [(name, data['application/json'])]
+        if 'text/plain' in data:
+            text = data['text/plain']
+            return [(name, _parse_text(''.join(text) if isinstance(text, list) else text))]
+    return []
+
+
+def results_row(nb):
+    """Build the results table row of an executed notebook.
+
+    Parameters
+    ----------
+    nb : NotebookNode
+        Executed notebook
+
+    Returns
+    -------
+    dict
+        Input and output paths, parameters and recorded results of the run
+    """
+    papermill_metadata = nb.metadata.get('papermill', {})
+    row = {
+        'input_path': papermill_metadata.get('input_path'),
+        'output_path': papermill_metadata.get('output_path'),
+    }
+    row.update(papermill_metadata.get('parameters', {}))
+    row.update(papermill_metadata.get('results', {}))
+    return {
+        name: value if value is None or isinstance(value, (bool, int, float, str)) else json.dumps(value)
+        for name, value in row.items()
+    }
+
+
+@contextmanager
+def _locked(f):
+    """Hold an exclusive lock of the open file `f`, waiting for other processes to release it."""
+    if fcntl is not None:
+        fcntl.flock(f.fileno(), fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            # Written before the next holder of the lock reads the file
+            f.flush()
+            fcntl.flock(f.fileno(), fcntl.LOCK_UN)
+    else:
+        # Windows locks byte ranges, the first byte stands for the whole file
+        f.seek(0)
+        msvcrt.locking(f.fileno(), msvcrt.LK_LOCK, 1)
+        try:
+            yield
+        finally:
+            f.flush()
+            f.seek(0)
+            msvcrt.locking(f.fileno(), msvcrt.LK_UNLCK, 1)
+
+
+def _append_csv(path, row):
+    # Runs appending to the same table concurrently are serialized by the lock
+    with open(path, 'a+', newline='', encoding='utf-8') as f, _locked(f):
+        f.seek(0)
+        columns = next(csv.reader(f), [])
+        new_columns = [column for column in row if column not in columns]
+        if columns and not new_columns:
+            # Written at once, in append mode, so readers never see part of a row
+            line = io.StringIO()
+            csv.DictWriter(line, fieldnames=columns).writerow(row)
+            f.write(line.getvalue())
+            return
+
+        # New columns require rewriting the header and the existing rows
+        f.seek(0)
+        rows = list(csv.DictReader(f)) if columns else []
+        f.seek(0)
+        f.truncate()
+        writer = csv.DictWriter(f, fieldnames=columns + new_columns)
+        writer.writeheader()
+        writer.writerows(rows)
+        writer.writerow(row)
+
+
+def _quote_identifier(name):
+    return '"{}"'.format(name.replace('"', '""'))
+
+
+def _append_sqlite(path, row):
+    conn = sqlite3.connect(path)
+    try:
+        with conn:
+            conn.execute(f'CREATE TABLE IF NOT EXISTS {SQLITE_TABLE} (input_path, output_path)')
+            existing = {info[1] for info in conn.execute(f'PRAGMA table_info({SQLITE_TABLE})')}
+            for column in row:
+                if column not in existing:
+                    conn.execute(f'ALTER TABLE {SQLITE_TABLE} ADD COLUMN {_quote_identifier(column)}')
+            columns = ', '.join(_quote_identifier(column) for column in row)
+            placeholders = ', '.join('?' for _ in row)
+            conn.execute(f'INSERT INTO {SQLITE_TABLE} ({columns}) VALUES ({placeholders})', list(row.values()))
+    finally:
+        conn.close()
+
+
+def _widen_field(field, other):
+    """Type holding the values of both fields, strings when they have no common type."""
+    try:
+        schemas = [pyarrow.schema([field]), pyarrow.schema([other])]
+        return pyarrow.unify_schemas(schemas, promote_options='permissive')[0]
+    except (pyarrow.ArrowInvalid, pyarrow.ArrowTypeError):
+        return pyarrow.field(field.name, pyarrow.string())
+
+
+def _widen_schema(schema, other):
+    fields = {field.name: field for field in schema}
+    for field in other:
+        fields[field.name] = _widen_field(fields[field.name], field) if field.name in fields else field
+    return pyarrow.schema(list(fields.values()))
+
+
+def _parquet_schema(path, schema_path):
+    if os.path.exists(schema_path):
+        return pyarrow.parquet.read_schema(schema_path)
+    # Datasets written before the schema part existed are widened from all their parts once
+    schema = pyarrow.schema([])
+    for name in sorted(os.listdir(path)):
+        if name.endswith('.parquet') and not name.startswith(('.', '_')):
+            schema = _widen_schema(schema, pyarrow.parquet.read_schema(os.path.join(path, name)))
+    return schema
+
+
+def _write_parquet(table, directory, name):
+    # Files starting with '.' are ignored by readers until they are complete
+    tmp_path = os.path.join(directory, f".{name}.{uuid.uuid4().hex[:8]}")
+    pyarrow.parquet.write_table(table, tmp_path)
+    os.replace(tmp_path, os.path.join(directory, name))
+
+
+def _append_parquet(path, row):
+    if pyarrow is None:
+        missing_dependency_generator("pyarrow", "parquet")()
+    if os.path.isfile(path):
+        # Tables of single files are moved into the dataset directory once
+        legacy_path = f"{path}.{uuid.uuid4().hex[:8]}"
+        os.replace(path, legacy_path)
+        os.makedirs(path, exist_ok=True)
+        os.replace(legacy_path, os.path.join(path, f"part-{0:020d}-legacy.parquet"))
+    os.makedirs(path, exist_ok=True)
+
+    # Columns of None values only have no type yet, their parts leave them out and read as nulls
+    table = pyarrow.Table.from_pylist([row])
+    table = table.select([field.name for field in table.schema if not pyarrow.types.is_null(field.type)])
+
+    # Runs appending to the same table concurrently are serialized by the lock
+    with open(os.path.join(path, '.lock'), 'a+') as lock, _locked(lock):
+        # Readers take the schema of the first part file: an empty part sorting before
+        # the runs' parts carries the columns of every run, widened to fit all their values
+        schema_path = os.path.join(path, PARQUET_SCHEMA_PART)
+        schema = _parquet_schema(path, schema_path)
+        widened = _widen_schema(schema, table.schema)
+        if not widened.equals(schema) or not os.path.exists(schema_path):
+            _write_parquet(widened.empty_table(), path, PARQUET_SCHEMA_PART)
+
+        # Parquet files can't be appended to, each run adds a part file to the dataset,
+        # named to sort in the order of the runs
+        columns = [
+            table.column(field.name).cast(field.type)
+            if field.name in table.column_names
+            else pyarrow.nulls(1, field.type)
+            for field in widened
+        ]
+        name = f"part-{time.time_ns():020d}-{uuid.uuid4().hex[:8]}.parquet"
+        _write_parquet(pyarrow.Table.from_arrays(columns, schema=widened), path, name)
+
+
+RESULTS_WRITERS = {
+    '.csv': _append_csv,
+    '.db': _append_sqlite,
+    '.sqlite': _append_sqlite,
+    '.sqlite3': _append_sqlite,
+    '.parquet': _append_parquet,
+}
+
+
+def get_results_writer(results_path):
+    """Return the function appending rows to the results table at `results_path`.
+
+    Raises
+    ------
+    PapermillException
+        If the extension of `results_path` is not a supported table format
+    """
+    writer = RESULTS_WRITERS.get(os.path.splitext(results_path)[1].lower())
+    if writer is None:
+        raise PapermillException(
+            f"Unsupported results table format for {results_path}, use one of {sorted(RESULTS_WRITERS)}"
+        )
+    return writer
+
+
+def append_results(results_path, nb):
+    """Append the parameters and results of an executed notebook to a results table.
+
+    The table format is chosen from the file extension: ``.csv``, ``.parquet``
+    or ``.db``/``.sqlite``/``.sqlite3`` for a SQLite ``results`` table. Columns
+    are added as new parameters or results appear. CSV appends lock the file,
+    and a ``.parquet`` table is a dataset directory with a part file per run.
+
+    Parameters
+    ----------
+    results_path : str
+        Local path of the results table
+    nb : NotebookNode
+        Executed notebook
+
+    Returns
+    -------
+    dict
+        The row appended to the table
+    """
+    row = results_row(nb)
+    get_results_writer(results_path)(results_path, row)
+    logger.debug(f"Appended results to {results_path}")
+    return row
@@ -0,0 +1,274 @@
+"""Retry policy shared by the I/O handlers."""
+
+import errno
+import random
+import threading
+import time
+from collections import defaultdict, deque
+
+import requests
+
+from .exceptions import PapermillRateLimitException
+from .log import logger
+
+try:
+    from botocore.exceptions import ClientError as BotoClientError
+    from botocore.exceptions import ConnectionError as BotoConnectionError
+    from botocore.exceptions import HTTPClientError as BotoHTTPClientError
+    from botocore.exceptions import IncompleteReadError as BotoIncompleteReadError
+except ImportError:
+    BotoClientError = BotoConnectionError = BotoHTTPClientError = BotoIncompleteReadError = None
+
+try:
+    from azure.core.exceptions import HttpResponseError as AzureHttpResponseError
+    from azure.core.exceptions import ResourceNotFoundError as AzureResourceNotFoundError
+    from azure.core.exceptions import ServiceRequestError as AzureServiceRequestError
+except ImportError:
+    AzureHttpResponseError = AzureResourceNotFoundError = AzureServiceRequestError = None
+
+# HTTP statuses of throttled requests and transient server errors
+RETRIABLE_STATUS_CODES = frozenset([408, 429, 500, 502, 503, 504])
+RETRIABLE_AWS_ERROR_CODES = frozenset(
+    [
+        'RequestTimeout',
+        'RequestTimeoutException',
+        'SlowDown',
+        'Throttling',
+        'ThrottlingException',
+        'RequestLimitExceeded',
+        'TooManyRequestsException',
+        'InternalError',
+        'ServiceUnavailable',
+    ]
+)
+# errno of transient HDFS failures raised by pyarrow. libhdfs reports the Java exceptions
+# it has no errno for, like socket timeouts and lost datanodes, as 255.
+RETRIABLE_HDFS_ERRNOS = frozenset([errno.EIO, errno.EAGAIN, errno.EBUSY, errno.EINTR, 255])
+# Error codes of S3 requests for missing keys
+NOT_FOUND_AWS_ERROR_CODES = frozenset(['404', 'NoSuchKey', 'NotFound'])
+
+
+def is_retriable_http(error):
+    if isinstance(error, (requests.ConnectionError, requests.Timeout)):
+        return True
+    if isinstance(error, requests.HTTPError) and error.response is not None:
+        return error.response.status_code in RETRIABLE_STATUS_CODES
+    return None
+
+
+def is_retriable_s3(error):
+    if BotoConnectionError is not None and isinstance(
+        error, (BotoConnectionError, BotoHTTPClientError, BotoIncompleteReadError)
+    ):
+        return True
+    if BotoClientError is not None and isinstance(error, BotoClientError):
+        code = error.response.get('Error', {}).get('Code')
+        status = error.response.get('ResponseMetadata', {}).get('HTTPStatusCode')
+        return code in RETRIABLE_AWS_ERROR_CODES or status in RETRIABLE_STATUS_CODES
+    return None
+
+
+def is_retriable_azure(error):
+    if AzureServiceRequestError is not None and isinstance(error, AzureServiceRequestError):
+        return True
+    if AzureHttpResponseError is not None and isinstance(error, AzureHttpResponseError):
+        return error.status_code in RETRIABLE_STATUS_CODES
+    return None
+
+
+def is_retriable_hdfs(error):
+    if isinstance(error, OSError) and error.errno is not None:
+        return error.errno in RETRIABLE_HDFS_ERRNOS
+    return None
+
+
+def is_retriable_generic(error):
+    if isinstance(error, (PapermillRateLimitException, ConnectionError, TimeoutError)):
+        return True
+    return None
+
+
+# Per backend classifiers, each returning None for errors of other backends. The GCS
+# handler raises PapermillRateLimitException for the errors gcsfs deems retriable.
+retry_classifiers = [is_retriable_generic, is_retriable_http, is_retriable_s3, is_retriable_azure, is_retriable_hdfs]
+
+
+def is_retriable(error):
+    """Whether an I/O error is transient, like throttling, a timeout or a dropped connection.
+
+    Parameters
+    ----------
+    error : Exception
+        Error raised by an I/O handler
+
+    Returns
+    -------
+    bool
+    """
+    for classify in retry_classifiers:
+        retriable = classify(error)
+        if retriable is not None:
+            return retriable
+    return False
+
+
+def is_not_found(error):
+    """Whether an I/O error reports a missing file, which is never retried.
+
+    Parameters
+    ----------
+    error : Exception
+        Error raised by an I/O handler
+
+    Returns
+    -------
+    bool
+    """
+    if isinstance(error, FileNotFoundError):
+        return True
+    if isinstance(error, requests.HTTPError) and error.response is not None:
+        return error.response.status_code == 404
+    if BotoClientError is not None and isinstance(error, BotoClientError):
+        code = error.response.get('Error', {}).get('Code')
+        status = error.response.get('ResponseMetadata', {}).get('HTTPStatusCode')
+        return code in NOT_FOUND_AWS_ERROR_CODES or status == 404
+    if AzureHttpResponseError is not None and isinstance(error, AzureHttpResponseError):
+        return isinstance(error, AzureResourceNotFoundError) or error.status_code == 404
+    return False
+
+
+class RetryBudget:
+    """Caps retries to a share of the recent calls, so throttled storage does
+    not get more requests from the retries on top of the original ones.
+
+    Parameters
+    ----------
+    ratio : float
+        Retries allowed per call made in the window
+    minimum : int
+        Retries allowed in the window regardless of the number of calls
+    window : float
+        Seconds over which calls and retries are counted
+    """
+
+    def __init__(self, ratio=0.2, minimum=10, window=60.0):
+        self.ratio = ratio
+        self.minimum = minimum
+        self.window = window
+        self._calls = deque()
+        self._retries = deque()
+        self._lock = threading.Lock()
+
+    def _expire(self, now):
+        for events in (self._calls, self._retries):
+            while events and events[0] <= now - self.window:
+                events.popleft()
+
+    def record_call(self):
+        with self._lock:
+            now = time.monotonic()
+            self._expire(now)
+            self._calls.append(now)
+
+    def acquire(self):
+        """Spend a retry, returning False if the budget is exhausted."""
+        with self._lock:
+            now = time.monotonic()
+            self._expire(now)
+            if len(self._retries) >= self.minimum + self.ratio * len(self._calls):
+                return False
+            self._retries.append(now)
+            return True
+
+
+class RetryMetrics:
+    """Counts calls, retries and failures per scheme and operation."""
+
+    FIELDS = ('calls', 'retries', 'failures', 'budget_exhausted', 'backoff_seconds')
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self._counters = defaultdict(lambda: dict.fromkeys(self.FIELDS, 0))
+
+    def increment(self, scheme, operation, field, value=1):
+        with self._lock:
+            self._counters[(scheme, operation)][field] += value
+
+    def snapshot(self):
+        """Current counters, keyed by ``(scheme, operation)``."""
+        with self._lock:
+            return {key: dict(counters) for key, counters in self._counters.items()}
+
+
+class RetryPolicy:
+    """Retries transient I/O errors with exponential backoff and full jitter.
+
+    Parameters
+    ----------
+    max_attempts : int
+        Attempts of an operation, including the first one
+    base_delay : float
+        Seconds of the first backoff, doubled after each attempt
+    max_delay : float
+        Maximum seconds of a backoff
+    budget : RetryBudget, optional
+        Shared cap of the retries, default: a `RetryBudget` of this policy
+    classify : callable, optional
+        Called with an error to tell whether it is retriable (default: `is_retriable`)
+    """
+
+    def __init__(self, max_attempts=3, base_delay=0.5, max_delay=20.0, budget=None, classify=None):
+        self.max_attempts = max_attempts
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.budget = budget if budget is not None else RetryBudget()
+        self.classify = classify or is_retriable
+
+    def backoff(self, attempt):
+        """Seconds to wait before retrying after the failed `attempt`, counted from 1."""
+        return random.uniform(0, min(self.max_delay, self.base_delay * 2 ** (attempt - 1)))
+
+    def call(self, func, *args, scheme=None, operation=None, metrics=None, **kwargs):
+        """Call `func`, retrying it while it raises retriable errors.
+
+        Parameters
+        ----------
+        func : callable
+            Operation to call with `args` and `kwargs`
+        scheme : str, optional
+            Scheme of the handler, for logs and metrics
+        operation : str, optional
+            Name of the operation, for logs and metrics
+        metrics : RetryMetrics, optional
+            Counters to update
+        """
+        count = metrics.increment if metrics is not None else lambda *args: None
+        self.budget.record_call()
+        count(scheme, operation, 'calls')
+        attempt = 1
+        while True:
+            try:
+                return func(*args, **kwargs)
+            except Exception as e:
+                if attempt >= self.max_attempts or not self.classify(e):
+                    if attempt > 1:
+                        count(scheme, operation, 'failures')
+                    raise
+                if not self.budget.acquire():
+                    count(scheme, operation, 'budget_exhausted')
+                    count(scheme, operation, 'failures')
+                    logger.warning(f"Not retrying {operation} on {scheme}, the retry budget is exhausted: {e!r}")
+                    raise
+                delay = self.backoff(attempt)
+                count(scheme, operation, 'retries')
+                count(scheme, operation, 'backoff_seconds', delay)
+                logger.warning(
+                    f"Retrying {operation} on {scheme} in {delay:.2f}s "
+                    f"(attempt {attempt + 1} of {self.max_attempts}) after {e!r}"
+                )
+                time.sleep(delay)
+                attempt += 1
@@ -4,14 +4,29 @@ import logging
 import os
 import threading
 import zlib
+from concurrent.futures import ThreadPoolExecutor
 
 from boto3.session import Session
+from botocore.config import Config
 
-from .exceptions import AwsError
-from .utils import retry
+from .exceptions import AwsError, PapermillException
+from .models import FileEntry
+from .utils import glob_regex, split_glob
 
 logger = logging.getLogger('papermill.s3')
 
+# Client options accepted by S3, unset options keep the boto3 defaults and AWS configuration
+CLIENT_OPTIONS = (
+    'endpoint_url',
+    'profile',
+    'region',
+    'max_pool_connections',
+    'retry_mode',
+    'max_attempts',
+    'connect_timeout',
+    'read_timeout',
+)
+
 
 class Bucket:
     """
@@ -120,39 +135,110 @@ class S3:
     """
     Wraps S3.
 
+    Clients are shared by the S3 instances with the same client options, so
+    several S3 compatible stores can be used at once. boto3 clients are thread
+    safe and keep a pool of connections, sized by `max_pool_connections`.
+
     Parameters
     ----------
     keyname : TODO
+    endpoint_url : string, optional
+        url of an S3 compatible store (Default is the BOTO3_ENDPOINT_URL
+        environment variable, or AWS)
+    profile : string, optional
+        name of the AWS profile holding the credentials
+    region : string, optional
+        name of the AWS region
+    max_pool_connections : int, optional
+        number of connections kept open to the store
+    retry_mode : string, optional
+        botocore retry mode, 'legacy', 'standard' or 'adaptive' to also rate
+        limit requests while the store throttles them
+    max_attempts : int, optional
+        number of attempts of a request, including the first one
+    connect_timeout : float, optional
+        seconds to wait for a connection
+    read_timeout : float, optional
+        seconds to wait for data on an open connection
 
     Methods
     -------
     The following are wrapped utilities for S3:
         - cat
         - cp_string
+        - glob
         - list
         - list_dir
         - read
 
     """
 
-    s3_session = (None, None, None)
+    # Default client options, see `configure`
+    defaults = {}
+    # (session, client, resource) per set of client options
+    clients = {}
     lock = threading.RLock()
 
     def __init__(self, keyname=None, *args, **kwargs):
+        options = dict(S3.defaults)
+        options.update({name: kwargs[name] for name in CLIENT_OPTIONS if kwargs.get(name) is not None})
+        if 'endpoint_url' not in options and os.environ.get('BOTO3_ENDPOINT_URL'):
+            options['endpoint_url'] = os.environ['BOTO3_ENDPOINT_URL']
+
+        key = tuple(sorted(options.items()))
         with self.lock:
-            if not all(S3.s3_session):
-                session = Session()
-                client = session.client('s3')
+            if key not in S3.clients:
+                S3.clients[key] = self._create_clients(**options)
 
-                session_params = {}
-                endpoint_url = os.environ.get('BOTO3_ENDPOINT_URL', None)
-                if endpoint_url:
-                    session_params['endpoint_url'] = endpoint_url
+        (self.session, self.client, self.s3) = S3.clients[key]
 
-                s3 = session.resource('s3', **session_params)
-                S3.s3_session = (session, client, s3)
+    @classmethod
+    def configure(cls, **options):
+        """
+        Sets the default client options of S3 instances.
 
-        (self.session, self.client, self.s3) = S3.s3_session
+        Parameters
+        ----------
+        options: optional
+            client options, as taken by S3, None to unset an option
+        """
+        unknown = set(options) - set(CLIENT_OPTIONS)
+        if unknown:
+            raise PapermillException(f"Unknown S3 client options {sorted(unknown)}, choose from {list(CLIENT_OPTIONS)}")
+        with cls.lock:
+            defaults = {**cls.defaults, **options}
+            cls.defaults = {name: value for name, value in defaults.items() if value is not None}
+
+    @staticmethod
+    def _create_clients(
+        endpoint_url=None,
+        profile=None,
+        region=None,
+        max_pool_connections=None,
+        retry_mode=None,
+        max_attempts=None,
+        connect_timeout=None,
+        read_timeout=None,
+    ):
+        config_params = {}
+        if max_pool_connections is not None:
+            config_params['max_pool_connections'] = max_pool_connections
+        if connect_timeout is not None:
+            config_params['connect_timeout'] = connect_timeout
+        if read_timeout is not None:
+            config_params['read_timeout'] = read_timeout
+        retries = {}
+        if retry_mode is not None:
+            retries['mode'] = retry_mode
+        if max_attempts is not None:
+            retries['total_max_attempts'] = max_attempts
+        if retries:
+            config_params['retries'] = retries
+
+        session = Session(profile_name=profile, region_name=region)
+        s3 = session.resource('s3', endpoint_url=endpoint_url, config=Config(**config_params))
+        # The resource's client is shared so both use the same connection pool
+        return (session, s3.meta.client, s3)
 
     def _bucket_name(self, bucket):
         return self._clean(bucket).split('/', 1)[0]
@@ -176,7 +262,6 @@ class S3:
         cleaned = self._clean(name).split('/', 1)
         return cleaned[1] if len(cleaned) > 1 else None
 
-    @retry(3)
     def _list(
         self,
         prefix='',
@@ -227,25 +312,40 @@ class S3:
                     prefix = item['Key'] if 'Key' in item else item['Prefix']
                     yield f's3://{bucket}/{prefix}'
 
+    def _list_entries(self, bucket, prefix, delimiter=None):
+        """Yields a FileEntry per object and the name of each common prefix under `prefix`."""
+        paginator = self.client.get_paginator('list_objects_v2')
+        operation_parameters = {'Bucket': bucket, 'Prefix': prefix}
+        if delimiter:
+            operation_parameters['Delimiter'] = delimiter
+        for page in paginator.paginate(**operation_parameters):
+            for item in page.get('Contents', []):
+                yield FileEntry(
+                    f's3://{bucket}/{item["Key"]}',
+                    item.get('Size'),
+                    item['LastModified'].timestamp() if item.get('LastModified') else None,
+                    item.get('ETag', '').strip('"') or None,
+                )
+            for item in page.get('CommonPrefixes', []):
+                yield item['Prefix']
+
     def _put(self, source, dest, num_callbacks=10, policy='bucket-owner-full-control', **kwargs):
         key = self._get_key(dest)
-        obj = self.s3.Object(key.bucket.name, key.name)
 
         # support passing in open file obj.  Why did we do this in the past?
 
         if not isinstance(source, str):
-            obj.upload_fileobj(source, ExtraArgs={'ACL': policy})
+            self.client.upload_fileobj(source, key.bucket.name, key.name, ExtraArgs={'ACL': policy})
         else:
-            obj.upload_file(source, ExtraArgs={'ACL': policy})
+            self.client.upload_file(source, key.bucket.name, key.name, ExtraArgs={'ACL': policy})
         return key
 
     def _put_string(self, source, dest, num_callbacks=10, policy='bucket-owner-full-control', **kwargs):
         key = self._get_key(dest)
-        obj = self.s3.Object(key.bucket.name, key.name)
 
         if isinstance(source, str):
             source = source.encode('utf-8')
-        obj.put(Body=source, ACL=policy)
+        self.client.put_object(Bucket=key.bucket.name, Key=key.name, Body=source, ACL=policy)
         return key
 
     def _is_s3(self, name):
@@ -279,73 +379,55 @@ class S3:
         if compressed:
             decompress = zlib.decompressobj(16 + zlib.MAX_WBITS)
 
-        size = 0
-        bytes_read = 0
-        err = None
         undecoded = ''
         if key:
-            # try to read the file multiple times
-            for i in range(100):
-                obj = self.s3.Object(key.bucket.name, key.name)
-                buffersize = buffersize if buffersize is not None else 2**20
-
-                if not size:
-                    size = obj.content_length
-                elif size != obj.content_length:
-                    raise AwsError('key size unexpectedly changed while reading')
-
-                # For an empty file, 0 (first-bytes-pos) is equal to the length of the object
-                # hence the range is "unsatisfiable", and botocore correctly handles it by
-                # raising an exception. We'd rather just return with empty file contents here.
-                if size == 0:
-                    break
-
-                r = obj.get(Range=f"bytes={bytes_read}-")
-
-                try:
-                    while bytes_read < size:
-                        # this making this weird check because this call is
-                        # about 100 times slower if the amt is too high
-                        if size - bytes_read > buffersize:
-                            bytes = r['Body'].read(amt=buffersize)
-                        else:
-                            bytes = r['Body'].read()
-                        if compressed:
-                            s = decompress.decompress(bytes)
-                        else:
-                            s = bytes
-
-                        if encoding and not raw:
-                            try:
-                                decoded = undecoded + s.decode(encoding)
-                                undecoded = ''
-                                yield decoded
-                            except UnicodeDecodeError:
-                                undecoded += s
-                                if len(undecoded) > memsize:
-                                    raise
-                        else:
-                            yield s
-
-                        bytes_read += len(bytes)
-
-                except zlib.error:
-                    logger.error("Error while decompressing [%s]", key.name)
-                    raise
-                except UnicodeDecodeError:
-                    raise
-                except Exception:
-                    err = True
-                    pass
-
-                if size <= bytes_read:
-                    break
+            # Errors are retried by the retry policy of papermill_io, see papermill.retry
+            size = self.client.head_object(Bucket=key.bucket.name, Key=key.name)['ContentLength']
+            buffersize = buffersize if buffersize is not None else 2**20
+
+            # For an empty file, 0 (first-bytes-pos) is equal to the length of the object
+            # hence the range is "unsatisfiable", and botocore correctly handles it by
+            # raising an exception. We'd rather just return with empty file contents here.
+            if size == 0:
+                return
+
+            r = self.client.get_object(Bucket=key.bucket.name, Key=key.name)
+
+            bytes_read = 0
+            try:
+                while bytes_read < size:
+                    # this making this weird check because this call is
+                    # about 100 times slower if the amt is too high
+                    if size - bytes_read > buffersize:
+                        bytes = r['Body'].read(amt=buffersize)
+                    else:
+                        bytes = r['Body'].read()
+                    if not bytes:
+                        break
+                    if compressed:
+                        s = decompress.decompress(bytes)
+                    else:
+                        s = bytes
+
+                    if encoding and not raw:
+                        try:
+                            decoded = undecoded + s.decode(encoding)
+                            undecoded = ''
+                            yield decoded
+                        except UnicodeDecodeError:
+                            undecoded += s
+                            if len(undecoded) > memsize:
+                                raise
+                    else:
+                        yield s
+
+                    bytes_read += len(bytes)
+            except zlib.error:
+                logger.error("Error while decompressing [%s]", key.name)
+                raise
 
             if size != bytes_read:
-                if err:
-                    raise Exception
-                else:
-                    raise AwsError(f'Failed to fully read [{source.name}]')
+                raise AwsError(f'Failed to fully read [{key.name}]')
 
             if undecoded:
                 assert encoding is not None  # only time undecoded is set
@@ -354,6 +436,12 @@ class S3:
                 decoded = undecoded.decode(encoding)
                 yield decoded
 
+    def delete(self, name):
+        """Delete the key at `name`, deleting a missing key succeeds."""
+        assert self._is_s3(name), 'name must be a valid s3 path'
+        key = self._get_key(name)
+        self.client.delete_object(Bucket=key.bucket.name, Key=key.name)
+
     def cp_string(self, source, dest, **kwargs):
         """
         Copies source string into the destination location.
@@ -395,6 +483,58 @@ class S3:
         it = self._list(bucket=self._bucket_name(name), prefix=self._key_name(name), **kwargs)
         return iter(it) if iterator else list(it)
 
+    def glob(self, pattern, max_workers=8):
+        """
+        Returns the FileEntry of each object matching a glob pattern.
+
+        Objects are listed from the literal prefix of the pattern. Recursive
+        patterns list the subdirectories of the prefix concurrently, skipping
+        those which cannot match.
+
+        Parameters
+        ----------
+        pattern: string
+            the s3 path pattern, where ``*``, ``?`` and ``[...]`` match within
+            a path segment and ``**`` matches any number of segments
+        max_workers: int, optional
+            the number of subdirectories listed at once
+        """
+        assert self._is_s3(pattern), "pattern must be in form s3://bucket/key"
+
+        pattern = self._clean_s3(pattern)
+        prefix, recursive = split_glob(pattern)
+        bucket = self._bucket_name(prefix)
+        key_prefix = self._key_name(prefix) or ''
+        matches = glob_regex(pattern).match
+
+        entries = []
+        subdirectories = []
+        for entry in self._list_entries(bucket, key_prefix, delimiter='/'):
+            if isinstance(entry, FileEntry):
+                if matches(entry.path):
+                    entries.append(entry)
+            elif recursive:
+                subdirectories.append(entry)
+
+        if subdirectories:
+            # Prune with the pattern segment matching the subdirectory names
+            directory = f's3://{bucket}/{key_prefix.rpartition("/")[0]}'.rstrip('/') + '/'
+            segment = pattern[len(directory) :].split('/', 1)[0]
+            if '**' not in segment:
+                segment_matches = glob_regex(segment).match
+                subdirectories = [
+                    name for name in subdirectories if segment_matches(name.rstrip('/').rpartition('/')[2])
+                ]
+
+            def list_subdirectory(name):
+                return [entry for entry in self._list_entries(bucket, name) if matches(entry.path)]
+
+            with ThreadPoolExecutor(max_workers=max_workers) as executor:
+                for subdirectory_entries in executor.map(list_subdirectory, subdirectories):
+                    entries.extend(subdirectory_entries)
+
+        return sorted(entries)
+
     def listdir(self, name, **kwargs):
         """
         Returns a list of the files under the specified path.
@@ -0,0 +1,61 @@
+"""Small status sidecar of running executions, for external monitoring."""
+
+import json
+import threading
+
+from .iorw import papermill_io
+from .log import logger
+
+
+def status_path(output_path):
+    """Location of the status of the notebook executed into `output_path`."""
+    return f"{output_path}.status.json"
+
+
+def write_status(path, status):
+    """Write a status document, a few hundred bytes read by watchers instead of the output notebook."""
+    papermill_io.write(json.dumps(status), path)
+
+
+def read_status(path):
+    """Read the status of an execution, returning None if there is none at `path`."""
+    try:
+        return json.loads(papermill_io.read(path))
+    except FileNotFoundError:
+        return None
+
+
+class StatusHeartbeat:
+    """Background thread calling `beat` every `interval` seconds until stopped.
+
+    Keeps the status of an execution fresh while a long cell runs, so watchers
+    can tell a busy execution from a dead one by the age of its last update.
+
+    Parameters
+    ----------
+    interval : float
+        Seconds between beats
+    beat : callable
+        Called without arguments from the heartbeat thread
+    """
+
+    def __init__(self, interval, beat):
+        self.interval = interval
+        self.beat = beat
+        self._stopped = threading.Event()
+        self._thread = threading.Thread(target=self._run, name='papermill-status-heartbeat', daemon=True)
+
+    def start(self):
+        self._thread.start()
+
+    def stop(self):
+        self._stopped.set()
+        if self._thread.is_alive() and self._thread is not threading.current_thread():
+            self._thread.join()
+
+    def _run(self):
+        while not self._stopped.wait(self.interval):
+            try:
+                self.beat()
+            except Exception as e:
+                logger.warning(f"Status heartbeat failed: {e}")
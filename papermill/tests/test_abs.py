@@ -1,10 +1,12 @@
 import os
 import unittest
+from datetime import datetime, timezone
 from unittest.mock import Mock, patch
 
 from azure.identity import EnvironmentCredential
 
 from ..abs import AzureBlobStore
+from ..models import FileEntry
 
 
 class MockBytesIO:
@@ -104,3 +106,36 @@ class ABSTest(unittest.TestCase):
         self.assertEqual(blob.credential._credential._tenant_id, "mytenantid")
         self.assertEqual(blob.credential._credential._client_id, "myclientid")
         self.assertEqual(blob.credential._credential._client_credential, "myclientsecret")
+
+    def test_glob(self):
+        modified = datetime(2024, 1, 1, tzinfo=timezone.utc)
+        self.list_blobs.return_value = [
+            Mock(size=10, last_modified=modified, etag='"0x1"'),
+            Mock(size=5, last_modified=modified, etag='"0x2"'),
+        ]
+        self.list_blobs.return_value[0].name = "runs/2024/a.ipynb"
+        self.list_blobs.return_value[1].name = "runs/2024/b.txt"
+        self.assertEqual(
+            self.abs.glob("abs://myaccount.blob.core.windows.net/sascontainer/runs/**/*.ipynb?sastoken"),
+            [
+                FileEntry(
+                    "abs://myaccount.blob.core.windows.net/sascontainer/runs/2024/a.ipynb?sastoken",
+                    10,
+                    modified.timestamp(),
+                    "0x1",
+                )
+            ],
+        )
+        self.list_blobs.assert_called_once_with(name_starts_with="runs/")
+
+    def test_glob_one_level(self):
+        blob = Mock(size=10, last_modified=None, etag=None)
+        blob.name = "runs/a.ipynb"
+        directory = Mock(spec=['name'])
+        directory.name = "runs/2024/"
+        self._container_client.walk_blobs = Mock(return_value=[blob, directory])
+        self.assertEqual(
+            self.abs.glob("abs://myaccount.blob.core.windows.net/sascontainer/runs/*"),
+            [FileEntry("abs://myaccount.blob.core.windows.net/sascontainer/runs/a.ipynb", 10, None, None)],
+        )
+        self._container_client.walk_blobs.assert_called_once_with(name_starts_with="runs/", delimiter='/')
@@ -4,6 +4,7 @@ from unittest.mock import MagicMock, Mock, patch
 from ..adl import ADL
 from ..adl import core as adl_core
 from ..adl import lib as adl_lib
+from ..models import FileEntry
 
 
 class ADLTest(unittest.TestCase):
@@ -42,6 +43,30 @@ class ADLTest(unittest.TestCase):
         )
         self.ls.assert_called_once_with("path/to/directory")
 
+    def test_glob(self):
+        self.fakeAdapter.walk = Mock(
+            return_value=[
+                {'name': 'runs/2024/a.ipynb', 'type': 'FILE', 'length': 10, 'modificationTime': 1700000000000},
+                {'name': 'runs/2024/b.txt', 'type': 'FILE', 'length': 5, 'modificationTime': 1700000000000},
+            ]
+        )
+        self.assertEqual(
+            self.adl.glob("adl://foo_store.azuredatalakestore.net/runs/**/*.ipynb"),
+            [FileEntry("adl://foo_store.azuredatalakestore.net/runs/2024/a.ipynb", 10, 1700000000.0, None)],
+        )
+        self.fakeAdapter.walk.assert_called_once_with("runs", details=True)
+
+    def test_glob_one_level(self):
+        self.ls.return_value = [
+            {'name': 'runs/a.ipynb', 'type': 'FILE', 'length': 10, 'modificationTime': 1700000000000},
+            {'name': 'runs/2024', 'type': 'DIRECTORY', 'length': 0, 'modificationTime': 1700000000000},
+        ]
+        self.assertEqual(
+            self.adl.glob("adl://foo_store.azuredatalakestore.net/runs/*"),
+            [FileEntry("adl://foo_store.azuredatalakestore.net/runs/a.ipynb", 10, 1700000000.0, None)],
+        )
+        self.ls.assert_called_once_with("runs", detail=True)
+
     def test_read_opens_and_reads_file(self):
         self.assertEqual(self.adl.read("adl://foo_store.azuredatalakestore.net/path/to/file"), ["a", "b", "c"])
         self.fakeFile.__iter__.assert_called_once_with()
@@ -49,12 +49,12 @@ class TestMidCellAutosave(unittest.TestCase):
         nb_test_executed_fname = os.path.join(test_dir, f'output_{self.notebook_name}')
 
         # Count how many times it writes the file w/o autosave
-        with patch.object(engines, 'write_ipynb') as write_mock:
+        with patch.object(engines, 'write_ipynb', return_value=0) as write_mock:
             execute_notebook(self.notebook_path, nb_test_executed_fname, autosave_cell_every=0)
             default_write_count = write_mock.call_count
 
         # Turn on autosave and see how many more times it gets saved.
-        with patch.object(engines, 'write_ipynb') as write_mock:
+        with patch.object(engines, 'write_ipynb', return_value=0) as write_mock:
             execute_notebook(self.notebook_path, nb_test_executed_fname, autosave_cell_every=1)
             # This notebook has a cell which takes 2.5 seconds to run.
             # Autosave every 1 sec should add two more saves.
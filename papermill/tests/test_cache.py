@@ -0,0 +1,245 @@
+import json
+import os
+import shutil
+import tempfile
+import unittest
+from unittest.mock import patch
+
+import nbformat
+
+from .. import engines
+from ..cache import CellCache, NotebookCache
+from ..exceptions import PapermillExecutionError
+from ..execute import execute_notebook
+from ..iorw import load_notebook_node
+from . import get_notebook_path, kernel_name
+
+
+class TestCacheKey(unittest.TestCase):
+    def setUp(self):
+        self.nb = nbformat.v4.new_notebook(cells=[nbformat.v4.new_code_cell('a = 1')])
+        self.nb.metadata.kernelspec = {'name': 'python3', 'language': 'python'}
+
+    def test_ignores_pm_builtins(self):
+        self.assertEqual(
+            NotebookCache.key(self.nb, {'a': 1, 'pm': {'run_uuid': '1'}}, 'python3'),
+            NotebookCache.key(self.nb, {'a': 1, 'pm': {'run_uuid': '2'}}, 'python3'),
+        )
+
+    def test_changes(self):
+        key = NotebookCache.key(self.nb, {'a': 1}, 'python3')
+        self.assertNotEqual(key, NotebookCache.key(self.nb, {'a': 2}, 'python3'))
+        self.assertNotEqual(key, NotebookCache.key(self.nb, {'a': 1}, 'ir'))
+        self.assertNotEqual(key, NotebookCache.key(self.nb, {'a': 1}, 'python3', engine_name='custom'))
+        self.nb.cells[0].source = 'a = 2'
+        self.assertNotEqual(key, NotebookCache.key(self.nb, {'a': 1}, 'python3'))
+
+    def test_ignores_outputs_and_metadata(self):
+        key = NotebookCache.key(self.nb, {}, 'python3')
+        self.nb.cells[0].outputs = [nbformat.v4.new_output('stream', text='x')]
+        self.nb.metadata.papermill = {'start_time': 'now'}
+        self.assertEqual(key, NotebookCache.key(self.nb, {}, 'python3'))
+
+
+class TestCellKeys(unittest.TestCase):
+    def setUp(self):
+        self.nb = nbformat.v4.new_notebook(
+            cells=[
+                nbformat.v4.new_code_cell('a = 1'),
+                nbformat.v4.new_markdown_cell('# Notes'),
+                nbformat.v4.new_code_cell('b = a + 1', metadata={'tags': ['cache']}),
+                nbformat.v4.new_code_cell('c = b + 1', metadata={'tags': ['cache']}),
+            ]
+        )
+        self.nb.metadata.papermill = {'parameters': {'x': 1}}
+
+    def test_only_tagged_cells(self):
+        self.assertEqual(sorted(CellCache.cell_keys(self.nb, 'python3')), [2, 3])
+
+    def test_chained_with_previous_cells(self):
+        keys = CellCache.cell_keys(self.nb, 'python3')
+        self.nb.cells[1].source = '# Other notes'
+        self.assertEqual(CellCache.cell_keys(self.nb, 'python3'), keys)
+        self.nb.cells[2].source = 'b = a + 2'
+        changed = CellCache.cell_keys(self.nb, 'python3')
+        self.assertNotEqual(changed[2], keys[2])
+        self.assertNotEqual(changed[3], keys[3])
+
+    def test_parameters_and_kernel(self):
+        keys = CellCache.cell_keys(self.nb, 'python3')
+        self.assertNotEqual(CellCache.cell_keys(self.nb, 'other'), keys)
+        self.nb.metadata.papermill['parameters']['pm'] = {'run_uuid': '1'}
+        self.assertEqual(CellCache.cell_keys(self.nb, 'python3'), keys)
+        self.nb.metadata.papermill['parameters']['x'] = 2
+        self.assertNotEqual(CellCache.cell_keys(self.nb, 'python3'), keys)
+
+
+class TestNotebookCache(unittest.TestCase):
+    def setUp(self):
+        self.test_dir = tempfile.mkdtemp()
+        self.cache_dir = os.path.join(self.test_dir, 'cache')
+        self.nb = nbformat.v4.new_notebook(cells=[nbformat.v4.new_code_cell('a = 1')])
+
+    def tearDown(self):
+        shutil.rmtree(self.test_dir)
+
+    def test_miss(self):
+        self.assertIsNone(NotebookCache(self.cache_dir).get('missing'))
+
+    def test_put_and_get(self):
+        cache = NotebookCache(self.cache_dir)
+        cache.put('abc', self.nb)
+        self.assertTrue(os.path.exists(os.path.join(self.cache_dir, 'abc.ipynb')))
+        self.assertEqual(cache.get('abc').cells[0].source, 'a = 1')
+        with open(cache.index_path) as f:
+            index = json.load(f)
+        self.assertGreater(index['abc']['size'], 0)
+
+    def test_ttl(self):
+        cache = NotebookCache(self.cache_dir, ttl=60)
+        with patch('time.time', return_value=1000):
+            cache.put('abc', self.nb)
+        with patch('time.time', return_value=1059):
+            self.assertIsNotNone(cache.get('abc'))
+        with patch('time.time', return_value=1061):
+            self.assertIsNone(cache.get('abc'))
+            # Expired entries are evicted on the next store
+            cache.put('def', self.nb)
+        self.assertEqual(list(cache.load_index()), ['def'])
+        self.assertFalse(os.path.exists(cache.entry_path('abc')))
+
+    def test_max_size_evicts_least_recently_used(self):
+        cache = NotebookCache(self.cache_dir)
+        with patch('time.time', return_value=1):
+            cache.put('first', self.nb)
+        with patch('time.time', return_value=2):
+            cache.put('second', self.nb)
+        with patch('time.time', return_value=3):
+            cache.get('first')
+
+        cache.max_size = 2 * cache.load_index()['first']['size']
+        with patch('time.time', return_value=4):
+            cache.put('third', self.nb)
+        self.assertEqual(sorted(cache.load_index()), ['first', 'third'])
+        self.assertFalse(os.path.exists(cache.entry_path('second')))
+
+    def test_remote_entries_dropped_from_index(self):
+        cache = NotebookCache(self.cache_dir)
+        index = {'abc': {'created': 0, 'last_used': 0, 'size': 10}}
+        cache.ttl = 1
+        with patch('papermill.cache.papermill_io.get_handler', return_value=object()):
+            self.assertEqual(cache.evict(index, now=10), ['abc'])
+        self.assertEqual(index, {})
+
+
+class TestExecuteWithCache(unittest.TestCase):
+    def setUp(self):
+        self.test_dir = tempfile.mkdtemp()
+        self.cache_dir = os.path.join(self.test_dir, 'cache')
+
+    def tearDown(self):
+        shutil.rmtree(self.test_dir)
+
+    def test_cache_hit_skips_execution(self):
+        notebook_path = get_notebook_path('simple_execute.ipynb')
+        first_path = os.path.join(self.test_dir, 'first.ipynb')
+        second_path = os.path.join(self.test_dir, 'second.ipynb')
+
+        execute_notebook(notebook_path, first_path, {'msg': 'hello'}, kernel_name=kernel_name, cache=self.cache_dir)
+        with patch.object(engines.papermill_engines, 'execute_notebook_with_engine') as engine_mock:
+            nb = execute_notebook(
+                notebook_path, second_path, {'msg': 'hello'}, kernel_name=kernel_name, cache=self.cache_dir
+            )
+        engine_mock.assert_not_called()
+
+        second = load_notebook_node(second_path)
+        self.assertEqual(second.metadata.papermill['output_path'], second_path)
+        self.assertEqual(nb.cells[2].outputs, load_notebook_node(first_path).cells[2].outputs)
+
+        # Different parameters are a miss
+        with patch.object(
+            engines.papermill_engines, 'execute_notebook_with_engine', side_effect=lambda *a, **k: a[1]
+        ) as engine_mock:
+            execute_notebook(notebook_path, second_path, {'msg': 'bye'}, kernel_name=kernel_name, cache=self.cache_dir)
+        engine_mock.assert_called_once()
+
+    def test_cache_store_failure_ignored(self):
+        notebook_path = get_notebook_path('simple_execute.ipynb')
+        result_path = os.path.join(self.test_dir, 'result.ipynb')
+        cache = NotebookCache(self.cache_dir)
+        with (
+            patch.object(cache, 'put', side_effect=OSError('No space left on device')),
+            self.assertLogs('papermill', level='WARNING') as logs,
+        ):
+            nb = execute_notebook(notebook_path, result_path, {'msg': 'hello'}, kernel_name=kernel_name, cache=cache)
+        self.assertIn('No space left on device', logs.output[0])
+        self.assertEqual(load_notebook_node(result_path).cells[2].outputs, nb.cells[2].outputs)
+
+    def test_failed_runs_are_not_cached(self):
+        result_path = os.path.join(self.test_dir, 'broken.ipynb')
+        cache = NotebookCache(self.cache_dir)
+        with self.assertRaises(PapermillExecutionError):
+            execute_notebook(get_notebook_path('broken1.ipynb'), result_path, kernel_name=kernel_name, cache=cache)
+        self.assertEqual(cache.load_index(), {})
+
+
+class TestExecuteWithCellCache(unittest.TestCase):
+    def setUp(self):
+        self.test_dir = tempfile.mkdtemp()
+        self.cache_dir = os.path.join(self.test_dir, 'cells')
+        self.counter_path = os.path.join(self.test_dir, 'counter.txt')
+
+    def tearDown(self):
+        shutil.rmtree(self.test_dir)
+
+    def execute(self, alpha=1):
+        return execute_notebook(
+            get_notebook_path('cell_cache.ipynb'),
+            os.path.join(self.test_dir, 'output.ipynb'),
+            {'counter_path': self.counter_path, 'alpha': alpha},
+            kernel_name=kernel_name,
+            cell_cache=self.cache_dir,
+        )
+
+    def executions(self):
+        with open(self.counter_path) as f:
+            return len(f.read())
+
+    def test_unchanged_cells_restored(self):
+        first = self.execute()
+        self.assertEqual(first.cells[2].metadata.papermill['cache'], 'miss')
+        self.assertEqual(self.executions(), 1)
+
+        second = self.execute()
+        self.assertEqual(self.executions(), 1)
+        self.assertEqual(second.cells[2].metadata.papermill['cache'], 'hit')
+        self.assertEqual(second.cells[2].outputs, first.cells[2].outputs)
+        # Restored variables and modules are available to the cells executed afterwards
+        self.assertEqual(second.cells[4].outputs[0].text, '5.0 True\n')
+
+        self.execute(alpha=4)
+        self.assertEqual(self.executions(), 2)
+
+    def test_mutations_restored(self):
+        nb = load_notebook_node(get_notebook_path('cell_cache.ipynb'))
+        nb.cells = [
+            nbformat.v4.new_code_cell('items = [1]\nremoved = 0', metadata={'tags': ['cache']}),
+            nbformat.v4.new_code_cell('items.append(2)\ndel removed', metadata={'tags': ['cache']}),
+            nbformat.v4.new_code_cell("print(items, 'removed' in globals())"),
+        ]
+        input_path = os.path.join(self.test_dir, 'mutating.ipynb')
+        nbformat.write(nb, input_path)
+        for cache in ('miss', 'hit'):
+            output = execute_notebook(
+                input_path,
+                os.path.join(self.test_dir, 'output.ipynb'),
+                kernel_name=kernel_name,
+                cell_cache=self.cache_dir,
+            )
+            self.assertEqual(output.cells[1].metadata.papermill['cache'], cache)
+            self.assertEqual(output.cells[2].outputs[0].text, '[1, 2] False\n')
+
+    def test_unpicklable_variables_not_cached(self):
+        self.execute()
+        nb = self.execute()
+        self.assertEqual(nb.cells[3].metadata.papermill['cache'], 'miss')
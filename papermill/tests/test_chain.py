@@ -0,0 +1,75 @@
+import os
+import shutil
+import tempfile
+import unittest
+from unittest.mock import patch
+
+import nbformat
+
+from .. import chain
+from ..chain import execute_notebook_chain
+from ..exceptions import PapermillException, PapermillExecutionError
+from ..iorw import load_notebook_node
+from . import kernel_name
+
+
+def _write_notebook(path, *sources):
+    nb = nbformat.v4.new_notebook(cells=[nbformat.v4.new_code_cell(source) for source in sources])
+    nb.metadata.kernelspec = {'display_name': 'Python 3', 'language': 'python', 'name': kernel_name}
+    nbformat.write(nb, path)
+    return path
+
+
+class TestExecuteNotebookChain(unittest.TestCase):
+    def setUp(self):
+        self.test_dir = tempfile.mkdtemp()
+        self.producer = _write_notebook(
+            os.path.join(self.test_dir, 'producer.ipynb'), 'data = list(range(4))\nscratch = object()'
+        )
+        self.consumer = _write_notebook(
+            os.path.join(self.test_dir, 'consumer.ipynb'), "print(sum(data), 'scratch' in globals())"
+        )
+
+    def tearDown(self):
+        shutil.rmtree(self.test_dir)
+
+    def notebooks(self, **producer_options):
+        return [
+            {
+                'input_path': self.producer,
+                'output_path': os.path.join(self.test_dir, 'producer_out.ipynb'),
+                **producer_options,
+            },
+            {'input_path': self.consumer, 'output_path': os.path.join(self.test_dir, 'consumer_out.ipynb')},
+        ]
+
+    def test_objects_shared(self):
+        notebooks = self.notebooks()
+        executed = execute_notebook_chain(notebooks, progress_bar=False)
+        self.assertEqual(len(executed), 2)
+        self.assertEqual(executed[1].cells[0].outputs[0].text, '6 True\n')
+        for notebook in notebooks:
+            output = load_notebook_node(notebook['output_path'])
+            self.assertEqual(output.metadata.papermill['input_path'], notebook['input_path'])
+
+    def test_clear_namespace_between(self):
+        executed = execute_notebook_chain(
+            self.notebooks(exports=['data']), clear_namespace_between=True, progress_bar=False
+        )
+        self.assertEqual(executed[1].cells[0].outputs[0].text, '6 False\n')
+
+    def test_failure_stops_chain_and_kernel(self):
+        _write_notebook(self.producer, "raise ValueError('broken')")
+        with patch.object(chain, 'execute_notebook', wraps=chain.execute_notebook) as execute_mock:
+            with self.assertRaises(PapermillExecutionError):
+                execute_notebook_chain(self.notebooks(), progress_bar=False)
+        self.assertEqual(execute_mock.call_count, 1)
+        self.assertFalse(execute_mock.call_args.kwargs['km'].has_kernel)
+
+    def test_missing_paths(self):
+        with self.assertRaises(PapermillException):
+            execute_notebook_chain([{'input_path': self.producer}])
+
+    def test_cache_rejected(self):
+        with self.assertRaises(PapermillException):
+            execute_notebook_chain(self.notebooks(), cache=self.test_dir)
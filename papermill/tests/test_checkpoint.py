@@ -0,0 +1,168 @@
+import json
+import os
+import shutil
+import tempfile
+import unittest
+
+import boto3
+import nbformat
+from moto import mock_aws
+
+from ..checkpoint import (
+    PythonCheckpointer,
+    checkpoint_path,
+    papermill_checkpointers,
+    prefix_digest,
+    read_checkpoint,
+    remove_checkpoint,
+    resume_notebook,
+    write_checkpoint,
+)
+from ..exceptions import PapermillException, PapermillExecutionError
+from ..execute import execute_notebook
+from ..iorw import load_notebook_node
+from . import get_notebook_path, kernel_name
+
+
+def _notebook(*sources):
+    nb = nbformat.v4.new_notebook(cells=[nbformat.v4.new_code_cell(source) for source in sources])
+    nb.metadata.papermill = {'parameters': {'x': 1}}
+    return nb
+
+
+class TestCheckpointers(unittest.TestCase):
+    def test_find_checkpointer(self):
+        self.assertIs(papermill_checkpointers.find_checkpointer('python3', 'python'), PythonCheckpointer)
+
+    def test_no_checkpointer(self):
+        with self.assertRaises(PapermillException):
+            papermill_checkpointers.find_checkpointer('ir', 'R')
+
+    def test_python_state_round_trip(self):
+        namespace = {}
+        exec(PythonCheckpointer.setup_code, namespace)
+        exec("import json as j\nvalue = [1, 2]\n_private = 3\nitems = (i for i in value)", namespace)
+        state = PythonCheckpointer.parse_state(repr(eval(PythonCheckpointer.save_expression(), namespace)))
+        self.assertEqual(state['skipped'], ['items'])
+
+        restored = {}
+        exec(PythonCheckpointer.setup_code, restored)
+        exec(PythonCheckpointer.restore_code(state), restored)
+        self.assertEqual(restored['value'], [1, 2])
+        self.assertIs(restored['j'], json)
+        self.assertNotIn('_private', restored)
+
+
+class TestResumeNotebook(unittest.TestCase):
+    def setUp(self):
+        self.test_dir = tempfile.mkdtemp()
+        self.path = os.path.join(self.test_dir, 'output.ipynb.checkpoint')
+
+    def tearDown(self):
+        shutil.rmtree(self.test_dir)
+
+    def test_checkpoint_path(self):
+        self.assertEqual(checkpoint_path('s3://bucket/out.ipynb'), 's3://bucket/out.ipynb.checkpoint')
+
+    def test_prefix_digest(self):
+        nb = _notebook('a = 1', 'b = 2')
+        digest = prefix_digest(nb, 0)
+        nb.cells[1].source = 'b = 3'
+        self.assertEqual(prefix_digest(nb, 0), digest)
+        nb.metadata.papermill['parameters']['x'] = 2
+        self.assertNotEqual(prefix_digest(nb, 0), digest)
+
+    def test_read_missing_checkpoint(self):
+        self.assertIsNone(read_checkpoint(self.path))
+
+    @mock_aws
+    def test_remote_checkpoint(self):
+        client = boto3.client('s3')
+        client.create_bucket(Bucket='bucket', CreateBucketConfiguration={'LocationConstraint': 'us-west-2'})
+        path = checkpoint_path('s3://bucket/output.ipynb')
+        # A missing S3 key is a first run, not an error
+        self.assertIsNone(read_checkpoint(path))
+
+        write_checkpoint(path, _notebook('a = 1'), 0, 'python', {'data': ''})
+        self.assertEqual(read_checkpoint(path)['cell_index'], 0)
+        remove_checkpoint('s3://bucket/output.ipynb')
+        self.assertNotIn('Contents', client.list_objects_v2(Bucket='bucket'))
+
+    def test_resume_copies_prefix(self):
+        partial_nb = _notebook('a = 1', 'b = 2')
+        partial_nb.cells[0].outputs = [nbformat.v4.new_output('stream', text='done')]
+        partial_nb.cells[0].metadata.papermill = {'status': 'completed'}
+        partial_nb.cells[1].outputs = [nbformat.v4.new_output('stream', text='partial')]
+        write_checkpoint(self.path, partial_nb, 0, 'python', {'data': ''})
+
+        nb = _notebook('a = 1', 'b = 2')
+        self.assertTrue(resume_notebook(nb, partial_nb, read_checkpoint(self.path)))
+        self.assertEqual(nb.cells[0].outputs[0].text, 'done')
+        self.assertEqual(nb.cells[0].metadata.papermill['status'], 'completed')
+        self.assertEqual(nb.cells[1].outputs, [])
+
+    def test_resume_changed_notebook(self):
+        partial_nb = _notebook('a = 1', 'b = 2')
+        write_checkpoint(self.path, partial_nb, 0, 'python', {'data': ''})
+        self.assertFalse(resume_notebook(_notebook('a = 2', 'b = 2'), partial_nb, read_checkpoint(self.path)))
+
+
+class TestExecuteResume(unittest.TestCase):
+    def setUp(self):
+        self.test_dir = tempfile.mkdtemp()
+        self.output_path = os.path.join(self.test_dir, 'output.ipynb')
+        self.parameters = {
+            'counter_path': os.path.join(self.test_dir, 'counter.txt'),
+            'stop_path': os.path.join(self.test_dir, 'stop'),
+        }
+
+    def tearDown(self):
+        shutil.rmtree(self.test_dir)
+
+    def execute(self, **kwargs):
+        return execute_notebook(
+            get_notebook_path('checkpoint.ipynb'),
+            self.output_path,
+            self.parameters,
+            kernel_name=kernel_name,
+            progress_bar=False,
+            **kwargs,
+        )
+
+    def executions(self):
+        with open(self.parameters['counter_path']) as f:
+            return len(f.read())
+
+    def test_resume_after_checkpoint(self):
+        open(self.parameters['stop_path'], 'w').close()
+        with self.assertRaises(PapermillExecutionError):
+            self.execute()
+        checkpoint = read_checkpoint(checkpoint_path(self.output_path))
+        # The checkpointed cell follows the parameters and injected-parameters cells
+        self.assertEqual(checkpoint['cell_index'], 2)
+        # The open file handle left by the cell can't be pickled
+        self.assertEqual(checkpoint['state']['skipped'], ['counter'])
+
+        os.remove(self.parameters['stop_path'])
+        nb = self.execute(resume=True)
+        self.assertEqual(self.executions(), 1)
+        self.assertEqual(nb.metadata.papermill['resumed_from'], 3)
+        self.assertEqual(nb.cells[2].outputs[0].text, '4.0\n')
+        self.assertEqual(nb.cells[4].outputs[0].text, '5.0 True\n')
+        self.assertEqual(load_notebook_node(self.output_path).cells[4].outputs[0].text, '5.0 True\n')
+        # A completed execution removes its checkpoint
+        self.assertFalse(os.path.exists(checkpoint_path(self.output_path)))
+
+    def test_resume_without_checkpoint(self):
+        nb = self.execute(resume=True)
+        self.assertEqual(self.executions(), 1)
+        self.assertNotIn('resumed_from', nb.metadata.papermill)
+
+    def test_resume_changed_parameters(self):
+        open(self.parameters['stop_path'], 'w').close()
+        with self.assertRaises(PapermillExecutionError):
+            self.execute()
+        os.remove(self.parameters['stop_path'])
+        self.parameters['other'] = 1
+        self.execute(resume=True)
+        self.assertEqual(self.executions(), 2)
@@ -87,10 +87,22 @@ class TestCLI(unittest.TestCase):
         progress_bar=True,
         start_timeout=60,
         execution_timeout=None,
+        execution_deadline=None,
+        resource_sample_interval=None,
         report_mode=False,
         cwd=None,
+        prestart_kernel=False,
         stdout_file=None,
         stderr_file=None,
+        offload_threshold=None,
+        validation_policy='first-and-last',
+        results_path=None,
+        cache=None,
+        cell_cache=None,
+        history=None,
+        progress_stream=None,
+        status_heartbeat=None,
+        resume=False,
     )
 
     def setUp(self):
@@ -259,6 +271,11 @@ class TestCLI(unittest.TestCase):
         self.runner.invoke(papermill, self.default_args + ['--cwd', 'a/path/here'])
         execute_patch.assert_called_with(**self.augment_execute_kwargs(cwd='a/path/here'))
 
+    @patch(f"{cli.__name__}.execute_notebook")
+    def test_prestart_kernel(self, execute_patch):
+        self.runner.invoke(papermill, self.default_args + ['--prestart-kernel'])
+        execute_patch.assert_called_with(**self.augment_execute_kwargs(prestart_kernel=True))
+
     @patch(f"{cli.__name__}.execute_notebook")
     def test_progress_bar(self, execute_patch):
         self.runner.invoke(papermill, self.default_args + ['--progress-bar'])
@@ -269,6 +286,28 @@ class TestCLI(unittest.TestCase):
         self.runner.invoke(papermill, self.default_args + ['--no-progress-bar'])
         execute_patch.assert_called_with(**self.augment_execute_kwargs(progress_bar=False))
 
+    @patch(f"{cli.__name__}.execute_notebook")
+    def test_progress_bar_style(self, execute_patch):
+        self.runner.invoke(papermill, self.default_args + ['--progress-bar-style', 'terminal'])
+        execute_patch.assert_called_with(**self.augment_execute_kwargs(progress_bar='terminal'))
+
+    @patch(f"{cli.__name__}.execute_notebook")
+    def test_progress_stream(self, execute_patch):
+        self.runner.invoke(papermill, self.default_args + ['--progress-stream', '3'])
+        execute_patch.assert_called_with(**self.augment_execute_kwargs(progress_stream=3))
+        self.runner.invoke(papermill, self.default_args + ['--progress-stream', 'progress.jsonl'])
+        execute_patch.assert_called_with(**self.augment_execute_kwargs(progress_stream='progress.jsonl'))
+
+    @patch(f"{cli.__name__}.execute_notebook")
+    def test_status_heartbeat(self, execute_patch):
+        self.runner.invoke(papermill, self.default_args + ['--status-heartbeat', '10'])
+        execute_patch.assert_called_with(**self.augment_execute_kwargs(status_heartbeat=10.0))
+
+    @patch(f"{cli.__name__}.execute_notebook")
+    def test_resource_sample_interval(self, execute_patch):
+        self.runner.invoke(papermill, self.default_args + ['--resource-sample-interval', '0.5'])
+        execute_patch.assert_called_with(**self.augment_execute_kwargs(resource_sample_interval=0.5))
+
     @patch(f"{cli.__name__}.execute_notebook")
     def test_log_output(self, execute_patch):
         self.runner.invoke(papermill, self.default_args + ['--log-output'])
@@ -310,6 +349,11 @@ class TestCLI(unittest.TestCase):
         self.runner.invoke(papermill, self.default_args + ['--execution-timeout', '123'])
         execute_patch.assert_called_with(**self.augment_execute_kwargs(execution_timeout=123))
 
+    @patch(f"{cli.__name__}.execute_notebook")
+    def test_execution_deadline(self, execute_patch):
+        self.runner.invoke(papermill, self.default_args + ['--execution-deadline', '3600'])
+        execute_patch.assert_called_with(**self.augment_execute_kwargs(execution_deadline=3600.0))
+
     @patch(f"{cli.__name__}.execute_notebook")
     def test_report_mode(self, execute_patch):
         self.runner.invoke(papermill, self.default_args + ['--report-mode'])
@@ -320,6 +364,60 @@ class TestCLI(unittest.TestCase):
         self.runner.invoke(papermill, self.default_args + ['--no-report-mode'])
         execute_patch.assert_called_with(**self.augment_execute_kwargs(report_mode=False))
 
+    @patch(f"{cli.__name__}.execute_notebook")
+    def test_offload_threshold(self, execute_patch):
+        self.runner.invoke(papermill, self.default_args + ['--offload-threshold', '4096'])
+        execute_patch.assert_called_with(**self.augment_execute_kwargs(offload_threshold=4096))
+
+    @patch(f"{cli.__name__}.execute_notebook")
+    def test_validation_policy(self, execute_patch):
+        self.runner.invoke(papermill, self.default_args + ['--validation-policy', 'never'])
+        execute_patch.assert_called_with(**self.augment_execute_kwargs(validation_policy='never'))
+
+    @patch(f"{cli.__name__}.execute_notebook")
+    def test_results_path(self, execute_patch):
+        self.runner.invoke(papermill, self.default_args + ['--results-path', 'results.csv'])
+        execute_patch.assert_called_with(**self.augment_execute_kwargs(results_path='results.csv'))
+
+    @patch(f"{cli.__name__}.execute_notebook")
+    def test_cache_dir(self, execute_patch):
+        self.runner.invoke(
+            papermill,
+            self.default_args + ['--cache-dir', 's3://bucket/cache', '--cache-ttl', '3600', '--cache-max-size', '1024'],
+        )
+        cache = execute_patch.call_args.kwargs['cache']
+        self.assertEqual((cache.cache_dir, cache.ttl, cache.max_size), ('s3://bucket/cache', 3600.0, 1024))
+        execute_patch.assert_called_with(**self.augment_execute_kwargs(cache=cache))
+
+    @patch(f"{cli.__name__}.execute_notebook")
+    def test_cache_options_without_dir(self, execute_patch):
+        result = self.runner.invoke(papermill, self.default_args + ['--cache-ttl', '3600'])
+        self.assertEqual(result.exit_code, 2)
+        execute_patch.assert_not_called()
+
+    @patch(f"{cli.__name__}.execute_notebook")
+    def test_cell_cache_dir(self, execute_patch):
+        self.runner.invoke(papermill, self.default_args + ['--cell-cache-dir', 'cells'])
+        cell_cache = execute_patch.call_args.kwargs['cell_cache']
+        self.assertEqual(cell_cache.cache_dir, 'cells')
+        execute_patch.assert_called_with(**self.augment_execute_kwargs(cell_cache=cell_cache))
+
+    @patch(f"{cli.__name__}.execute_notebook")
+    def test_resume(self, execute_patch):
+        self.runner.invoke(papermill, self.default_args + ['--resume'])
+        execute_patch.assert_called_with(**self.augment_execute_kwargs(resume=True))
+
+    @patch(f"{cli.__name__}.execute_notebook")
+    def test_history_path(self, execute_patch):
+        self.runner.invoke(papermill, self.default_args + ['--history-path', 'history.db'])
+        execute_patch.assert_called_with(**self.augment_execute_kwargs(history='history.db'))
+
+    @patch(f"{cli.__name__}.execute_notebook")
+    def test_invalid_validation_policy(self, execute_patch):
+        result = self.runner.invoke(papermill, self.default_args + ['--validation-policy', 'sometimes'])
+        self.assertEqual(result.exit_code, 2)
+        execute_patch.assert_not_called()
+
     @patch(f"{cli.__name__}.execute_notebook")
     def test_version(self, execute_patch):
         self.runner.invoke(papermill, ['--version'])
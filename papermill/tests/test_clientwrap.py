@@ -1,12 +1,20 @@
+import os
+import shutil
+import tempfile
+import time
 import unittest
-from unittest.mock import call, patch
+from unittest.mock import Mock, call, patch
 
 import nbformat
+from nbclient.exceptions import CellTimeoutError
 
 from ..clientwrap import PapermillNotebookClient
 from ..engines import NotebookExecutionManager
+from ..exceptions import PapermillDeadlineExceeded, PapermillException
+from ..execute import execute_notebook
+from ..iorw import load_notebook_node
 from ..log import logger
-from . import get_notebook_path
+from . import get_notebook_path, kernel_name
 
 
 class TestPapermillClientWrapper(unittest.TestCase):
@@ -37,3 +45,118 @@ class TestPapermillClientWrapper(unittest.TestCase):
                     call("<matplotlib.figure.Figure at 0x7f830af7b350>"),
                 ]
             )
+
+
+class TestPapermillExecuteCells(unittest.TestCase):
+    def setUp(self):
+        self.nb = nbformat.v4.new_notebook(
+            cells=[
+                nbformat.v4.new_markdown_cell('# Title'),
+                nbformat.v4.new_code_cell('a = 1'),
+                nbformat.v4.new_raw_cell('raw'),
+                nbformat.v4.new_code_cell('  '),
+                nbformat.v4.new_code_cell('b = 2'),
+                nbformat.v4.new_markdown_cell('The end'),
+            ]
+        )
+        self.nb_man = Mock(cell_cache=None, resume_checkpoint=None)
+        self.client = PapermillNotebookClient(self.nb_man)
+        self.client.nb = self.nb
+        self.client.execute_cell = Mock()
+
+    def test_callbacks_only_for_executable_cells(self):
+        self.client.papermill_execute_cells()
+
+        self.assertEqual(self.nb_man.cell_start.call_args_list, [call(self.nb.cells[1], 1), call(self.nb.cells[4], 4)])
+        self.assertEqual(self.nb_man.cell_complete.call_count, 2)
+        self.assertEqual(
+            self.nb_man.mark_cells_completed.call_args_list,
+            [call([self.nb.cells[0]]), call([self.nb.cells[2], self.nb.cells[3]]), call([self.nb.cells[5]])],
+        )
+        # nbclient still sees every cell so its hooks run
+        self.assertEqual(self.client.execute_cell.call_count, 6)
+
+    def test_skip_execution_tag(self):
+        self.nb.cells[4].metadata['tags'] = ['skip-execution']
+        self.client.skip_cells_with_tag = 'skip-execution'
+        self.assertFalse(self.client.is_executable_cell(self.nb.cells[4]))
+        self.assertTrue(self.client.is_executable_cell(self.nb.cells[1]))
+
+
+class TestCellTimeouts(unittest.TestCase):
+    def setUp(self):
+        self.client = PapermillNotebookClient(Mock(cell_cache=None, resume_checkpoint=None), timeout=60)
+
+    def test_cell_override(self):
+        self.assertEqual(self.client._get_timeout(nbformat.v4.new_code_cell('a = 1')), 60)
+        cell = nbformat.v4.new_code_cell('a = 1', metadata={'tags': ['timeout=600']})
+        self.assertEqual(self.client._get_timeout(cell), 600)
+        cell = nbformat.v4.new_code_cell('a = 1', metadata={'timeout': 0})
+        self.assertIsNone(self.client._get_timeout(cell))
+
+    def test_deadline_limits_timeout(self):
+        self.client._deadline = time.monotonic() + 5
+        timeout = self.client._get_timeout(nbformat.v4.new_code_cell('a = 1'))
+        self.assertLessEqual(timeout, 5)
+        self.assertTrue(self.client._deadline_limited)
+        # Replies to silent executions aren't limited by the deadline
+        self.assertEqual(self.client._get_timeout(None), 60)
+
+    def test_invalid_timeout_fails_before_execution(self):
+        self.client.nb = nbformat.v4.new_notebook(
+            cells=[nbformat.v4.new_code_cell('a = 1', metadata={'tags': ['timeout=later']})]
+        )
+        self.client.execute_cell = Mock()
+        with self.assertRaises(PapermillException):
+            self.client.papermill_execute_cells()
+        self.client.execute_cell.assert_not_called()
+
+
+class TestExecutionDeadline(unittest.TestCase):
+    def setUp(self):
+        self.test_dir = tempfile.mkdtemp()
+        self.input_path = os.path.join(self.test_dir, 'input.ipynb')
+        self.output_path = os.path.join(self.test_dir, 'output.ipynb')
+
+    def tearDown(self):
+        shutil.rmtree(self.test_dir)
+
+    def execute(self, *cells, **kwargs):
+        nb = nbformat.v4.new_notebook(
+            cells=[nbformat.v4.new_code_cell(cell) if isinstance(cell, str) else cell for cell in cells]
+        )
+        nb.metadata.kernelspec = {'display_name': 'Python 3', 'language': 'python', 'name': kernel_name}
+        nbformat.write(nb, self.input_path)
+        return execute_notebook(
+            self.input_path, self.output_path, kernel_name=kernel_name, progress_bar=False, **kwargs
+        )
+
+    def code_cell_statuses(self):
+        nb = load_notebook_node(self.output_path)
+        return [cell.metadata.papermill['status'] for cell in nb.cells if cell.cell_type == 'code']
+
+    def test_runaway_cell_interrupted(self):
+        start = time.monotonic()
+        with self.assertRaises(PapermillDeadlineExceeded) as raised:
+            self.execute('a = 1', 'import time\ntime.sleep(60)', 'b = 2', execution_deadline=5)
+        self.assertLess(time.monotonic() - start, 30)
+        self.assertEqual(raised.exception.cell_index, 2)
+
+        nb = load_notebook_node(self.output_path)
+        self.assertTrue(nb.metadata.papermill['deadline_exceeded'])
+        self.assertEqual(self.code_cell_statuses(), ['completed', 'failed', 'skipped'])
+        interrupted = [cell for cell in nb.cells if cell.cell_type == 'code'][1]
+        self.assertEqual(interrupted.outputs[-1].ename, 'KeyboardInterrupt')
+
+    def test_deadline_between_cells(self):
+        with self.assertRaises(PapermillDeadlineExceeded) as raised:
+            self.execute('a = 1', 'b = 2', execution_deadline=0)
+        self.assertEqual(raised.exception.cell_index, 0)
+        self.assertEqual(self.code_cell_statuses(), ['skipped', 'skipped'])
+
+    def test_cell_timeout_tag(self):
+        slow = nbformat.v4.new_code_cell('import time\ntime.sleep(60)', metadata={'tags': ['timeout=1']})
+        start = time.monotonic()
+        with self.assertRaises(CellTimeoutError):
+            self.execute('a = 1', slow, execution_deadline=600)
+        self.assertLess(time.monotonic() - start, 30)
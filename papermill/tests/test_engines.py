@@ -60,7 +60,51 @@ class TestNotebookExecutionManager(unittest.TestCase):
         nb_man = NotebookExecutionManager(self.nb, output_path='test.ipynb')
         with patch.object(engines, 'write_ipynb') as write_mock:
             nb_man.save()
-            write_mock.assert_called_with(self.nb, 'test.ipynb')
+            write_mock.assert_called_with(self.nb, 'test.ipynb', compact=True, validate=False)
+
+    def test_save_final(self):
+        nb_man = NotebookExecutionManager(self.nb, output_path='test.ipynb')
+        with patch.object(engines, 'write_ipynb') as write_mock:
+            nb_man.save(final=True)
+            write_mock.assert_called_with(self.nb, 'test.ipynb', compact=False, validate=True)
+
+    def test_save_validation_policy(self):
+        for policy, validate_intermediate, validate_final in [
+            ('always', True, True),
+            ('first-and-last', False, True),
+            ('never', False, False),
+        ]:
+            nb_man = NotebookExecutionManager(self.nb, output_path='test.ipynb', validation_policy=policy)
+            with patch.object(engines, 'write_ipynb') as write_mock:
+                nb_man.save()
+                write_mock.assert_called_with(self.nb, 'test.ipynb', compact=True, validate=validate_intermediate)
+                nb_man.save(final=True)
+                write_mock.assert_called_with(self.nb, 'test.ipynb', compact=False, validate=validate_final)
+
+    def test_save_final_unchanged(self):
+        nb_man = NotebookExecutionManager(self.nb, output_path='test.ipynb')
+        with patch.object(engines, 'write_ipynb', return_value=1) as write_mock:
+            nb_man.save(final=True)
+            nb_man.save(final=True)
+            self.assertEqual(write_mock.call_count, 1)
+            nb_man.save()
+            nb_man.save(final=True)
+            self.assertEqual(write_mock.call_count, 2)
+
+            nb_man.record_result('x', 1)
+            nb_man.save(final=True)
+            self.assertEqual(write_mock.call_count, 3)
+
+    def test_notebook_complete_writes_once(self):
+        nb_man = NotebookExecutionManager(self.nb, output_path='test.ipynb', progress_bar=False)
+        with patch.object(engines, 'write_ipynb', return_value=1) as write_mock:
+            nb_man.notebook_start()
+            nb_man.cell_complete(nb_man.nb.cells[0], cell_index=0)
+            nb_man.notebook_complete()
+            # Completing again, e.g. from an engine and its Engine.execute_notebook, rewrites nothing
+            nb_man.notebook_complete()
+        final_writes = [c for c in write_mock.call_args_list if not c.kwargs['compact']]
+        self.assertEqual(len(final_writes), 1)
 
     def test_save_no_output(self):
         nb_man = NotebookExecutionManager(self.nb)
@@ -278,6 +322,84 @@ class TestNotebookExecutionManager(unittest.TestCase):
         for cell in nb_man.nb.cells[2:]:
             self.assertEqual(cell.metadata.papermill['status'], NotebookExecutionManager.PENDING)
 
+    def test_notebook_complete_records_exception_cell(self):
+        cell_count = len(self.nb.cells)
+        nb_man = NotebookExecutionManager(self.nb)
+        nb_man.notebook_start()
+        nb_man.cell_complete(nb_man.nb.cells[0], cell_index=0)
+        nb_man.cell_exception(nb_man.nb.cells[1], cell_index=1)
+        nb_man.cell_complete(nb_man.nb.cells[1], cell_index=1)
+        nb_man.notebook_complete()
+
+        self.assertEqual(nb_man.execution_error.cell_index, 1)
+        self.assertEqual(nb_man.nb.metadata.papermill['exception_cell_index'], 1)
+        self.assertEqual(len(nb_man.nb.cells), cell_count)
+
+    def test_notebook_complete_adds_error_markers(self):
+        cell_count = len(self.nb.cells)
+        nb_man = NotebookExecutionManager(self.nb, output_path='test.ipynb', error_markers=True)
+        nb_man.save = Mock()
+        nb_man.notebook_start()
+        nb_man.cell_exception(nb_man.nb.cells[1], cell_index=1)
+        nb_man.cell_complete(nb_man.nb.cells[1], cell_index=1)
+        nb_man.notebook_complete()
+
+        self.assertEqual(len(nb_man.nb.cells), cell_count + 2)
+        self.assertEqual(nb_man.nb.cells[0].metadata.tags, ['papermill-error-cell-tag'])
+        self.assertEqual(nb_man.nb.cells[2].metadata.tags, ['papermill-error-cell-tag'])
+        self.assertEqual(nb_man.nb.metadata.papermill['exception_cell_index'], 1)
+        nb_man.save.assert_called_with(final=True)
+
+    def test_notebook_complete_ignores_successful_sys_exit(self):
+        nb_man = NotebookExecutionManager(self.nb)
+        nb_man.notebook_start()
+        cell = nb_man.nb.cells[0]
+        cell.outputs = [NotebookNode(output_type='error', ename='SystemExit', evalue='0', traceback=[])]
+        nb_man.cell_complete(cell, cell_index=0)
+        nb_man.notebook_complete()
+
+        self.assertIsNone(nb_man.execution_error)
+        self.assertNotIn('exception_cell_index', nb_man.nb.metadata.papermill)
+
+    def test_mark_cells_completed(self):
+        nb_man = NotebookExecutionManager(self.nb)
+        nb_man.notebook_start()
+        fixed_now = nb_man.now()
+        nb_man.now = Mock(return_value=fixed_now)
+        nb_man.save = Mock()
+        nb_man.pbar.close()
+        nb_man.pbar = Mock()
+
+        cells = nb_man.nb.cells[1:3]
+        nb_man.mark_cells_completed(cells)
+
+        for cell in cells:
+            self.assertEqual(cell.metadata.papermill['start_time'], fixed_now.isoformat())
+            self.assertEqual(cell.metadata.papermill['end_time'], fixed_now.isoformat())
+            self.assertEqual(cell.metadata.papermill['duration'], 0.0)
+            self.assertFalse(cell.metadata.papermill['exception'])
+            self.assertEqual(cell.metadata.papermill['status'], NotebookExecutionManager.COMPLETED)
+        self.assertEqual(nb_man.saves_avoided, 4)
+        nb_man.save.assert_not_called()
+        nb_man.pbar.update.assert_called_once_with(2)
+
+    def test_notebook_complete_records_bytes_written(self):
+        nb_man = NotebookExecutionManager(self.nb, output_path='test.ipynb')
+        with patch.object(engines, 'write_ipynb', return_value=100) as write_mock:
+            nb_man.notebook_start()
+            nb_man.cell_complete(nb_man.nb.cells[0], cell_index=0)
+            nb_man.notebook_complete()
+        self.assertEqual(write_mock.call_count, 3)
+        # The final save is not counted as it records the value
+        self.assertEqual(nb_man.nb.metadata.papermill['bytes_written'], 200)
+        self.assertEqual(nb_man.bytes_written, 300)
+
+    def test_notebook_start_clears_exception_cell(self):
+        self.nb.metadata.papermill['exception_cell_index'] = 3
+        nb_man = NotebookExecutionManager(self.nb)
+        nb_man.notebook_start()
+        self.assertNotIn('exception_cell_index', nb_man.nb.metadata.papermill)
+
 
 class TestEngineBase(unittest.TestCase):
     def setUp(self):
@@ -307,6 +429,14 @@ class TestEngineBase(unittest.TestCase):
                     progress_bar=False,
                     log_output=True,
                     autosave_cell_every=30,
+                    offload_threshold=None,
+                    validation_policy='first-and-last',
+                    error_markers=False,
+                    cell_cache=None,
+                    resume_checkpoint=None,
+                    history=None,
+                    progress_stream=None,
+                    status_heartbeat=None,
                 )
                 wrap_mock.return_value.notebook_start.assert_called_once()
                 exec_mock.assert_called_once_with(wrap_mock.return_value, 'python', log_output=True, bar='baz')
@@ -416,7 +546,8 @@ class TestNBClientEngine(unittest.TestCase):
             nb = NBClientEngine.execute_notebook(
                 self.nb, 'python', output_path='foo.ipynb', progress_bar=False, log_output=True
             )
-            self.assertEqual(save_mock.call_count, 8)
+            # The markdown cell is marked completed without saving
+            self.assertEqual(save_mock.call_count, 6)
             self.assertEqual(nb, AnyMock(NotebookNode))
 
             self.assertIsNotNone(nb.metadata.papermill['start_time'])
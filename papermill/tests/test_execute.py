@@ -10,11 +10,12 @@ from unittest.mock import ANY, patch
 import nbformat
 from nbformat import validate
 
-from .. import engines, translators
-from ..exceptions import PapermillExecutionError, strip_color
+from .. import engines, iorw, translators
+from ..exceptions import PapermillException, PapermillExecutionError, strip_color
 from ..execute import execute_notebook
 from ..iorw import load_notebook_node
 from ..log import logger
+from ..offload import offload_outputs
 from ..utils import chdir
 from . import get_notebook_path, kernel_name
 
@@ -166,6 +167,26 @@ class TestBrokenNotebook1(unittest.TestCase):
         # double check the removal (the new cells above should be the only two tagged ones)
         self.assertEqual(sum("papermill-error-cell-tag" in cell.metadata.get("tags", []) for cell in nb.cells), 2)
 
+    def test_error_markers_written_with_final_save(self):
+        path = get_notebook_path('broken1.ipynb')
+        result_path = os.path.join(self.test_dir, 'broken1.ipynb')
+        with patch('papermill.execute.write_ipynb') as write_mock:
+            with self.assertRaises(PapermillExecutionError) as context:
+                execute_notebook(path, result_path)
+        # The engine's final save already included the error markers
+        write_mock.assert_not_called()
+        self.assertEqual(context.exception.cell_index, 4)
+        self.assertEqual(context.exception.exec_count, 2)
+
+    def test_error_markers_without_cell_saves(self):
+        path = get_notebook_path('broken1.ipynb')
+        result_path = os.path.join(self.test_dir, 'broken1.ipynb')
+        with self.assertRaises(PapermillExecutionError):
+            execute_notebook(path, result_path, request_save_on_cell_execute=False)
+        nb = load_notebook_node(result_path)
+        self.assertEqual(sum("papermill-error-cell-tag" in cell.metadata.get("tags", []) for cell in nb.cells), 2)
+        self.assertEqual(nb.metadata.papermill['exception_cell_index'], 4)
+
 
 class TestBrokenNotebook2(unittest.TestCase):
     def setUp(self):
@@ -210,6 +231,66 @@ class TestReportMode(unittest.TestCase):
                 self.assertEqual(cell.metadata.get('jupyter', {}).get('source_hidden'), True)
 
 
+class TestFinalWrite(unittest.TestCase):
+    def setUp(self):
+        self.test_dir = tempfile.mkdtemp()
+        self.result_path = os.path.join(self.test_dir, 'output.ipynb')
+
+    def tearDown(self):
+        shutil.rmtree(self.test_dir)
+
+    def _final_writes(self, write_mock):
+        # Intermediate saves are compact, final documents are indented
+        return [c for c in write_mock.call_args_list if c.args[1] == self.result_path and c.args[0].startswith('{\n')]
+
+    def test_final_write_not_repeated(self):
+        with patch.object(iorw.papermill_io, 'write', wraps=iorw.papermill_io.write) as write_mock:
+            nb = execute_notebook(get_notebook_path('simple_execute.ipynb'), self.result_path)
+        self.assertEqual(len(self._final_writes(write_mock)), 1)
+        self.assertGreater(nb.metadata.papermill['bytes_written'], 0)
+        self.assertEqual(
+            load_notebook_node(self.result_path).metadata.papermill['bytes_written'],
+            nb.metadata.papermill['bytes_written'],
+        )
+
+    def test_final_write_without_cell_saves(self):
+        with patch.object(iorw.papermill_io, 'write', wraps=iorw.papermill_io.write) as write_mock:
+            nb = execute_notebook(
+                get_notebook_path('simple_execute.ipynb'), self.result_path, request_save_on_cell_execute=False
+            )
+        self.assertEqual(len(self._final_writes(write_mock)), 1)
+        self.assertNotIn('bytes_written', nb.metadata.papermill)
+
+    def test_final_document_serialized_once(self):
+        with patch.object(iorw, 'notebook_dumps', wraps=iorw.notebook_dumps) as dumps_mock:
+            execute_notebook(get_notebook_path('simple_execute.ipynb'), self.result_path)
+        final_dumps = [c for c in dumps_mock.call_args_list if not c.kwargs['compact']]
+        self.assertEqual(len(final_dumps), 1)
+        self.assertEqual(len([c for c in dumps_mock.call_args_list if c.kwargs['validate']]), 1)
+
+    def test_outputs_offloaded_once(self):
+        path = get_notebook_path('simple_execute.ipynb')
+        with patch('papermill.execute.offload_outputs', wraps=offload_outputs) as offload_mock:
+            execute_notebook(path, self.result_path, offload_threshold=1024)
+            execute_notebook(path, self.result_path, offload_threshold=1024, prepare_only=True)
+            # Only the manager offloads the outputs of the engine's saves
+            offload_mock.assert_not_called()
+            execute_notebook(path, self.result_path, offload_threshold=1024, request_save_on_cell_execute=False)
+            offload_mock.assert_called_once()
+
+    def test_final_write_by_engine_without_manager(self):
+        class UnmanagedEngine(engines.NBClientEngine):
+            @classmethod
+            def execute_notebook(cls, nb, kernel_name, **kwargs):
+                return nb
+
+        self.assertFalse(UnmanagedEngine.saves_output())
+        self.assertTrue(engines.NBClientEngine.saves_output())
+        with patch.dict(engines.papermill_engines._engines, {'unmanaged': UnmanagedEngine}):
+            execute_notebook(get_notebook_path('simple_execute.ipynb'), self.result_path, engine_name='unmanaged')
+        self.assertTrue(os.path.exists(self.result_path))
+
+
 class TestOutputPathNone(unittest.TestCase):
     def test_output_path_of_none(self):
         """Output path of None should return notebook node obj but not write an ipynb"""
@@ -253,6 +334,32 @@ class TestCWD(unittest.TestCase):
             execute_notebook(self.check_notebook_name, self.nb_test_executed_fname, cwd=self.test_dir)
         self.assertTrue(os.path.isfile(os.path.join(self.base_test_dir, self.nb_test_executed_fname)))
 
+    def test_process_cwd_unchanged(self):
+        # Only the kernel runs in `cwd`, concurrent executions don't race on the process directory
+        with chdir(self.base_test_dir), patch('os.chdir') as chdir_mock:
+            execute_notebook(self.check_notebook_name, self.nb_test_executed_fname, cwd=self.test_dir)
+        chdir_mock.assert_not_called()
+
+    def test_engine_without_cwd_support(self):
+        calls = []
+
+        class NoCwdEngine(engines.Engine):
+            @classmethod
+            def execute_managed_notebook(cls, nb_man, kernel_name, **kwargs):
+                calls.append((os.getcwd(), kwargs))
+
+        self.assertFalse(NoCwdEngine.supports_cwd())
+        with patch.dict(engines.papermill_engines._engines, {'no-cwd': NoCwdEngine}), chdir(self.base_test_dir):
+            execute_notebook(
+                self.simple_notebook_name, self.nb_test_executed_fname, cwd=self.test_dir, engine_name='no-cwd'
+            )
+            self.assertEqual(os.getcwd(), os.path.realpath(self.base_test_dir))
+        # Executed in `cwd` as the process directory, without an unexpected `cwd` argument
+        [(execution_cwd, kwargs)] = calls
+        self.assertEqual(execution_cwd, os.path.realpath(self.test_dir))
+        self.assertNotIn('cwd', kwargs)
+        self.assertTrue(os.path.isfile(os.path.join(self.base_test_dir, self.nb_test_executed_fname)))
+
     def test_pathlib_paths(self):
         # Copy of test_execution_respects_cwd_assignment but with `Path`s
         with chdir(self.base_test_dir):
@@ -355,6 +462,27 @@ class TestNotebookValidation(unittest.TestCase):
         nb = load_notebook_node(result_path)
         validate(nb)
 
+    def test_validation_policy_never(self):
+        result_path = os.path.join(self.test_dir, 'output.ipynb')
+        with patch('papermill.iorw._validate_notebook') as validate_mock:
+            execute_notebook(get_notebook_path('simple_execute.ipynb'), result_path, validation_policy='never')
+        validate_mock.assert_not_called()
+
+    def test_validation_policy_first_and_last(self):
+        result_path = os.path.join(self.test_dir, 'output.ipynb')
+        with patch('papermill.iorw._validate_notebook') as validate_mock:
+            execute_notebook(get_notebook_path('simple_execute.ipynb'), result_path)
+        # Once on load and on the engine's final save, which papermill doesn't repeat
+        self.assertEqual(validate_mock.call_count, 2)
+
+    def test_unknown_validation_policy(self):
+        with self.assertRaises(PapermillException):
+            execute_notebook(
+                get_notebook_path('simple_execute.ipynb'),
+                os.path.join(self.test_dir, 'output.ipynb'),
+                validation_policy='sometimes',
+            )
+
 
 class TestMinimalNotebook(unittest.TestCase):
     def setUp(self):
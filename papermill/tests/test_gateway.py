@@ -0,0 +1,206 @@
+import os
+import shutil
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+import unittest
+from unittest.mock import AsyncMock, Mock, patch
+
+import nbformat
+import pytest
+import requests
+
+from .. import engines
+from ..exceptions import PapermillException, PapermillOptionalDependencyException
+from ..execute import execute_notebook
+from . import kernel_name
+
+gateway = pytest.importorskip('papermill.gateway')
+
+GATEWAY_TOKEN = 'papermill-test-token'
+
+
+def _kernel_manager(kernel_id, alive=True):
+    km = Mock(kernel_id=kernel_id, kernels_url='http://gateway/api/kernels', kernel_name=kernel_name)
+    km.execution_state = 'idle'
+    km.refresh_model = AsyncMock(return_value={'id': kernel_id} if alive else None)
+    km.start_kernel = AsyncMock()
+    km.shutdown_kernel = AsyncMock()
+    return km
+
+
+class TestGatewayKernelPool(unittest.TestCase):
+    def setUp(self):
+        self.pool = gateway.GatewayKernelPool(max_idle=1)
+        patcher = patch.object(gateway, 'configure_gateway', return_value='http://gateway/api/kernels')
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_reuses_idle_kernel(self):
+        with patch.object(gateway, 'GatewayKernelManager', return_value=_kernel_manager('a')) as km_mock:
+            km, reused = self.pool.acquire(kernel_name)
+            self.assertFalse(reused)
+            km.start_kernel.assert_awaited_once_with(kernel_name=kernel_name)
+            self.pool.release(km)
+            self.assertEqual(self.pool.idle_count(kernel_name), 1)
+
+            self.assertEqual(self.pool.acquire(kernel_name), (km, True))
+        self.assertEqual(km_mock.call_count, 1)
+        self.assertEqual(self.pool.idle_count(), 0)
+
+    def test_discards_culled_kernel(self):
+        culled = _kernel_manager('a', alive=False)
+        self.pool.release(culled)
+        with patch.object(gateway, 'GatewayKernelManager', return_value=_kernel_manager('b')):
+            km, reused = self.pool.acquire(kernel_name)
+        self.assertEqual((km.kernel_id, reused), ('b', False))
+
+    def test_release_without_reuse(self):
+        km = _kernel_manager('a')
+        self.pool.release(km, reuse=False)
+        km.shutdown_kernel.assert_awaited_once()
+        self.assertEqual(self.pool.idle_count(), 0)
+
+    def test_max_idle(self):
+        kept, extra = _kernel_manager('a'), _kernel_manager('b')
+        self.pool.release(kept)
+        self.pool.release(extra)
+        self.assertEqual(self.pool.idle_count(), 1)
+        extra.shutdown_kernel.assert_awaited_once()
+        kept.shutdown_kernel.assert_not_awaited()
+
+
+class TestConfigureGateway(unittest.TestCase):
+    def setUp(self):
+        patcher = patch.object(gateway, 'GatewayClient')
+        self.client = patcher.start().instance.return_value
+        self.client.kernels_endpoint = '/api/kernels'
+        self.addCleanup(patcher.stop)
+
+    def test_configure(self):
+        self.assertEqual(gateway.configure_gateway('https://gateway:8888', 'token'), 'https://gateway:8888/api/kernels')
+        self.assertEqual(self.client.ws_url, 'wss://gateway:8888')
+        self.assertEqual(self.client.auth_token, 'token')
+
+    def test_no_gateway_configured(self):
+        self.client.url = None
+        with self.assertRaises(PapermillException):
+            gateway.configure_gateway()
+
+
+class TestGatewayEngine(unittest.TestCase):
+    def test_missing_dependency(self):
+        nb_man = Mock(nb=nbformat.v4.new_notebook())
+        with patch.dict(sys.modules, {'papermill.gateway': None}):
+            with self.assertRaises(PapermillOptionalDependencyException):
+                engines.GatewayEngine.execute_managed_notebook(nb_man, kernel_name)
+
+    def test_interrupted_kernel_not_reused(self):
+        pool = Mock(acquire=Mock(return_value=(Mock(), False)))
+        nb_man = Mock(nb=nbformat.v4.new_notebook(metadata={'language_info': {'name': 'python'}}))
+        with (
+            patch.object(gateway, 'gateway_kernels', pool),
+            patch.object(engines.NBClientEngine, 'execute_managed_notebook', side_effect=KeyboardInterrupt),
+        ):
+            with self.assertRaises(KeyboardInterrupt):
+                engines.GatewayEngine.execute_managed_notebook(nb_man, kernel_name)
+        pool.release.assert_called_once_with(pool.acquire.return_value[0], reuse=False)
+
+    def test_kernel_manager_rejected(self):
+        pool = Mock()
+        nb_man = Mock(nb=nbformat.v4.new_notebook())
+        with patch.object(gateway, 'gateway_kernels', pool):
+            with self.assertRaises(PapermillException):
+                engines.GatewayEngine.execute_managed_notebook(nb_man, kernel_name, km=Mock())
+        pool.acquire.assert_not_called()
+
+    def test_jupyter_server_imported_lazily(self):
+        code = "import sys, papermill.engines; print('jupyter_server' in sys.modules)"
+        self.assertEqual(subprocess.check_output([sys.executable, '-c', code], text=True).strip(), 'False')
+
+
+def _free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+class TestGatewayExecution(unittest.TestCase):
+    """Executes notebooks against a jupyter server started locally as the gateway."""
+
+    @classmethod
+    def setUpClass(cls):
+        cls.root_dir = tempfile.mkdtemp()
+        cls.url = f'http://127.0.0.1:{_free_port()}'
+        cls.server = subprocess.Popen(
+            [
+                sys.executable,
+                '-m',
+                'jupyter_server',
+                '--no-browser',
+                '--ServerApp.allow_root=True',
+                f'--ServerApp.port={cls.url.rsplit(":", 1)[1]}',
+                f'--ServerApp.root_dir={cls.root_dir}',
+                f'--IdentityProvider.token={GATEWAY_TOKEN}',
+            ],
+            stdout=subprocess.DEVNULL,
+            stderr=subprocess.DEVNULL,
+        )
+        deadline = time.monotonic() + 30
+        while time.monotonic() < deadline:
+            try:
+                requests.get(f'{cls.url}/api', timeout=1).raise_for_status()
+                return
+            except requests.RequestException:
+                if cls.server.poll() is not None:
+                    break
+                time.sleep(0.2)
+        cls.tearDownClass()
+        raise unittest.SkipTest('Could not start a local jupyter server as the kernel gateway')
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.server.terminate()
+        cls.server.wait(10)
+        shutil.rmtree(cls.root_dir)
+
+    def setUp(self):
+        self.test_dir = tempfile.mkdtemp()
+        self.pool = gateway.GatewayKernelPool()
+        patcher = patch.object(gateway, 'gateway_kernels', self.pool)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def tearDown(self):
+        self.pool.shutdown()
+        shutil.rmtree(self.test_dir)
+
+    def execute(self, name, source, **kwargs):
+        nb = nbformat.v4.new_notebook(cells=[nbformat.v4.new_code_cell(source)])
+        nb.metadata.kernelspec = {'display_name': 'Python 3', 'language': 'python', 'name': kernel_name}
+        input_path = os.path.join(self.test_dir, f'{name}.ipynb')
+        nbformat.write(nb, input_path)
+        return execute_notebook(
+            input_path,
+            os.path.join(self.test_dir, f'{name}_out.ipynb'),
+            engine_name='gateway',
+            gateway_url=self.url,
+            gateway_auth_token=GATEWAY_TOKEN,
+            progress_bar=False,
+            **kwargs,
+        )
+
+    def test_kernel_reused_with_cleared_namespace(self):
+        first = self.execute('first', 'import os\nleaked = 1\nprint(os.getpid())')
+        self.assertEqual(self.pool.idle_count(kernel_name), 1)
+        second = self.execute('second', "import os\nprint(os.getpid(), 'leaked' in globals())")
+        self.assertEqual(self.pool.idle_count(kernel_name), 1)
+        self.assertEqual(second.cells[0].outputs[0].text, f"{first.cells[0].outputs[0].text.strip()} False\n")
+
+    def test_kernel_not_reused(self):
+        first = self.execute('first', 'import os\nprint(os.getpid())', reuse_kernel=False)
+        second = self.execute('second', 'import os\nprint(os.getpid())', reuse_kernel=False)
+        self.assertEqual(self.pool.idle_count(), 0)
+        self.assertNotEqual(first.cells[0].outputs[0].text, second.cells[0].outputs[0].text)
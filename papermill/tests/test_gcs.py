@@ -1,8 +1,11 @@
 import unittest
+from datetime import datetime, timezone
 from unittest.mock import patch
 
-from ..exceptions import PapermillRateLimitException
-from ..iorw import GCSHandler, fallback_gs_is_retriable
+from ..exceptions import PapermillException, PapermillRateLimitException
+from ..iorw import GCSHandler, PapermillIO, fallback_gs_is_retriable, papermill_io
+from ..models import FileEntry
+from ..retry import RetryPolicy
 
 try:
     try:
@@ -68,6 +71,13 @@ class GCSTest(unittest.TestCase):
 
     def setUp(self):
         self.gcs_handler = GCSHandler()
+        # gcsfs retries requests on its own, a policy set for gs:// retries on top of it
+        self.papermill_io = PapermillIO()
+        self.papermill_io.register('gs://', self.gcs_handler)
+        self.papermill_io.set_retry_policy(RetryPolicy(base_delay=0))
+
+    def test_gcs_not_retried_by_default(self):
+        self.assertIsNone(papermill_io.get_retry_policy('gs://'))
 
     @patch('papermill.iorw.GCSFileSystem', side_effect=mock_gcs_fs_wrapper())
     def test_gcs_read(self, mock_gcs_filesystem):
@@ -95,31 +105,22 @@ class GCSTest(unittest.TestCase):
         side_effect=mock_gcs_fs_wrapper(GCSRateLimitException({"message": "test", "code": 429}), 10),
     )
     def test_gcs_handle_exception(self, mock_gcs_filesystem):
-        with patch.object(GCSHandler, 'RETRY_DELAY', 0):
-            with patch.object(GCSHandler, 'RETRY_MULTIPLIER', 0):
-                with patch.object(GCSHandler, 'RETRY_MAX_DELAY', 0):
-                    with self.assertRaises(PapermillRateLimitException):
-                        self.gcs_handler.write('raise_limit_exception', 'gs://bucket/test.ipynb')
+        with self.assertRaises(PapermillRateLimitException):
+            self.papermill_io.write('raise_limit_exception', 'gs://bucket/test.ipynb')
 
     @patch(
         'papermill.iorw.GCSFileSystem',
         side_effect=mock_gcs_fs_wrapper(GCSRateLimitException({"message": "test", "code": 429}), 1),
     )
     def test_gcs_retry(self, mock_gcs_filesystem):
-        with patch.object(GCSHandler, 'RETRY_DELAY', 0):
-            with patch.object(GCSHandler, 'RETRY_MULTIPLIER', 0):
-                with patch.object(GCSHandler, 'RETRY_MAX_DELAY', 0):
-                    self.assertEqual(self.gcs_handler.write('raise_limit_exception', 'gs://bucket/test.ipynb'), 2)
+        self.assertEqual(self.papermill_io.write('raise_limit_exception', 'gs://bucket/test.ipynb'), 2)
 
     @patch(
         'papermill.iorw.GCSFileSystem',
         side_effect=mock_gcs_fs_wrapper(GCSHttpError({"message": "test", "code": 429}), 1),
     )
     def test_gcs_retry_older_exception(self, mock_gcs_filesystem):
-        with patch.object(GCSHandler, 'RETRY_DELAY', 0):
-            with patch.object(GCSHandler, 'RETRY_MULTIPLIER', 0):
-                with patch.object(GCSHandler, 'RETRY_MAX_DELAY', 0):
-                    self.assertEqual(self.gcs_handler.write('raise_limit_exception', 'gs://bucket/test.ipynb'), 2)
+        self.assertEqual(self.papermill_io.write('raise_limit_exception', 'gs://bucket/test.ipynb'), 2)
 
     @patch('papermill.iorw.gs_is_retriable', side_effect=fallback_gs_is_retriable)
     @patch(
@@ -127,10 +128,7 @@ class GCSTest(unittest.TestCase):
         side_effect=mock_gcs_fs_wrapper(GCSRateLimitException({"message": "test", "code": None}), 1),
     )
     def test_gcs_fallback_retry_unknown_failure_code(self, mock_gcs_filesystem, mock_gcs_retriable):
-        with patch.object(GCSHandler, 'RETRY_DELAY', 0):
-            with patch.object(GCSHandler, 'RETRY_MULTIPLIER', 0):
-                with patch.object(GCSHandler, 'RETRY_MAX_DELAY', 0):
-                    self.assertEqual(self.gcs_handler.write('raise_limit_exception', 'gs://bucket/test.ipynb'), 2)
+        self.assertEqual(self.papermill_io.write('raise_limit_exception', 'gs://bucket/test.ipynb'), 2)
 
     @patch('papermill.iorw.gs_is_retriable', return_value=False)
     @patch(
@@ -157,3 +155,71 @@ class GCSTest(unittest.TestCase):
     def test_gcs_unretryable(self, mock_gcs_filesystem):
         with self.assertRaises(ValueError):
             self.gcs_handler.write('no_a_rate_limit', 'gs://bucket/test.ipynb')
+
+    @patch('papermill.iorw.GCSFileSystem')
+    def test_gcs_client_options(self, mock_gcs_filesystem):
+        handler = GCSHandler(project='project', token='cache', block_size=2**20, consistency='md5', timeout=30)
+        handler._get_client()
+        mock_gcs_filesystem.assert_called_once_with(
+            project='project', token='cache', block_size=2**20, consistency='md5', timeout=30
+        )
+
+    def test_gcs_invalid_upload_chunk_size(self):
+        with self.assertRaises(PapermillException):
+            GCSHandler(upload_chunk_size=1000)
+
+    @patch('papermill.iorw.GCSFileSystem')
+    def test_gcs_chunked_binary_write(self, mock_gcs_filesystem):
+        handler = GCSHandler(upload_chunk_size=2**19)
+        handler.write('caf\u00e9', 'gs://bucket/test.ipynb')
+        client = mock_gcs_filesystem.return_value
+        client.open.assert_called_once_with('gs://bucket/test.ipynb', 'wb', block_size=2**19)
+        client.open.return_value.__enter__.return_value.write.assert_called_once_with('caf\u00e9'.encode('utf-8'))
+
+    @patch(
+        'papermill.iorw.GCSFileSystem',
+        side_effect=mock_gcs_fs_wrapper(GCSRateLimitException({"message": "test", "code": 429}), 1),
+    )
+    def test_gcs_read_retry(self, mock_gcs_filesystem):
+        self.assertEqual(self.papermill_io.read('gs://bucket/test.ipynb'), 2)
+
+    @patch(
+        'papermill.iorw.GCSFileSystem',
+        side_effect=mock_gcs_fs_wrapper(GCSRateLimitException({"message": "test", "code": 429}), 1),
+    )
+    def test_gcs_retriable_error_raised(self, mock_gcs_filesystem):
+        with self.assertRaises(PapermillRateLimitException):
+            self.gcs_handler.write('raise_limit_exception', 'gs://bucket/test.ipynb')
+        self.assertEqual(self.gcs_handler._get_client().open().write_count, 1)
+
+    @patch(
+        'papermill.iorw.GCSFileSystem',
+        side_effect=mock_gcs_fs_wrapper(ValueError("not-a-retry"), 1),
+    )
+    def test_gcs_read_unretryable(self, mock_gcs_filesystem):
+        with self.assertRaises(ValueError):
+            self.gcs_handler.read('gs://bucket/test.ipynb')
+
+    @patch('papermill.iorw.GCSFileSystem')
+    def test_gcs_glob(self, mock_gcs_filesystem):
+        mtime = datetime(2024, 1, 1, tzinfo=timezone.utc)
+        client = mock_gcs_filesystem.return_value
+        client.ls.return_value = [
+            {'name': 'bucket/runs/a.ipynb', 'type': 'file', 'size': 10, 'mtime': mtime, 'etag': 'x'},
+            {'name': 'bucket/runs/b.txt', 'type': 'file', 'size': 10, 'mtime': mtime, 'etag': 'y'},
+            {'name': 'bucket/runs/2024', 'type': 'directory', 'size': 0},
+        ]
+        self.assertEqual(
+            self.gcs_handler.glob('gs://bucket/runs/*.ipynb'),
+            [FileEntry('gs://bucket/runs/a.ipynb', 10, mtime.timestamp(), 'x')],
+        )
+        client.ls.assert_called_once_with('gs://bucket/runs', detail=True, prefix='')
+
+        client.find.return_value = {
+            'bucket/runs/2024/c.ipynb': {'name': 'bucket/runs/2024/c.ipynb', 'type': 'file', 'size': 5}
+        }
+        self.assertEqual(
+            self.gcs_handler.glob('gs://bucket/runs/20*/*.ipynb'),
+            [FileEntry('gs://bucket/runs/2024/c.ipynb', 5, None, None)],
+        )
+        client.find.assert_called_once_with('gs://bucket/runs', prefix='20', detail=True)
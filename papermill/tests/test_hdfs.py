@@ -1,11 +1,20 @@
 import unittest
+from datetime import datetime, timezone
 from unittest.mock import MagicMock, patch
 
-from ..iorw import HDFSHandler
+from ..iorw import FileSelector, HDFSHandler
+from ..models import FileEntry
 
 
 class MockHadoopFileSystem(MagicMock):
     def get_file_info(self, path):
+        if isinstance(path, FileSelector) and path.recursive:
+            return [
+                MockFileInfo('/Projects/test1.ipynb', size=10),
+                MockFileInfo('/Projects/nested', is_file=False),
+                MockFileInfo('/Projects/nested/test3.ipynb', size=5),
+                MockFileInfo('/Projects/nested/data.csv', size=5),
+            ]
         return [MockFileInfo('test1.ipynb'), MockFileInfo('test2.ipynb')]
 
     def open_input_stream(self, path):
@@ -34,8 +43,11 @@ class MockHadoopFile:
 
 
 class MockFileInfo:
-    def __init__(self, path):
+    def __init__(self, path, size=0, is_file=True):
         self.path = path
+        self.size = size
+        self.mtime = datetime(2024, 1, 1, tzinfo=timezone.utc)
+        self.is_file = is_file
 
 
 @patch('papermill.iorw.HadoopFileSystem', side_effect=MockHadoopFileSystem())
@@ -58,3 +70,13 @@ class HDFSTest(unittest.TestCase):
         client = self.hdfs_handler._get_client()
         self.assertEqual(self.hdfs_handler.write('New content', "hdfs:///Projects/test1.ipynb"), 1)
         self.assertIs(client, self.hdfs_handler._get_client())
+
+    def test_hdfs_glob(self, mock_hdfs_filesystem):
+        mtime = datetime(2024, 1, 1, tzinfo=timezone.utc).timestamp()
+        self.assertEqual(
+            self.hdfs_handler.glob("hdfs:///Projects/**/*.ipynb"),
+            [
+                FileEntry('/Projects/nested/test3.ipynb', 5, mtime, None),
+                FileEntry('/Projects/test1.ipynb', 10, mtime, None),
+            ],
+        )
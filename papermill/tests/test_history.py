@@ -0,0 +1,132 @@
+import os
+import shutil
+import tempfile
+import unittest
+from unittest.mock import patch
+
+import nbformat
+
+from .. import pipeline
+from ..engines import NotebookExecutionManager
+from ..execute import execute_notebook
+from ..history import DurationHistory, history_path_key, longest_first
+from ..pipeline import Pipeline, Stage
+from . import get_notebook_path, kernel_name
+
+
+def _executed_notebook(input_path, durations, exception=False):
+    nb = nbformat.v4.new_notebook(cells=[nbformat.v4.new_code_cell(f'x = {i}') for i in range(len(durations))])
+    nb.cells.insert(0, nbformat.v4.new_markdown_cell('# Title'))
+    nb.metadata.papermill = {'input_path': input_path, 'duration': sum(durations), 'exception': exception}
+    nb.cells[0].metadata.papermill = {'status': 'completed', 'duration': 0.0}
+    for cell, duration in zip(nb.cells[1:], durations):
+        cell.metadata.papermill = {'status': 'completed', 'duration': duration}
+    return nb
+
+
+class TestDurationHistory(unittest.TestCase):
+    def setUp(self):
+        self.test_dir = tempfile.mkdtemp()
+        self.history = DurationHistory(os.path.join(self.test_dir, 'history.db'))
+        self.input_path = os.path.join(self.test_dir, 'input.ipynb')
+
+    def tearDown(self):
+        shutil.rmtree(self.test_dir)
+
+    def test_path_key(self):
+        self.assertEqual(history_path_key('s3://bucket/a.ipynb'), 's3://bucket/a.ipynb')
+        self.assertEqual(history_path_key('a.ipynb'), os.path.abspath('a.ipynb'))
+        self.assertIsNone(history_path_key(None))
+
+    def test_no_history(self):
+        self.assertIsNone(self.history.cell_estimates(_executed_notebook(self.input_path, [1.0])))
+        self.assertIsNone(self.history.expected_duration(self.input_path))
+
+    def test_record(self):
+        self.history.record(_executed_notebook(self.input_path, [2.0, 4.0]))
+        self.history.record(_executed_notebook(self.input_path, [4.0, 4.0]))
+
+        nb = _executed_notebook(self.input_path, [0, 0, 0])
+        self.assertEqual(self.history.cell_estimates(nb), [0.0, 3.0, 4.0, None])
+        self.assertEqual(self.history.expected_duration(self.input_path), 7.0)
+
+    def test_record_failed_notebook(self):
+        self.history.record(_executed_notebook(self.input_path, [2.0], exception=True))
+        self.assertEqual(self.history.cell_estimates(_executed_notebook(self.input_path, [0])), [0.0, 2.0])
+        self.assertIsNone(self.history.expected_duration(self.input_path))
+
+    def test_record_skips_injected_parameters_and_resumed_cells(self):
+        nb = _executed_notebook(self.input_path, [2.0, 3.0, 5.0])
+        nb.cells[3].metadata['tags'] = ['injected-parameters']
+        self.history.record(nb, resumed_from=2)
+        self.assertEqual(self.history.cell_estimates(nb), [0.0, None, 3.0, None])
+        self.assertIsNone(self.history.expected_duration(self.input_path))
+
+    def test_longest_first(self):
+        for name, duration in [('short', 1.0), ('long', 10.0)]:
+            self.history.record(_executed_notebook(name, [duration]))
+        self.assertEqual(
+            longest_first(['short', 'long', 'new', 'other'], self.history), ['new', 'other', 'long', 'short']
+        )
+
+
+class TestProgressEstimates(unittest.TestCase):
+    def setUp(self):
+        self.test_dir = tempfile.mkdtemp()
+        self.history = DurationHistory(os.path.join(self.test_dir, 'history.db'))
+
+    def tearDown(self):
+        shutil.rmtree(self.test_dir)
+
+    def test_progress_bar_counts_seconds(self):
+        self.history.record(_executed_notebook('input.ipynb', [2.0, 6.0]))
+        nb = _executed_notebook('input.ipynb', [0, 0])
+        nb_man = NotebookExecutionManager(nb, history=self.history)
+        self.assertEqual((nb_man.pbar.unit, nb_man.pbar.total), ('s', 8.0))
+
+        nb_man.notebook_start()
+        nb_man.mark_cells_completed([nb.cells[0]])
+        nb_man.cell_start(nb.cells[1], 1)
+        nb.cells[1].metadata.papermill['start_time'] = '2000-01-01T00:00:00+00:00'
+        with patch.object(nb_man, 'now', return_value=nb_man.now().fromisoformat('2000-01-01T00:00:03+00:00')):
+            nb_man.cell_complete(nb.cells[1], 1)
+        # The first cell took a second longer than expected, the second is still expected to take 6s
+        self.assertEqual((nb_man.pbar.n, nb_man.pbar.total), (3.0, 9.0))
+        nb_man.pbar.close()
+
+    def test_execute_records_history(self):
+        history_path = os.path.join(self.test_dir, 'history.db')
+        input_path = get_notebook_path('simple_execute.ipynb')
+        for _ in range(2):
+            execute_notebook(
+                input_path,
+                os.path.join(self.test_dir, 'output.ipynb'),
+                {'msg': 'history'},
+                kernel_name=kernel_name,
+                progress_bar=False,
+                history=history_path,
+            )
+        history = DurationHistory(history_path)
+        self.assertGreater(history.expected_duration(input_path), 0)
+        estimates = history.cell_estimates(execute_notebook(input_path, None, prepare_only=True))
+        self.assertTrue(all(estimate is not None for estimate in estimates))
+
+
+class TestLongestFirstPipeline(unittest.TestCase):
+    def setUp(self):
+        self.test_dir = tempfile.mkdtemp()
+        self.history = DurationHistory(os.path.join(self.test_dir, 'history.db'))
+
+    def tearDown(self):
+        shutil.rmtree(self.test_dir)
+
+    def test_ready_stages_longest_first(self):
+        for name, duration in [('a.ipynb', 1.0), ('b.ipynb', 5.0), ('c.ipynb', 3.0)]:
+            self.history.record(_executed_notebook(name, [duration]))
+        stages = [Stage(name, f'{name}.ipynb', f'{name}_out.ipynb') for name in 'abc']
+        stages.append(Stage('d', 'd.ipynb', 'd_out.ipynb', depends_on=['a']))
+
+        with patch.object(pipeline, 'execute_notebook') as execute_mock:
+            Pipeline(stages).run(max_workers=1, history=self.history)
+        order = [call.args[0] for call in execute_mock.call_args_list]
+        self.assertEqual(order, ['b.ipynb', 'c.ipynb', 'a.ipynb', 'd.ipynb'])
@@ -8,22 +8,35 @@ from unittest.mock import Mock, patch
 
 import nbformat
 import pytest
-from requests.exceptions import ConnectionError
+import requests
+from azure.core.exceptions import ResourceNotFoundError
+from botocore.exceptions import ClientError
+from requests.exceptions import ConnectionError, HTTPError
 
 from .. import iorw
 from ..exceptions import PapermillException
 from ..iorw import (
     ADLHandler,
     HttpHandler,
+    JSONBackend,
     LocalHandler,
     NoIOHandler,
     NotebookNodeHandler,
     PapermillIO,
     StreamHandler,
+    get_json_backend,
+    json_backends,
+    list_notebook_files,
     local_file_io_cwd,
+    notebook_dumps,
+    notebook_loads,
     papermill_io,
     read_yaml_file,
+    upgrade_notebook,
+    write_ipynb,
 )
+from ..models import FileEntry
+from ..retry import RetryPolicy
 from . import get_notebook_path
 
 FIXTURE_PATH = os.path.join(os.path.dirname(__file__), 'fixtures')
@@ -100,6 +113,23 @@ class TestPapermillIO(unittest.TestCase):
         test_nb = nbformat.read(get_notebook_path('test_notebooknode_io.ipynb'), as_version=4)
         self.assertIsInstance(self.papermill_io.get_handler(test_nb), NotebookNodeHandler)
 
+    def test_missing_file_errors_translated(self):
+        missing = [
+            ClientError({'Error': {'Code': 'NoSuchKey'}, 'ResponseMetadata': {'HTTPStatusCode': 404}}, 'GetObject'),
+            ResourceNotFoundError('The specified blob does not exist.'),
+            HTTPError(response=Mock(status_code=404)),
+        ]
+        for error in missing:
+            with patch.object(self.fake1, 'read', side_effect=error):
+                with self.assertRaises(FileNotFoundError) as raised:
+                    self.papermill_io.read('fake/missing.ipynb')
+            self.assertIs(raised.exception.__cause__, error)
+
+        denied = ClientError({'Error': {'Code': 'AccessDenied'}}, 'GetObject')
+        with patch.object(self.fake1, 'read', side_effect=denied):
+            with self.assertRaises(ClientError):
+                self.papermill_io.read('fake/denied.ipynb')
+
     def test_entrypoint_register(self):
         fake_entrypoint = Mock(load=Mock())
         fake_entrypoint.name = "fake-from-entry-point://"
@@ -158,6 +188,28 @@ class TestPapermillIO(unittest.TestCase):
     def test_listdir(self):
         self.assertEqual(self.papermill_io.listdir("fake/path"), ["fake", "contents"])
 
+    def test_glob_without_handler_glob(self):
+        self.fake1.listdir = Mock(return_value=["fake/dir/b.ipynb", "fake/dir/a.ipynb", "fake/dir/c.txt"])
+        self.assertEqual(
+            self.papermill_io.glob("fake/dir/*.ipynb"),
+            [FileEntry("fake/dir/a.ipynb", None, None, None), FileEntry("fake/dir/b.ipynb", None, None, None)],
+        )
+        self.fake1.listdir.assert_called_once_with("fake/dir")
+        with self.assertRaises(PapermillException):
+            self.papermill_io.glob("fake/**/*.ipynb")
+
+    def test_glob(self):
+        self.fake1.glob = Mock(return_value=[FileEntry("fake/a.ipynb", 1, 2.0, "etag")])
+        self.assertEqual(self.papermill_io.glob("fake/*.ipynb"), [FileEntry("fake/a.ipynb", 1, 2.0, "etag")])
+        self.fake1.glob.assert_called_once_with("fake/*.ipynb")
+
+    def test_list_notebook_files(self):
+        self.fake1.glob = Mock(return_value=[FileEntry("fake/dir/a.ipynb", 1, 2.0, None)])
+        self.assertEqual(list_notebook_files("fake/dir/"), ["fake/dir/a.ipynb"])
+        self.fake1.glob.assert_called_once_with("fake/dir/*.ipynb")
+        list_notebook_files("fake/dir", recursive=True)
+        self.fake1.glob.assert_called_with("fake/dir/**/*.ipynb")
+
     def test_write(self):
         self.assertEqual(self.papermill_io.write("buffer", "fake/path"), "wrote buffer")
 
@@ -222,7 +274,7 @@ class TestLocalHandler(unittest.TestCase):
         with TemporaryDirectory() as temp_dir:
             # Some internal model fixing to avoid side-effecting anything else that
             # reads from the module global defaults
-            handlers = papermill_io._handlers
+            state = vars(papermill_io).copy()
             try:
                 local_handler = LocalHandler()
                 papermill_io.reset()
@@ -237,7 +289,8 @@ class TestLocalHandler(unittest.TestCase):
                 with open(path, encoding='utf-8') as f:
                     self.assertEqual(f.read().strip(), '✄')
             finally:
-                papermill_io.handlers = handlers
+                # reset() replaced the handlers and retry policies
+                vars(papermill_io).update(state)
 
     def test_read_from_string(self):
         nbnode_as_string = nbformat.writes(nbformat.v4.new_notebook())
@@ -250,6 +303,100 @@ class TestLocalHandler(unittest.TestCase):
         with self.assertRaises(IOError):
             LocalHandler().read("a random string")
 
+    def test_read_json_file_before_string(self):
+        with TemporaryDirectory() as temp_dir:
+            handler = LocalHandler()
+            handler.cwd(temp_dir)
+            handler.write('notebook', '{named}.ipynb')
+            self.assertEqual(handler.read('{named}.ipynb'), 'notebook')
+
+    def test_read_mmap(self):
+        with TemporaryDirectory() as temp_dir:
+            path = os.path.join(temp_dir, 'paper.txt')
+            LocalHandler().write('✄' * 100, path)
+            with patch.object(iorw.mmap, 'mmap', wraps=iorw.mmap.mmap) as mmap_mock:
+                self.assertEqual(LocalHandler(mmap_threshold=1).read(path), '✄' * 100)
+                mmap_mock.assert_called_once()
+                self.assertEqual(LocalHandler().read(path), '✄' * 100)
+                mmap_mock.assert_called_once()
+
+    def test_relative_paths_keep_process_cwd(self):
+        with TemporaryDirectory() as temp_dir:
+            cwd = os.getcwd()
+            handler = LocalHandler()
+            handler.cwd(temp_dir)
+            with patch.object(os, 'chdir') as chdir_mock:
+                handler.makedirs('runs')
+                handler.write('✄', os.path.join('runs', 'paper.txt'))
+                self.assertEqual(handler.read(os.path.join('runs', 'paper.txt')), '✄')
+                self.assertEqual(handler.listdir('runs'), [os.path.join('runs', 'paper.txt')])
+                handler.delete(os.path.join('runs', 'paper.txt'))
+            chdir_mock.assert_not_called()
+            self.assertEqual(os.getcwd(), cwd)
+            self.assertEqual(os.listdir(os.path.join(temp_dir, 'runs')), [])
+
+    def test_write_replaces_atomically(self):
+        with TemporaryDirectory() as temp_dir:
+            path = os.path.join(temp_dir, 'paper.txt')
+            handler = LocalHandler()
+            handler.write('old', path)
+            os.chmod(path, 0o640)
+            with patch.object(iorw.os, 'replace', side_effect=OSError('disk full')):
+                with self.assertRaises(OSError):
+                    handler.write('new', path)
+            self.assertEqual(handler.read(path), 'old')
+            self.assertEqual(os.listdir(temp_dir), ['paper.txt'])
+
+            handler.write('new', path)
+            self.assertEqual(handler.read(path), 'new')
+            self.assertEqual(os.stat(path).st_mode & 0o777, 0o640)
+            self.assertEqual(os.listdir(temp_dir), ['paper.txt'])
+
+    def test_write_through_symlink(self):
+        with TemporaryDirectory() as temp_dir:
+            path = os.path.join(temp_dir, 'paper.txt')
+            link = os.path.join(temp_dir, 'link.txt')
+            LocalHandler().write('old', path)
+            os.symlink(path, link)
+            LocalHandler().write('new', link)
+            self.assertTrue(os.path.islink(link))
+            self.assertEqual(LocalHandler().read(path), 'new')
+
+    def test_fsync_policy(self):
+        with TemporaryDirectory() as temp_dir:
+            path = os.path.join(temp_dir, 'paper.txt')
+            for policy, count in [('never', 0), ('file', 1), ('directory', 2)]:
+                with patch.object(iorw.os, 'fsync') as fsync_mock:
+                    LocalHandler(fsync=policy).write('✄', path)
+                self.assertEqual(fsync_mock.call_count, count, policy)
+
+            with patch.dict(os.environ, {'PAPERMILL_LOCAL_FSYNC': 'file'}):
+                self.assertEqual(LocalHandler().fsync, 'file')
+            with self.assertRaises(PapermillException):
+                LocalHandler(fsync='sometimes')
+
+    def test_glob(self):
+        with TemporaryDirectory() as temp_dir:
+            for path in ['a.ipynb', 'b.txt', 'runs/2023/c.ipynb', 'runs/2024/d.ipynb', 'runs/2024/deep/e.ipynb']:
+                os.makedirs(os.path.dirname(os.path.join(temp_dir, path)), exist_ok=True)
+                with open(os.path.join(temp_dir, path), 'w') as f:
+                    f.write('{}')
+
+            handler = LocalHandler()
+            entries = handler.glob(os.path.join(temp_dir, '*.ipynb'))
+            self.assertEqual([entry.path for entry in entries], [os.path.join(temp_dir, 'a.ipynb')])
+            self.assertEqual(entries[0].size, 2)
+            self.assertEqual(entries[0].mtime, os.path.getmtime(os.path.join(temp_dir, 'a.ipynb')))
+
+            handler.cwd(temp_dir)
+            self.assertEqual(
+                [entry.path for entry in handler.glob('runs/**/*.ipynb')],
+                ['runs/2023/c.ipynb', 'runs/2024/d.ipynb', 'runs/2024/deep/e.ipynb'],
+            )
+            self.assertEqual([entry.path for entry in handler.glob('runs/2024/*.ipynb')], ['runs/2024/d.ipynb'])
+            self.assertEqual([entry.path for entry in handler.glob('runs/*3/*')], ['runs/2023/c.ipynb'])
+            self.assertEqual(handler.glob('missing/*.ipynb'), [])
+
 
 class TestNoIOHandler(unittest.TestCase):
     def test_raises_on_read(self):
@@ -260,6 +407,10 @@ class TestNoIOHandler(unittest.TestCase):
         with self.assertRaises(PapermillException):
             NoIOHandler().listdir(None)
 
+    def test_raises_on_glob(self):
+        with self.assertRaises(PapermillException):
+            NoIOHandler().glob(None)
+
     def test_write_returns_none(self):
         self.assertIsNone(NoIOHandler().write('buf', None))
 
@@ -320,6 +471,21 @@ class TestHttpHandler(unittest.TestCase):
             self.assertEqual(HttpHandler.read(path), text)
             mock_get.assert_called_once_with(path, headers={'Accept': 'application/json'})
 
+    def test_read_retried(self):
+        path = 'http://example.com/notebook.ipynb'
+        papermill_io = PapermillIO()
+        papermill_io.register('http://', HttpHandler)
+        papermill_io.set_retry_policy(RetryPolicy(base_delay=0))
+        responses = []
+        for status, text in ((503, 'Service Unavailable'), (200, '{}')):
+            response = requests.Response()
+            response.status_code, response._content, response.url = status, text.encode(), path
+            responses.append(response)
+
+        with patch('papermill.iorw.requests.get', side_effect=responses) as mock_get:
+            self.assertEqual(papermill_io.read(path), '{}')
+        self.assertEqual(mock_get.call_count, 2)
+
     def test_write(self):
         """
         Tests that the `write` function performs a put request to the given
@@ -353,6 +519,10 @@ class TestStreamHandler(unittest.TestCase):
         with self.assertRaises(PapermillException):
             StreamHandler().listdir(None)
 
+    def test_raises_on_glob(self):
+        with self.assertRaises(PapermillException):
+            StreamHandler().glob(None)
+
     @patch('sys.stdout')
     def test_write_to_stdout_buffer(self, mock_stdout):
         mock_stdout.buffer = io.BytesIO()
@@ -393,3 +563,82 @@ class TestNotebookNodeHandler(unittest.TestCase):
     def test_pretty_path(self):
         expect = 'NotebookNode object'
         self.assertEqual(NotebookNodeHandler().pretty_path('foo'), expect)
+
+
+class TestNotebookSerialization(unittest.TestCase):
+    def setUp(self):
+        self.nb = nbformat.read(get_notebook_path('simple_execute.ipynb'), as_version=4)
+
+    def test_indented_matches_nbformat(self):
+        for name in json_backends:
+            with patch.dict(os.environ, {'PAPERMILL_JSON_BACKEND': name}):
+                self.assertEqual(notebook_dumps(self.nb), nbformat.writes(self.nb))
+
+    def test_compact_round_trip(self):
+        for name in json_backends:
+            with patch.dict(os.environ, {'PAPERMILL_JSON_BACKEND': name}):
+                buf = notebook_dumps(self.nb, compact=True, validate=False)
+                self.assertNotIn('\n ', buf)
+                self.assertEqual(notebook_loads(buf), self.nb)
+
+    def test_dumps_does_not_modify_notebook(self):
+        self.nb.metadata['orig_nbformat'] = 3
+        notebook_dumps(self.nb)
+        self.assertEqual(self.nb.metadata['orig_nbformat'], 3)
+
+    def test_loads_upgrades_v3(self):
+        nb = nbformat.v3.new_notebook(worksheets=[nbformat.v3.new_worksheet()])
+        self.assertEqual(notebook_loads(nbformat.writes(nb, version=3)).nbformat, 4)
+
+    def test_invalid_notebook_is_logged(self):
+        del self.nb.cells[0]['source']
+        with patch.object(iorw.logger, 'error') as error_mock:
+            notebook_dumps(self.nb, validate=False)
+            error_mock.assert_not_called()
+            notebook_dumps(self.nb)
+            error_mock.assert_called_once()
+
+    def test_get_json_backend(self):
+        self.assertIs(get_json_backend('json'), json_backends['json'])
+        self.assertIsInstance(get_json_backend(), JSONBackend)
+        with patch.dict(os.environ, {'PAPERMILL_JSON_BACKEND': 'json'}):
+            self.assertIs(get_json_backend(), json_backends['json'])
+
+    def test_unknown_json_backend(self):
+        with self.assertRaises(PapermillException):
+            get_json_backend('not-a-backend')
+
+
+class TestWriteIpynb(unittest.TestCase):
+    def setUp(self):
+        self.nb = nbformat.read(get_notebook_path('simple_execute.ipynb'), as_version=4)
+        self.test_dir = TemporaryDirectory()
+        self.path = os.path.join(self.test_dir.name, 'output.ipynb')
+
+    def tearDown(self):
+        self.test_dir.cleanup()
+
+    def test_returns_bytes_written(self):
+        size = write_ipynb(self.nb, self.path)
+        self.assertEqual(size, os.path.getsize(self.path))
+
+    def test_bytes_written_without_handler_size(self):
+        self.nb.cells[0].source = '✄'
+        with patch.object(iorw.papermill_io, 'write', return_value=None) as write_mock:
+            size = write_ipynb(self.nb, self.path)
+        self.assertEqual(size, len(write_mock.call_args.args[0].encode('utf-8')))
+        self.assertGreater(size, len(write_mock.call_args.args[0]))
+
+
+class TestUpgradeNotebook(unittest.TestCase):
+    def test_current_notebook_is_not_upgraded(self):
+        nb = nbformat.v4.new_notebook()
+        with patch.object(nbformat.v4, 'upgrade') as upgrade_mock:
+            self.assertIs(upgrade_notebook(nb), nb)
+        upgrade_mock.assert_not_called()
+
+    def test_older_minor_is_upgraded(self):
+        nb = nbformat.read(get_notebook_path('nb_version_4.4.ipynb'), as_version=4)
+        nb = upgrade_notebook(nb)
+        self.assertEqual(nb.nbformat_minor, nbformat.v4.nbformat_minor)
+        self.assertEqual(nb.metadata.orig_nbformat_minor, 4)
@@ -0,0 +1,102 @@
+import base64
+import os
+import unittest
+from tempfile import TemporaryDirectory
+
+import nbformat
+
+from ..engines import NotebookExecutionManager
+from ..exceptions import PapermillException
+from ..iorw import load_notebook_node
+from ..offload import offload_directory, offload_outputs, rehydrate_notebook, rehydrate_outputs
+
+PNG_PAYLOAD = base64.b64encode(b'\x89PNG' + b'\x00' * 2048).decode('ascii')
+
+
+def notebook_with_image():
+    nb = nbformat.v4.new_notebook()
+    cell = nbformat.v4.new_code_cell('plot()')
+    cell.outputs = [
+        nbformat.v4.new_output(
+            'display_data',
+            data={'image/png': PNG_PAYLOAD, 'text/plain': '<Figure>'},
+        ),
+        nbformat.v4.new_output('execute_result', data={'image/png': PNG_PAYLOAD}, execution_count=1),
+    ]
+    nb.cells.append(cell)
+    return nb
+
+
+class TestOffloadDirectory(unittest.TestCase):
+    def test_sibling_of_notebook(self):
+        self.assertEqual(offload_directory('s3://bucket/runs/out.ipynb'), 's3://bucket/runs/out_files')
+
+    def test_strips_query(self):
+        self.assertEqual(
+            offload_directory('abs://acc.blob.core.windows.net/c/out.ipynb?sas'),
+            'abs://acc.blob.core.windows.net/c/out_files',
+        )
+
+    def test_stdout_not_supported(self):
+        with self.assertRaises(PapermillException):
+            offload_directory('-')
+
+
+class TestOffloadOutputs(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = TemporaryDirectory()
+        self.output_path = os.path.join(self.temp_dir.name, 'out.ipynb')
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def test_offload_large_outputs(self):
+        nb = offload_outputs(notebook_with_image(), self.output_path, 1024)
+        display, result = nb.cells[0].outputs
+
+        self.assertNotIn('image/png', display.data)
+        self.assertEqual(display.data['text/plain'], '<Figure>')
+        reference = display.metadata['papermill']['offloaded']['image/png']
+        self.assertEqual(reference['path'], result.metadata['papermill']['offloaded']['image/png']['path'])
+        self.assertTrue(reference['path'].startswith(os.path.join(self.temp_dir.name, 'out_files')))
+        self.assertEqual(os.listdir(os.path.join(self.temp_dir.name, 'out_files')), [f"{reference['sha256']}.b64"])
+        nbformat.validate(nb)
+
+    def test_small_outputs_stay_inline(self):
+        nb = offload_outputs(notebook_with_image(), self.output_path, len(PNG_PAYLOAD) + 1)
+        self.assertEqual(nb.cells[0].outputs[0].data['image/png'], PNG_PAYLOAD)
+        self.assertFalse(os.path.exists(os.path.join(self.temp_dir.name, 'out_files')))
+
+    def test_written_blobs_are_not_rewritten(self):
+        written = set()
+        offload_outputs(notebook_with_image(), self.output_path, 1024, written=written)
+        blob_path = next(iter(written))
+        os.remove(blob_path)
+        offload_outputs(notebook_with_image(), self.output_path, 1024, written=written)
+        self.assertFalse(os.path.exists(blob_path))
+
+    def test_rehydrate_outputs(self):
+        nb = rehydrate_outputs(offload_outputs(notebook_with_image(), self.output_path, 1024))
+        self.assertEqual(nb.cells[0].outputs[0].data['image/png'], PNG_PAYLOAD)
+        self.assertEqual(nb.cells[0].outputs[1].data['image/png'], PNG_PAYLOAD)
+        self.assertNotIn('papermill', nb.cells[0].outputs[0].metadata)
+
+    def test_rehydrate_detects_modified_blobs(self):
+        nb = offload_outputs(notebook_with_image(), self.output_path, 1024)
+        with open(nb.cells[0].outputs[0].metadata['papermill']['offloaded']['image/png']['path'], 'w') as f:
+            f.write('tampered')
+        with self.assertRaises(PapermillException):
+            rehydrate_outputs(nb)
+
+    def test_manager_offloads_on_save(self):
+        nb_man = NotebookExecutionManager(
+            notebook_with_image(), output_path=self.output_path, progress_bar=False, offload_threshold=1024
+        )
+        nb_man.save()
+        saved = load_notebook_node(self.output_path)
+        self.assertNotIn('image/png', saved.cells[0].outputs[0].data)
+        self.assertEqual(len(nb_man.offloaded_paths), 1)
+
+        rehydrated_path = os.path.join(self.temp_dir.name, 'rehydrated.ipynb')
+        rehydrate_notebook(self.output_path, rehydrated_path)
+        self.assertEqual(load_notebook_node(rehydrated_path).cells[0].outputs[0].data['image/png'], PNG_PAYLOAD)
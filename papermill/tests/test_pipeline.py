@@ -0,0 +1,259 @@
+import json
+import os
+import shutil
+import tempfile
+import threading
+import time
+import unittest
+from unittest.mock import patch
+
+from .. import pipeline
+from ..engines import Engine, papermill_engines
+from ..exceptions import PapermillException, PapermillMissingParameterException
+from ..pipeline import Pipeline, Stage, run_pipeline
+from . import get_notebook_path, kernel_name
+
+
+class TestPipelineSpec(unittest.TestCase):
+    def test_from_spec(self):
+        p = Pipeline.from_spec(
+            {
+                'parameters': {'date': '2020-01-01'},
+                'stages': {
+                    'report': {
+                        'input': 'report.ipynb',
+                        'output': 'out/report.ipynb',
+                        'depends_on': ['transform'],
+                        'kernel_name': 'python3',
+                    },
+                    'transform': {
+                        'input': 'transform.ipynb',
+                        'output': 'out/transform_{date}.ipynb',
+                        'depends_on': ['extract'],
+                        'parameters': {'source': '{extract}'},
+                    },
+                    'extract': {'input': 'extract.ipynb', 'output': 'out/extract.ipynb'},
+                },
+            }
+        )
+        self.assertEqual(p.order, ['extract', 'transform', 'report'])
+        self.assertEqual(p.stages['report'].execute_kwargs, {'kernel_name': 'python3'})
+        self.assertEqual(p.stages['transform'].parameters, {'date': '2020-01-01', 'source': '{extract}'})
+        self.assertEqual(
+            p.stages['transform'].resolve({'extract': 'out/extract.ipynb'}),
+            ('out/transform_2020-01-01.ipynb', {'date': '2020-01-01', 'source': 'out/extract.ipynb'}),
+        )
+
+    def test_from_yaml(self):
+        test_dir = tempfile.mkdtemp()
+        try:
+            spec_path = os.path.join(test_dir, 'pipeline.yaml')
+            with open(spec_path, 'w') as f:
+                f.write('stages:\n  a:\n    input: a.ipynb\n    output: a_out.ipynb\n')
+            self.assertEqual(list(Pipeline.from_spec(spec_path).stages), ['a'])
+        finally:
+            shutil.rmtree(test_dir)
+
+    def test_missing_keys(self):
+        with self.assertRaises(PapermillException):
+            Pipeline.from_spec({'stages': {'a': {'input': 'a.ipynb'}}})
+        with self.assertRaises(PapermillException):
+            Pipeline.from_spec({'stages': {}})
+
+    def test_unknown_dependency(self):
+        with self.assertRaises(PapermillException):
+            Pipeline([Stage('a', 'a.ipynb', 'a_out.ipynb', depends_on=['b'])])
+
+    def test_cycle(self):
+        with self.assertRaisesRegex(PapermillException, 'cycle'):
+            Pipeline(
+                [
+                    Stage('a', 'a.ipynb', 'a_out.ipynb', depends_on=['b']),
+                    Stage('b', 'b.ipynb', 'b_out.ipynb', depends_on=['a']),
+                ]
+            )
+
+    def test_duplicate_stage(self):
+        with self.assertRaises(PapermillException):
+            Pipeline([Stage('a', 'a.ipynb', 'a_out.ipynb'), Stage('a', 'b.ipynb', 'b_out.ipynb')])
+
+    def test_missing_upstream_parameter(self):
+        stage = Stage('a', 'a.ipynb', 'a_out.ipynb', parameters={'source': '{missing}'})
+        with self.assertRaises(PapermillMissingParameterException):
+            stage.resolve({})
+
+    def test_critical_path(self):
+        p = Pipeline(
+            [
+                Stage('extract', 'e.ipynb', 'e_out.ipynb'),
+                Stage('lookup', 'l.ipynb', 'l_out.ipynb'),
+                Stage('transform', 't.ipynb', 't_out.ipynb', depends_on=['extract', 'lookup']),
+                Stage('report', 'r.ipynb', 'r_out.ipynb', depends_on=['transform']),
+                Stage('audit', 'a.ipynb', 'a_out.ipynb', depends_on=['extract']),
+            ]
+        )
+        path, duration = p.critical_path({'extract': 1, 'lookup': 3, 'transform': 2, 'report': 1, 'audit': 4})
+        self.assertEqual(path, ['lookup', 'transform', 'report'])
+        self.assertEqual(duration, 6)
+
+
+class TestPipelineRun(unittest.TestCase):
+    def setUp(self):
+        self.test_dir = tempfile.mkdtemp()
+        self.state_path = os.path.join(self.test_dir, 'state.json')
+        self.inputs = {}
+        for name in ('extract', 'transform', 'report'):
+            self.inputs[name] = os.path.join(self.test_dir, f'{name}.ipynb')
+            with open(self.inputs[name], 'w') as f:
+                f.write(json.dumps({'name': name}))
+        self.spec = {
+            'stages': {
+                'extract': {'input': self.inputs['extract'], 'output': 'extract_out.ipynb'},
+                'transform': {
+                    'input': self.inputs['transform'],
+                    'output': 'transform_out.ipynb',
+                    'depends_on': ['extract'],
+                    'parameters': {'source': '{extract}'},
+                },
+                'report': {'input': self.inputs['report'], 'output': 'report_out.ipynb', 'depends_on': ['extract']},
+            }
+        }
+
+    def tearDown(self):
+        shutil.rmtree(self.test_dir)
+
+    @patch.object(pipeline, 'execute_notebook')
+    def test_run_order_and_wiring(self, execute_mock):
+        report = run_pipeline(self.spec, max_workers=1, log_output=True)
+
+        self.assertEqual([c.args[1] for c in execute_mock.call_args_list][0], 'extract_out.ipynb')
+        execute_mock.assert_any_call(
+            self.inputs['transform'],
+            'transform_out.ipynb',
+            {'source': 'extract_out.ipynb'},
+            progress_bar=False,
+            log_output=True,
+        )
+        self.assertEqual(set(report.stages), {'extract', 'transform', 'report'})
+        self.assertEqual(report.critical_path[0], 'extract')
+        self.assertIn('Critical path', report.format())
+
+    @patch.object(pipeline, 'execute_notebook')
+    def test_independent_stages_run_concurrently(self, execute_mock):
+        barrier = threading.Barrier(2, timeout=5)
+
+        def execute(input_path, output_path, parameters, **kwargs):
+            if output_path in ('transform_out.ipynb', 'report_out.ipynb'):
+                # Both downstream stages must be running at the same time to pass the barrier
+                barrier.wait()
+
+        execute_mock.side_effect = execute
+        run_pipeline(self.spec, max_workers=2)
+        self.assertEqual(execute_mock.call_count, 3)
+
+    def write_outputs(self, execute_mock):
+        # Save the stage outputs in the test directory, as skipped stages need them to exist
+        for stage in self.spec['stages'].values():
+            stage['output'] = os.path.join(self.test_dir, stage['output'])
+
+        def execute(input_path, output_path, parameters, **kwargs):
+            with open(output_path, 'w') as f:
+                f.write(json.dumps({'parameters': parameters}))
+
+        execute_mock.side_effect = execute
+
+    @patch.object(pipeline, 'execute_notebook')
+    def test_cwd_warning(self, execute_mock):
+        with self.assertNoLogs('papermill', level='WARNING'):
+            run_pipeline(self.spec, max_workers=2, cwd=self.test_dir)
+
+        class NoCwdEngine(Engine):
+            pass
+
+        # Only engines without `cwd` support change the process directory, set for the run or a stage
+        with patch.dict(papermill_engines._engines, {'no-cwd': NoCwdEngine}):
+            for execute_kwargs in ({'cwd': self.test_dir}, {}):
+                self.spec['stages']['report']['cwd'] = None if execute_kwargs else self.test_dir
+                with self.assertLogs('papermill', level='WARNING') as logs:
+                    run_pipeline(self.spec, max_workers=2, engine_name='no-cwd', **execute_kwargs)
+                self.assertIn('max_workers=1', logs.output[0])
+
+    @patch.object(pipeline, 'execute_notebook')
+    def test_skip_unchanged(self, execute_mock):
+        self.write_outputs(execute_mock)
+        run_pipeline(self.spec, state_path=self.state_path)
+        self.assertEqual(execute_mock.call_count, 3)
+
+        execute_mock.reset_mock()
+        report = run_pipeline(self.spec, state_path=self.state_path)
+        execute_mock.assert_not_called()
+        self.assertTrue(all(result.skipped for result in report.stages.values()))
+
+        # Changing an input reruns the stage and everything downstream of it
+        with open(self.inputs['extract'], 'w') as f:
+            f.write(json.dumps({'name': 'extract', 'changed': True}))
+        run_pipeline(self.spec, state_path=self.state_path)
+        self.assertEqual(execute_mock.call_count, 3)
+
+        execute_mock.reset_mock()
+        self.spec['stages']['report']['parameters'] = {'title': 'new'}
+        run_pipeline(self.spec, state_path=self.state_path)
+        self.assertEqual([c.args[1] for c in execute_mock.call_args_list], [self.spec['stages']['report']['output']])
+
+        execute_mock.reset_mock()
+        run_pipeline(self.spec, state_path=self.state_path, force=True)
+        self.assertEqual(execute_mock.call_count, 3)
+
+    @patch.object(pipeline, 'execute_notebook')
+    def test_missing_output_reruns(self, execute_mock):
+        self.write_outputs(execute_mock)
+        run_pipeline(self.spec, state_path=self.state_path)
+        os.remove(self.spec['stages']['report']['output'])
+
+        execute_mock.reset_mock()
+        report = run_pipeline(self.spec, state_path=self.state_path)
+        self.assertEqual([c.args[1] for c in execute_mock.call_args_list], [self.spec['stages']['report']['output']])
+        self.assertFalse(report.stages['report'].skipped)
+        self.assertTrue(os.path.exists(self.spec['stages']['report']['output']))
+
+    @patch.object(pipeline, 'execute_notebook')
+    def test_failure_stops_downstream(self, execute_mock):
+        def execute(input_path, output_path, parameters, **kwargs):
+            if output_path == 'extract_out.ipynb':
+                time.sleep(0.01)
+                raise ValueError('boom')
+
+        execute_mock.side_effect = execute
+        with self.assertRaisesRegex(ValueError, 'boom'):
+            run_pipeline(self.spec, state_path=self.state_path)
+        self.assertEqual(execute_mock.call_count, 1)
+        self.assertFalse(os.path.exists(self.state_path))
+
+
+class TestPipelineExecution(unittest.TestCase):
+    def setUp(self):
+        self.test_dir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.test_dir)
+
+    def test_notebooks_chained(self):
+        first = os.path.join(self.test_dir, 'first.ipynb')
+        second = os.path.join(self.test_dir, 'second.ipynb')
+        report = run_pipeline(
+            {
+                'stages': {
+                    'first': {'input': get_notebook_path('simple_execute.ipynb'), 'output': first},
+                    'second': {
+                        'input': get_notebook_path('simple_execute.ipynb'),
+                        'output': second,
+                        'depends_on': ['first'],
+                        'parameters': {'msg': '{first}'},
+                    },
+                }
+            },
+            kernel_name=kernel_name,
+        )
+        self.assertEqual(report.critical_path, ['first', 'second'])
+        with open(second) as f:
+            self.assertIn(first, f.read())
@@ -0,0 +1,123 @@
+import os
+import shutil
+import tempfile
+import unittest
+from unittest.mock import AsyncMock, Mock, patch
+
+from .. import execute
+from ..engines import Engine, papermill_engines
+from ..execute import execute_notebook
+from ..prestart import KernelPrestart
+from . import get_notebook_path, kernel_name
+
+
+class NoKernelManagerEngine(Engine):
+    @classmethod
+    def execute_managed_notebook(cls, nb_man, kernel_name, **kwargs):
+        pass
+
+
+class TestKernelPrestart(unittest.TestCase):
+    def test_disabled(self):
+        with KernelPrestart('nbclient', enabled=False) as prestart:
+            prestart.start(kernel_name)
+            self.assertFalse(prestart.started)
+            self.assertIsNone(prestart.kernel_manager(kernel_name))
+
+    def test_engine_without_kernel_manager(self):
+        with patch.dict(papermill_engines._engines, {'no-km': NoKernelManagerEngine}):
+            with KernelPrestart('no-km') as prestart:
+                prestart.start(kernel_name)
+                self.assertFalse(prestart.started)
+                self.assertFalse(prestart.enabled)
+        self.assertNotIn('no-km', papermill_engines._engines)
+
+    def test_start_error_raised(self):
+        km = Mock(start_kernel=AsyncMock(side_effect=RuntimeError('no such kernel')), has_kernel=False)
+        km.cleanup_resources = AsyncMock()
+        with patch.object(papermill_engines, 'kernel_manager', return_value=km):
+            with KernelPrestart('nbclient') as prestart:
+                prestart.start('missing')
+                with self.assertRaisesRegex(RuntimeError, 'no such kernel'):
+                    prestart.kernel_manager('missing')
+        km.cleanup_resources.assert_called_once()
+
+    def test_start_for_notebook_without_kernel(self):
+        with KernelPrestart('nbclient') as prestart:
+            prestart.start_for_notebook(Mock(metadata={}))
+            self.assertFalse(prestart.started)
+
+    def test_kernel_name_mismatch(self):
+        with KernelPrestart('nbclient') as prestart:
+            prestart.start(kernel_name)
+            with patch('papermill.prestart.logger') as logger_mock:
+                self.assertIsNone(prestart.kernel_manager('other'))
+            logger_mock.warning.assert_called_once()
+            self.assertFalse(prestart.started)
+
+    def test_kernel_started_and_shut_down(self):
+        with KernelPrestart('nbclient') as prestart:
+            prestart.start(kernel_name)
+            km = prestart.kernel_manager(kernel_name)
+            self.assertTrue(km.has_kernel)
+        self.assertFalse(km.has_kernel)
+
+
+class TestExecuteWithPrestart(unittest.TestCase):
+    def setUp(self):
+        self.test_dir = tempfile.mkdtemp()
+        self.output_path = os.path.join(self.test_dir, 'output.ipynb')
+
+    def tearDown(self):
+        shutil.rmtree(self.test_dir)
+
+    def test_kernel_started_before_loading(self):
+        load_notebook_node = execute.load_notebook_node
+        started = []
+
+        def load(*args, **kwargs):
+            started.append(start.call_args[0][0].started)
+            return load_notebook_node(*args, **kwargs)
+
+        with (
+            patch.object(execute, 'load_notebook_node', side_effect=load),
+            patch.object(KernelPrestart, 'start', autospec=True, side_effect=KernelPrestart.start) as start,
+        ):
+            nb = execute_notebook(
+                get_notebook_path('simple_execute.ipynb'),
+                self.output_path,
+                {'msg': 'prestart'},
+                kernel_name=kernel_name,
+                progress_bar=False,
+                prestart_kernel=True,
+            )
+        prestart = start.call_args[0][0]
+        self.assertEqual(started, [True])
+        self.assertEqual(prestart.kernel_name, kernel_name)
+        # Shut down on leaving the context
+        self.assertIsNone(prestart.km)
+        self.assertFalse(nb.metadata.papermill['exception'])
+        self.assertEqual(nb.cells[2].outputs[0]['text'], 'prestart\n')
+
+    def test_kernel_name_from_notebook(self):
+        with patch.object(KernelPrestart, 'start', autospec=True, side_effect=KernelPrestart.start) as start:
+            execute_notebook(
+                get_notebook_path('simple_execute.ipynb'),
+                self.output_path,
+                {'msg': 'prestart'},
+                progress_bar=False,
+                prestart_kernel=True,
+            )
+        self.assertEqual(start.call_args[0][1], kernel_name)
+
+    def test_prepare_only(self):
+        with patch.object(KernelPrestart, 'start', autospec=True, side_effect=KernelPrestart.start) as start:
+            execute_notebook(
+                get_notebook_path('simple_execute.ipynb'),
+                self.output_path,
+                {'msg': 'prestart'},
+                kernel_name=kernel_name,
+                prepare_only=True,
+                prestart_kernel=True,
+            )
+        self.assertFalse(start.call_args[0][0].started)
@@ -0,0 +1,165 @@
+import io
+import json
+import os
+import shutil
+import tempfile
+import unittest
+from unittest.mock import patch
+
+import nbformat
+
+from ..engines import NotebookExecutionManager
+from ..exceptions import PapermillException
+from ..execute import execute_notebook
+from ..history import DurationHistory
+from ..progress import ProgressStream, TerminalProgressBar, papermill_progress_bars
+from . import get_notebook_path, kernel_name
+
+
+def _notebook():
+    nb = nbformat.v4.new_notebook(
+        cells=[
+            nbformat.v4.new_markdown_cell('# Title'),
+            nbformat.v4.new_code_cell('# papermill_description=load\nx = 1'),
+            nbformat.v4.new_code_cell('y = 2'),
+        ]
+    )
+    nb.metadata.papermill = {'input_path': 'input.ipynb'}
+    return nb
+
+
+class TestTerminalProgressBar(unittest.TestCase):
+    def test_draws_progress(self):
+        out = io.StringIO()
+        bar = TerminalProgressBar(total=4, unit='cell', desc='Executing', file=out)
+        bar.update(2)
+        bar.close()
+        self.assertTrue(out.getvalue().startswith('\rExecuting:  50% 2/4 cell [00:00<00:00]'))
+        self.assertTrue(out.getvalue().endswith('\n'))
+
+    def test_rate_limited(self):
+        out = io.StringIO()
+        bar = TerminalProgressBar(total=100, file=out, mininterval=60)
+        for _ in range(100):
+            bar.update()
+        self.assertEqual(out.getvalue().count('\r'), 1)
+        bar.close()
+        self.assertEqual(out.getvalue().count('\r'), 2)
+        self.assertIn('100/100', out.getvalue())
+
+    def test_registered(self):
+        self.assertIs(papermill_progress_bars.get_progress_bar('terminal'), TerminalProgressBar)
+        with self.assertRaises(PapermillException):
+            papermill_progress_bars.get_progress_bar('missing')
+
+    def test_manager_progress_bar_name(self):
+        with patch('sys.stderr', io.StringIO()):
+            nb_man = NotebookExecutionManager(_notebook(), progress_bar='terminal')
+            self.assertIsInstance(nb_man.pbar, TerminalProgressBar)
+            self.assertEqual(nb_man.pbar.total, 3)
+            nb_man.cleanup_pbar()
+
+
+class TestCellDescriptions(unittest.TestCase):
+    def test_parsed_once(self):
+        nb_man = NotebookExecutionManager(_notebook(), progress_bar='terminal')
+        nb_man.pbar.file = io.StringIO()
+        with patch.object(nb_man, 'get_cell_description', wraps=nb_man.get_cell_description) as description_mock:
+            nb_man.notebook_start()
+            for index, cell in enumerate(nb_man.nb.cells):
+                nb_man.cell_start(cell, index)
+        self.assertEqual(description_mock.call_count, len(nb_man.nb.cells))
+        self.assertEqual(nb_man.pbar.desc, 'Executing load')
+        nb_man.cleanup_pbar()
+
+
+class TestProgressStream(unittest.TestCase):
+    def setUp(self):
+        self.test_dir = tempfile.mkdtemp()
+        self.stream_path = os.path.join(self.test_dir, 'progress.jsonl')
+
+    def tearDown(self):
+        shutil.rmtree(self.test_dir)
+
+    def events(self):
+        with open(self.stream_path) as f:
+            return [json.loads(line) for line in f]
+
+    def test_file_descriptor(self):
+        read_fd, write_fd = os.pipe()
+        ProgressStream(write_fd).emit('cell_start', cell_index=0)
+        os.close(write_fd)
+        with os.fdopen(read_fd) as f:
+            self.assertEqual(json.loads(f.read()), {'event': 'cell_start', 'cell_index': 0})
+
+    def test_path_appended(self):
+        stream = ProgressStream(self.stream_path)
+        stream.emit('notebook_start')
+        stream.close()
+        stream.emit('notebook_complete')
+        stream.close()
+        self.assertEqual([event['event'] for event in self.events()], ['notebook_start', 'notebook_complete'])
+
+    def test_manager_events(self):
+        nb_man = NotebookExecutionManager(
+            _notebook(), progress_bar=False, progress_stream=ProgressStream(self.stream_path)
+        )
+        nb_man.notebook_start()
+        nb_man.mark_cells_completed(nb_man.nb.cells[:1])
+        for index in (1, 2):
+            nb_man.cell_start(nb_man.nb.cells[index], index)
+            nb_man.cell_complete(nb_man.nb.cells[index], index)
+        nb_man.notebook_complete()
+
+        events = self.events()
+        self.assertEqual(
+            [(event['event'], event['cell_index'], event['status']) for event in events],
+            [
+                ('notebook_start', None, None),
+                ('cell_start', 1, 'running'),
+                ('cell_complete', 1, 'completed'),
+                ('cell_start', 2, 'running'),
+                ('cell_complete', 2, 'completed'),
+                ('notebook_complete', None, 'completed'),
+            ],
+        )
+        self.assertTrue(all(event['notebook'] == 'input.ipynb' and event['total'] == 3 for event in events))
+        self.assertIsNone(events[0]['eta'])
+        self.assertIsNotNone(events[2]['eta'])
+        self.assertEqual(events[-1]['eta'], 0.0)
+
+    def test_eta_from_history(self):
+        history = DurationHistory(os.path.join(self.test_dir, 'history.db'))
+        nb = _notebook()
+        for cell, duration in zip(nb.cells, [0.0, 2.0, 6.0]):
+            cell.metadata.papermill = {'status': 'completed', 'duration': duration}
+        history.record(nb)
+
+        nb_man = NotebookExecutionManager(
+            _notebook(), progress_bar=False, history=history, progress_stream=ProgressStream(self.stream_path)
+        )
+        nb_man.notebook_start()
+        nb_man.cell_start(nb_man.nb.cells[1], 1)
+        nb_man.cell_complete(nb_man.nb.cells[1], 1)
+        self.assertEqual([event['eta'] for event in self.events()], [8.0, 8.0, 6.0])
+
+    def test_broken_stream_disabled(self):
+        read_fd, write_fd = os.pipe()
+        os.close(read_fd)
+        nb_man = NotebookExecutionManager(_notebook(), progress_bar=False, progress_stream=ProgressStream(write_fd))
+        nb_man.notebook_start()
+        os.close(write_fd)
+        self.assertIsNone(nb_man.progress_stream)
+
+    def test_execute_notebook(self):
+        execute_notebook(
+            get_notebook_path('simple_execute.ipynb'),
+            os.path.join(self.test_dir, 'output.ipynb'),
+            {'msg': 'progress'},
+            kernel_name=kernel_name,
+            progress_bar=False,
+            progress_stream=self.stream_path,
+        )
+        events = self.events()
+        self.assertEqual((events[0]['event'], events[-1]['event']), ('notebook_start', 'notebook_complete'))
+        self.assertEqual(events[-1]['status'], 'completed')
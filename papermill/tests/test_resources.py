@@ -0,0 +1,91 @@
+import os
+import shutil
+import tempfile
+import time
+import unittest
+from unittest.mock import Mock, patch
+
+import pytest
+
+from .. import resources
+from ..exceptions import PapermillOptionalDependencyException
+from ..execute import execute_notebook
+from ..resources import ResourceSampler, kernel_pid
+from . import get_notebook_path, kernel_name
+
+pytest.importorskip('psutil')
+
+
+class TestResourceSampler(unittest.TestCase):
+    def test_missing_dependency(self):
+        with patch.object(resources, 'psutil', None):
+            with self.assertRaises(PapermillOptionalDependencyException):
+                ResourceSampler(os.getpid(), 0.1)
+
+    def test_kernel_pid(self):
+        self.assertEqual(kernel_pid(Mock(provisioner=Mock(pid=42))), 42)
+        self.assertIsNone(kernel_pid(Mock(spec=[])))
+
+    def test_sample(self):
+        sample = ResourceSampler(os.getpid(), 0.1).sample()
+        self.assertGreater(sample.rss, 0)
+        self.assertGreater(sample.cpu_time, 0)
+        self.assertGreater(sample.open_files, 0)
+
+    def test_cell_peak(self):
+        sampler = ResourceSampler(os.getpid(), 0.01)
+        sampler.start()
+        try:
+            sampler.cell_start()
+            baseline = sampler.sample().rss
+            # Large allocations are returned to the system when freed, only the sampling thread sees the peak
+            buffer = bytearray(64 * 1024 * 1024)
+            time.sleep(0.2)
+            del buffer
+            usage = sampler.cell_complete()
+        finally:
+            sampler.stop()
+        self.assertGreater(usage['peak_rss'], baseline + 32 * 1024 * 1024)
+        self.assertLess(usage['rss_delta'], 32 * 1024 * 1024)
+        self.assertGreaterEqual(usage['cpu_time'], 0)
+        self.assertEqual(sampler.totals['peak_rss'], usage['peak_rss'])
+
+    def test_cell_complete_without_start(self):
+        self.assertIsNone(ResourceSampler(os.getpid(), 0.1).cell_complete())
+
+
+class TestExecuteWithResources(unittest.TestCase):
+    def setUp(self):
+        self.test_dir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.test_dir)
+
+    def test_resources_recorded(self):
+        nb = execute_notebook(
+            get_notebook_path('simple_execute.ipynb'),
+            os.path.join(self.test_dir, 'output.ipynb'),
+            {'msg': 'resources'},
+            kernel_name=kernel_name,
+            progress_bar=False,
+            resource_sample_interval=0.05,
+        )
+        code_cells = [cell for cell in nb.cells if cell.cell_type == 'code']
+        for cell in code_cells:
+            self.assertGreater(cell.metadata.papermill['resources']['peak_rss'], 0)
+        totals = nb.metadata.papermill['resources']
+        self.assertEqual(
+            totals['peak_rss'], max(cell.metadata.papermill['resources']['peak_rss'] for cell in code_cells)
+        )
+        self.assertEqual(totals['sample_interval'], 0.05)
+
+    def test_disabled_by_default(self):
+        nb = execute_notebook(
+            get_notebook_path('simple_execute.ipynb'),
+            os.path.join(self.test_dir, 'output.ipynb'),
+            {'msg': 'resources'},
+            kernel_name=kernel_name,
+            progress_bar=False,
+        )
+        self.assertNotIn('resources', nb.metadata.papermill)
+        self.assertNotIn('resources', nb.cells[-1].metadata.papermill)
@@ -0,0 +1,202 @@
+import csv
+import os
+import shutil
+import sqlite3
+import tempfile
+import unittest
+from concurrent.futures import ThreadPoolExecutor
+from unittest.mock import patch
+
+import nbformat
+import pytest
+from nbformat.notebooknode import from_dict
+
+from .. import results
+from ..exceptions import PapermillException, PapermillOptionalDependencyException
+from ..execute import execute_notebook
+from ..results import RESULT_MIMETYPE, append_results, extract_results, record, results_row
+from . import get_notebook_path, kernel_name
+
+
+def _executed_nb(parameters, results=None):
+    nb = nbformat.v4.new_notebook()
+    nb.metadata.papermill = {
+        'input_path': 'input.ipynb',
+        'output_path': 'output.ipynb',
+        'parameters': parameters,
+    }
+    if results is not None:
+        nb.metadata.papermill['results'] = results
+    return nb
+
+
+class TestRecord(unittest.TestCase):
+    def test_record(self):
+        with patch('IPython.display.display') as display_mock:
+            record('score', 0.5)
+        display_mock.assert_called_once_with({RESULT_MIMETYPE: {'name': 'score', 'value': 0.5}}, raw=True)
+
+
+class TestExtractResults(unittest.TestCase):
+    def setUp(self):
+        self.cell = nbformat.v4.new_code_cell('x')
+
+    def test_recorded_value(self):
+        output = from_dict({'output_type': 'display_data', 'data': {RESULT_MIMETYPE: {'name': 'a', 'value': 1}}})
+        self.assertEqual(extract_results(output, self.cell, 0), [('a', 1)])
+
+    def test_scrapbook_scrap(self):
+        scrap = {'name': 'b', 'data': [1, 2], 'encoder': 'json', 'version': 1}
+        output = from_dict({'output_type': 'display_data', 'data': {results.SCRAPBOOK_MIMETYPE: scrap}})
+        self.assertEqual(extract_results(output, self.cell, 0), [('b', [1, 2])])
+
+    def test_untagged_execute_result(self):
+        output = nbformat.v4.new_output('execute_result', data={'text/plain': '3'})
+        self.assertEqual(extract_results(output, self.cell, 0), [])
+
+    def test_tagged_execute_result(self):
+        self.cell.metadata.tags = ['results']
+        self.cell.metadata.result_name = 'c'
+        output = nbformat.v4.new_output('execute_result', data={'text/plain': '3.5'})
+        self.assertEqual(extract_results(output, self.cell, 0), [('c', 3.5)])
+        output = nbformat.v4.new_output('execute_result', data={'text/plain': 'Timestamp(2020)'})
+        self.assertEqual(extract_results(output, self.cell, 0), [('c', 'Timestamp(2020)')])
+
+    def test_tagged_execute_result_default_name(self):
+        self.cell.metadata.tags = ['results']
+        del self.cell['id']
+        output = nbformat.v4.new_output('execute_result', data={'application/json': {'k': 1}})
+        self.assertEqual(extract_results(output, self.cell, 4), [('cell_4', {'k': 1})])
+
+
+class TestResultsTable(unittest.TestCase):
+    def setUp(self):
+        self.test_dir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.test_dir)
+
+    def test_results_row(self):
+        row = results_row(_executed_nb({'alpha': 1, 'tags': ['a']}, {'score': 2.5}))
+        self.assertEqual(
+            row,
+            {'input_path': 'input.ipynb', 'output_path': 'output.ipynb', 'alpha': 1, 'tags': '["a"]', 'score': 2.5},
+        )
+
+    def test_append_csv(self):
+        path = os.path.join(self.test_dir, 'results.csv')
+        append_results(path, _executed_nb({'alpha': 1}, {'score': 2}))
+        append_results(path, _executed_nb({'alpha': 2}, {'score': 4}))
+        # A new result adds a column
+        append_results(path, _executed_nb({'alpha': 3}, {'score': 6, 'loss': 0.1}))
+
+        with open(path, newline='') as f:
+            rows = list(csv.DictReader(f))
+        self.assertEqual([row['alpha'] for row in rows], ['1', '2', '3'])
+        self.assertEqual([row['loss'] for row in rows], ['', '', '0.1'])
+
+    def test_append_csv_concurrently(self):
+        path = os.path.join(self.test_dir, 'results.csv')
+
+        def append(index):
+            # Every other run adds a column, rewriting the table
+            append_results(path, _executed_nb({'alpha': index}, {f'score_{index % 4}': index}))
+
+        with ThreadPoolExecutor(max_workers=8) as executor:
+            list(executor.map(append, range(40)))
+        with open(path, newline='') as f:
+            lines = f.read().splitlines()
+            f.seek(0)
+            rows = list(csv.DictReader(f))
+        self.assertEqual(sum(line.startswith('input_path') for line in lines), 1)
+        self.assertEqual(sorted(int(row['alpha']) for row in rows), list(range(40)))
+        self.assertTrue(all(row[f"score_{int(row['alpha']) % 4}"] == row['alpha'] for row in rows))
+
+    def test_append_sqlite(self):
+        path = os.path.join(self.test_dir, 'results.db')
+        append_results(path, _executed_nb({'alpha': 1}, {'score': 2}))
+        append_results(path, _executed_nb({'alpha': 2}, {'score': 4, 'loss': 0.1}))
+
+        conn = sqlite3.connect(path)
+        try:
+            rows = conn.execute('SELECT alpha, score, loss FROM results ORDER BY alpha').fetchall()
+        finally:
+            conn.close()
+        self.assertEqual(rows, [(1, 2, None), (2, 4, 0.1)])
+
+    def test_append_parquet(self):
+        parquet = pytest.importorskip('pyarrow.parquet')
+        path = os.path.join(self.test_dir, 'results.parquet')
+        append_results(path, _executed_nb({'alpha': 1}, {'score': 2}))
+        append_results(path, _executed_nb({'alpha': 2}, {'score': 4}))
+        self.assertEqual(parquet.read_table(path).column('score').to_pylist(), [2, 4])
+        # One part file per run, no rewrite of the previous rows
+        parts = [name for name in os.listdir(path) if not name.startswith('.')]
+        self.assertEqual(len(parts), 3)
+        self.assertIn(results.PARQUET_SCHEMA_PART, parts)
+
+    def test_append_parquet_schema_widened(self):
+        parquet = pytest.importorskip('pyarrow.parquet')
+        path = os.path.join(self.test_dir, 'results.parquet')
+        append_results(path, _executed_nb({'alpha': 1}, {'loss': None}))
+        append_results(path, _executed_nb({'alpha': 2.5}, {'score': 9, 'loss': 0.5}))
+        append_results(path, _executed_nb({'alpha': 'high'}, {'loss': None}))
+        table = parquet.read_table(path)
+        self.assertEqual(table.column('alpha').to_pylist(), ['1', '2.5', 'high'])
+        self.assertEqual(table.column('score').to_pylist(), [None, 9, None])
+        self.assertEqual(table.column('loss').to_pylist(), [None, 0.5, None])
+
+    def test_append_parquet_to_single_file(self):
+        parquet = pytest.importorskip('pyarrow.parquet')
+        path = os.path.join(self.test_dir, 'results.parquet')
+        parquet.write_table(results.pyarrow.Table.from_pylist([{'alpha': 0, 'score': 0}]), path)
+        append_results(path, _executed_nb({'alpha': 1}, {'score': 2}))
+        self.assertTrue(os.path.isdir(path))
+        self.assertEqual(parquet.read_table(path).column('alpha').to_pylist(), [0, 1])
+
+    def test_append_parquet_without_pyarrow(self):
+        with patch.object(results, 'pyarrow', None):
+            with self.assertRaises(PapermillOptionalDependencyException):
+                append_results(os.path.join(self.test_dir, 'results.parquet'), _executed_nb({}))
+
+    def test_unknown_format(self):
+        with self.assertRaises(PapermillException):
+            append_results(os.path.join(self.test_dir, 'results.xlsx'), _executed_nb({}))
+
+
+class TestExecuteResults(unittest.TestCase):
+    def setUp(self):
+        self.test_dir = tempfile.mkdtemp()
+        self.results_path = os.path.join(self.test_dir, 'results.csv')
+
+    def tearDown(self):
+        shutil.rmtree(self.test_dir)
+
+    def test_results_collected(self):
+        for alpha in (1, 2):
+            nb = execute_notebook(
+                get_notebook_path('record_results.ipynb'),
+                os.path.join(self.test_dir, f'output_{alpha}.ipynb'),
+                {'alpha': alpha},
+                kernel_name=kernel_name,
+                results_path=self.results_path,
+            )
+            self.assertEqual(nb.metadata.papermill['results'], {'score': alpha * 2, 'scaled': alpha * 10})
+
+        with open(self.results_path, newline='') as f:
+            rows = list(csv.DictReader(f))
+        self.assertEqual(
+            [(row['alpha'], row['score'], row['scaled']) for row in rows],
+            [('1', '2', '10'), ('2', '4', '20')],
+        )
+
+    def test_unknown_format_fails_before_execution(self):
+        with patch('papermill.execute.load_notebook_node') as load_mock:
+            with self.assertRaises(PapermillException):
+                execute_notebook(
+                    get_notebook_path('record_results.ipynb'),
+                    os.path.join(self.test_dir, 'output.ipynb'),
+                    kernel_name=kernel_name,
+                    results_path=os.path.join(self.test_dir, 'results.json'),
+                )
+        load_mock.assert_not_called()
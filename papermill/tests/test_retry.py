@@ -0,0 +1,141 @@
+import errno
+import unittest
+from unittest.mock import Mock, patch
+
+import requests
+from botocore.exceptions import ClientError, EndpointConnectionError
+
+from ..exceptions import PapermillRateLimitException
+from ..iorw import PapermillIO
+from ..retry import RetryBudget, RetryMetrics, RetryPolicy, is_retriable
+
+
+def http_error(status_code):
+    return requests.HTTPError(response=Mock(status_code=status_code))
+
+
+def client_error(code, status_code):
+    return ClientError({'Error': {'Code': code}, 'ResponseMetadata': {'HTTPStatusCode': status_code}}, 'PutObject')
+
+
+class TestIsRetriable(unittest.TestCase):
+    def test_generic(self):
+        self.assertTrue(is_retriable(PapermillRateLimitException('slow down')))
+        self.assertTrue(is_retriable(ConnectionResetError()))
+        self.assertTrue(is_retriable(TimeoutError()))
+        self.assertFalse(is_retriable(FileNotFoundError()))
+        self.assertFalse(is_retriable(ValueError()))
+
+    def test_http(self):
+        self.assertTrue(is_retriable(http_error(429)))
+        self.assertTrue(is_retriable(http_error(503)))
+        self.assertFalse(is_retriable(http_error(404)))
+        self.assertTrue(is_retriable(requests.ConnectionError()))
+
+    def test_s3(self):
+        self.assertTrue(is_retriable(client_error('SlowDown', 503)))
+        self.assertTrue(is_retriable(client_error('Throttling', 400)))
+        self.assertFalse(is_retriable(client_error('AccessDenied', 403)))
+        self.assertTrue(is_retriable(EndpointConnectionError(endpoint_url='http://localhost')))
+
+    def test_hdfs(self):
+        self.assertTrue(is_retriable(OSError(255, 'java.net.SocketTimeoutException')))
+        self.assertTrue(is_retriable(OSError(errno.EIO, 'Input/output error')))
+        self.assertFalse(is_retriable(OSError(errno.EACCES, 'Permission denied')))
+        self.assertFalse(is_retriable(OSError('Unable to load libjvm')))
+
+
+class TestRetryBudget(unittest.TestCase):
+    def test_minimum_and_ratio(self):
+        budget = RetryBudget(ratio=0.5, minimum=1)
+        self.assertTrue(budget.acquire())
+        self.assertFalse(budget.acquire())
+        budget.record_call()
+        budget.record_call()
+        self.assertTrue(budget.acquire())
+        self.assertFalse(budget.acquire())
+
+    def test_window(self):
+        budget = RetryBudget(ratio=0, minimum=1, window=10)
+        with patch('papermill.retry.time.monotonic', return_value=100.0):
+            self.assertTrue(budget.acquire())
+            self.assertFalse(budget.acquire())
+        with patch('papermill.retry.time.monotonic', return_value=111.0):
+            self.assertTrue(budget.acquire())
+
+
+class TestRetryPolicy(unittest.TestCase):
+    def setUp(self):
+        self.metrics = RetryMetrics()
+        sleep_patch = patch('papermill.retry.time.sleep')
+        self.sleep = sleep_patch.start()
+        self.addCleanup(sleep_patch.stop)
+
+    def call(self, policy, func):
+        return policy.call(func, 'path', scheme='s3://', operation='read', metrics=self.metrics)
+
+    def test_backoff(self):
+        policy = RetryPolicy(base_delay=1, max_delay=5)
+        with patch('papermill.retry.random.uniform', side_effect=lambda low, high: high):
+            self.assertEqual([policy.backoff(attempt) for attempt in range(1, 5)], [1, 2, 4, 5])
+
+    def test_retries_until_success(self):
+        func = Mock(side_effect=[TimeoutError(), TimeoutError(), 'content'])
+        self.assertEqual(self.call(RetryPolicy(max_attempts=3), func), 'content')
+        self.assertEqual(func.call_count, 3)
+        self.assertEqual(self.sleep.call_count, 2)
+        counters = self.metrics.snapshot()[('s3://', 'read')]
+        self.assertEqual((counters['calls'], counters['retries'], counters['failures']), (1, 2, 0))
+        self.assertEqual(counters['backoff_seconds'], sum(call.args[0] for call in self.sleep.call_args_list))
+
+    def test_gives_up(self):
+        func = Mock(side_effect=TimeoutError())
+        with self.assertRaises(TimeoutError):
+            self.call(RetryPolicy(max_attempts=3), func)
+        self.assertEqual(func.call_count, 3)
+        self.assertEqual(self.metrics.snapshot()[('s3://', 'read')]['failures'], 1)
+
+    def test_not_retriable(self):
+        func = Mock(side_effect=FileNotFoundError())
+        with self.assertRaises(FileNotFoundError):
+            self.call(RetryPolicy(), func)
+        self.assertEqual(func.call_count, 1)
+        self.assertEqual(self.metrics.snapshot()[('s3://', 'read')]['failures'], 0)
+
+    def test_custom_classification(self):
+        func = Mock(side_effect=[KeyError(), 'content'])
+        self.assertEqual(self.call(RetryPolicy(classify=lambda e: isinstance(e, KeyError)), func), 'content')
+
+    def test_budget_exhausted(self):
+        policy = RetryPolicy(max_attempts=5, budget=RetryBudget(ratio=0, minimum=1))
+        func = Mock(side_effect=TimeoutError())
+        with self.assertRaises(TimeoutError):
+            self.call(policy, func)
+        self.assertEqual(func.call_count, 2)
+        counters = self.metrics.snapshot()[('s3://', 'read')]
+        self.assertEqual((counters['retries'], counters['budget_exhausted']), (1, 1))
+
+
+class TestPapermillIORetries(unittest.TestCase):
+    def setUp(self):
+        self.handler = Mock(read=Mock(side_effect=[TimeoutError(), 'content']))
+        self.papermill_io = PapermillIO()
+        self.papermill_io.register('fake://', self.handler)
+        self.papermill_io.set_retry_policy(RetryPolicy(base_delay=0))
+
+    def test_default_policy(self):
+        self.assertEqual(self.papermill_io.read('fake://notebook.ipynb'), 'content')
+        self.assertEqual(self.papermill_io.retry_metrics.snapshot()[('fake://', 'read')]['retries'], 1)
+
+    def test_scheme_policy(self):
+        self.papermill_io.set_retry_policy(None, 'fake://')
+        with self.assertRaises(TimeoutError):
+            self.papermill_io.read('fake://notebook.ipynb')
+        self.assertEqual(self.handler.read.call_count, 1)
+
+    def test_write_and_listdir(self):
+        self.handler.write = Mock(side_effect=[http_error(503), None])
+        self.handler.listdir = Mock(side_effect=[ConnectionResetError(), ['fake://a.ipynb']])
+        self.papermill_io.write('{}', 'fake://notebook.ipynb')
+        self.handler.write.assert_called_with('{}', 'fake://notebook.ipynb')
+        self.assertEqual(self.papermill_io.listdir('fake://'), ['fake://a.ipynb'])
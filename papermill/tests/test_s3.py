@@ -1,12 +1,18 @@
 # The following tests are purposely limited to the exposed interface by iorw.py
 
 import os.path
+from concurrent.futures import ThreadPoolExecutor
+from unittest.mock import patch
 
 import boto3
 import moto
 import pytest
+from botocore.exceptions import IncompleteReadError
 from moto import mock_aws
 
+from ..exceptions import PapermillException
+from ..iorw import PapermillIO, S3Handler
+from ..retry import RetryPolicy
 from ..s3 import S3, Bucket, Key, Prefix
 
 
@@ -147,6 +153,64 @@ def test_s3_defaults():
     assert s1.s3 == s2.s3
 
 
+@pytest.fixture
+def s3_clients(monkeypatch):
+    monkeypatch.setattr(S3, 'clients', {})
+    monkeypatch.setattr(S3, 'defaults', {})
+    monkeypatch.delenv('BOTO3_ENDPOINT_URL', raising=False)
+    monkeypatch.setenv('AWS_DEFAULT_REGION', 'us-east-1')
+
+
+def test_s3_clients_per_endpoint(s3_clients):
+    default = S3()
+    store = S3(endpoint_url='http://localhost:9000')
+    assert store.client is not default.client
+    assert store.client is S3(endpoint_url='http://localhost:9000').client
+    assert store.client.meta.endpoint_url == 'http://localhost:9000'
+    # The resource shares the connection pool of the client
+    assert store.s3.meta.client is store.client
+
+
+def test_s3_endpoint_environment(s3_clients, monkeypatch):
+    monkeypatch.setenv('BOTO3_ENDPOINT_URL', 'http://localhost:9000')
+    assert S3().client.meta.endpoint_url == 'http://localhost:9000'
+
+
+def test_s3_client_options(s3_clients):
+    client = S3(
+        max_pool_connections=64, retry_mode='adaptive', max_attempts=5, connect_timeout=2, read_timeout=30
+    ).client
+    assert client.meta.config.max_pool_connections == 64
+    assert client.meta.config.retries == {'mode': 'adaptive', 'total_max_attempts': 5}
+    assert (client.meta.config.connect_timeout, client.meta.config.read_timeout) == (2, 30)
+
+
+def test_s3_configure(s3_clients):
+    S3.configure(max_pool_connections=64, region='eu-west-1')
+    assert S3().client.meta.config.max_pool_connections == 64
+    assert S3().client.meta.region_name == 'eu-west-1'
+    # Explicit options take precedence over the defaults
+    assert S3(max_pool_connections=8).client.meta.config.max_pool_connections == 8
+    S3.configure(region=None)
+    assert S3.defaults == {'max_pool_connections': 64}
+    with pytest.raises(PapermillException):
+        S3.configure(pool_size=64)
+
+
+def test_s3_clients_created_once_concurrently(s3_clients):
+    with ThreadPoolExecutor(max_workers=8) as executor:
+        clients = list(executor.map(lambda _: S3(endpoint_url='http://localhost:9000').client, range(16)))
+    assert all(client is clients[0] for client in clients)
+    assert len(S3.clients) == 1
+
+
+def test_s3_handler_options(s3_clients):
+    with patch('papermill.iorw.S3') as s3_mock:
+        S3Handler(endpoint_url='http://localhost:9000').write('{}', 's3://bucket/out.ipynb')
+    s3_mock.assert_called_once_with(endpoint_url='http://localhost:9000')
+    s3_mock.return_value.cp_string.assert_called_once_with('{}', 's3://bucket/out.ipynb')
+
+
 local_dir = os.path.dirname(os.path.abspath(__file__))
 test_bucket_name = 'test-pm-bucket'
 test_string = 'Hello'
@@ -193,6 +257,22 @@ def test_s3_read_empty(s3_client):
     assert data == ''
 
 
+def test_s3_read_attempts(s3_client):
+    papermill_io = PapermillIO()
+    papermill_io.register('s3://', S3Handler())
+    papermill_io.set_retry_policy(RetryPolicy(max_attempts=3, base_delay=0))
+    client = s3_client.client
+    error = IncompleteReadError(actual_bytes=0, expected_bytes=10)
+    with patch.object(client, 'get_object', wraps=client.get_object) as get_object:
+        with patch('botocore.response.StreamingBody.read', side_effect=error):
+            with pytest.raises(IncompleteReadError):
+                papermill_io.read(f"s3://{test_bucket_name}/{test_file_path}")
+    # A single retry loop: one request per attempt of the policy
+    assert get_object.call_count == 3
+    counters = papermill_io.retry_metrics.snapshot()[('s3://', 'read')]
+    assert (counters['calls'], counters['retries'], counters['failures']) == (1, 2, 1)
+
+
 def test_s3_write(s3_client):
     s3_path = f"s3://{test_bucket_name}/{test_file_path}.txt"
     s3_client.cp_string(test_string, s3_path)
@@ -216,3 +296,41 @@ def test_s3_listdir(s3_client):
     dir_listings = s3_client.listdir(s3_dir)
     assert len(dir_listings) == 2
     assert s3_path in dir_listings
+
+
+def test_s3_glob(s3_client):
+    client = boto3.client('s3')
+    for key in ['runs/2023/a.ipynb', 'runs/2024/b.ipynb', 'runs/2024/deep/c.ipynb', 'runs/2024/d.txt', 'runs/e.ipynb']:
+        client.put_object(Bucket=test_bucket_name, Key=key, Body='{}')
+
+    entries = s3_client.glob(f"s3://{test_bucket_name}/runs/*.ipynb")
+    assert [entry.path for entry in entries] == [f"s3://{test_bucket_name}/runs/e.ipynb"]
+    assert entries[0].size == 2
+    assert entries[0].etag
+    assert entries[0].mtime > 0
+
+    paths = [entry.path for entry in s3_client.glob(f"s3://{test_bucket_name}/runs/**/*.ipynb")]
+    assert paths == [
+        f"s3://{test_bucket_name}/runs/2023/a.ipynb",
+        f"s3://{test_bucket_name}/runs/2024/b.ipynb",
+        f"s3://{test_bucket_name}/runs/2024/deep/c.ipynb",
+        f"s3://{test_bucket_name}/runs/e.ipynb",
+    ]
+
+
+def test_s3_glob_prunes_subdirectories(s3_client):
+    client = boto3.client('s3')
+    for key in ['runs/2023/a.ipynb', 'runs/2024/b.ipynb']:
+        client.put_object(Bucket=test_bucket_name, Key=key, Body='{}')
+
+    listed = []
+    list_entries = s3_client._list_entries
+
+    def spy(bucket, prefix, delimiter=None):
+        listed.append(prefix)
+        return list_entries(bucket, prefix, delimiter)
+
+    s3_client._list_entries = spy
+    paths = [entry.path for entry in s3_client.glob(f"s3://{test_bucket_name}/runs/*4/*.ipynb")]
+    assert paths == [f"s3://{test_bucket_name}/runs/2024/b.ipynb"]
+    assert listed == ['runs/', 'runs/2024/']
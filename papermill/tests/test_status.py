@@ -0,0 +1,132 @@
+import os
+import shutil
+import tempfile
+import threading
+import time
+import unittest
+from unittest.mock import Mock, patch
+
+import boto3
+import nbformat
+from moto import mock_aws
+
+from .. import engines
+from ..engines import NotebookExecutionManager
+from ..execute import execute_notebook
+from ..status import StatusHeartbeat, read_status, status_path
+from . import get_notebook_path, kernel_name
+
+
+class TestStatusHeartbeat(unittest.TestCase):
+    def test_beats_until_stopped(self):
+        beaten = threading.Event()
+        beat = Mock(side_effect=lambda: beaten.set())
+        heartbeat = StatusHeartbeat(0.01, beat)
+        heartbeat.start()
+        self.assertTrue(beaten.wait(5))
+        heartbeat.stop()
+        count = beat.call_count
+        time.sleep(0.05)
+        self.assertEqual(beat.call_count, count)
+
+    def test_failed_beat_logged(self):
+        beaten = threading.Event()
+
+        def beat():
+            beaten.set()
+            raise OSError('unreachable')
+
+        heartbeat = StatusHeartbeat(0.01, beat)
+        with patch('papermill.status.logger') as logger_mock:
+            heartbeat.start()
+            self.assertTrue(beaten.wait(5))
+            heartbeat.stop()
+        logger_mock.warning.assert_called()
+
+
+class TestExecutionStatus(unittest.TestCase):
+    def setUp(self):
+        self.test_dir = tempfile.mkdtemp()
+        self.output_path = os.path.join(self.test_dir, 'output.ipynb')
+        self.nb = nbformat.v4.new_notebook(cells=[nbformat.v4.new_code_cell('x = 1'), nbformat.v4.new_code_cell('y')])
+        self.nb.metadata.papermill = {'input_path': 'input.ipynb'}
+
+    def tearDown(self):
+        shutil.rmtree(self.test_dir)
+
+    def status(self):
+        return read_status(status_path(self.output_path))
+
+    def test_path(self):
+        self.assertEqual(status_path('s3://bucket/out.ipynb'), 's3://bucket/out.ipynb.status.json')
+
+    @mock_aws
+    def test_read_missing_remote_status(self):
+        boto3.client('s3').create_bucket(Bucket='bucket', CreateBucketConfiguration={'LocationConstraint': 'us-west-2'})
+        self.assertIsNone(read_status(status_path('s3://bucket/output.ipynb')))
+
+    def test_disabled_by_default(self):
+        nb_man = NotebookExecutionManager(self.nb, output_path=self.output_path, progress_bar=False)
+        nb_man.notebook_start()
+        nb_man.notebook_complete()
+        self.assertIsNone(self.status())
+
+    def test_cell_boundaries(self):
+        nb_man = NotebookExecutionManager(self.nb, output_path=self.output_path, progress_bar=False, status_heartbeat=0)
+        nb_man.notebook_start()
+        self.assertEqual(self.status()['status'], 'running')
+        self.assertIsNone(nb_man._heartbeat)
+
+        nb_man.cell_start(self.nb.cells[0], 0)
+        status = self.status()
+        self.assertEqual((status['current_cell'], status['current_cell_status']), (0, 'running'))
+        nb_man.cell_complete(self.nb.cells[0], 0)
+        nb_man.cell_start(self.nb.cells[1], 1)
+        nb_man.cell_exception(self.nb.cells[1], 1)
+        nb_man.cell_complete(self.nb.cells[1], 1)
+        nb_man.notebook_complete()
+
+        status = self.status()
+        self.assertEqual((status['status'], status['current_cell'], status['exception']), ('failed', 1, True))
+        self.assertEqual(status['input_path'], 'input.ipynb')
+        self.assertEqual(status['total_cells'], 2)
+        self.assertEqual(status['bytes_written'], nb_man.bytes_written)
+        self.assertIsNotNone(status['end_time'])
+
+    def test_heartbeat(self):
+        nb_man = NotebookExecutionManager(
+            self.nb, output_path=self.output_path, progress_bar=False, status_heartbeat=0.2
+        )
+        nb_man.notebook_start()
+        first = self.status()['updated_at']
+        deadline = time.monotonic() + 5
+        with patch.object(nb_man, 'update_status', wraps=nb_man.update_status) as update_mock:
+            # Stopped before reading the status so the read cannot race a write
+            nb_man._heartbeat.beat = update_mock
+            while not update_mock.called:
+                self.assertLess(time.monotonic(), deadline)
+                time.sleep(0.01)
+            nb_man._heartbeat.stop()
+        self.assertGreater(self.status()['updated_at'], first)
+        nb_man.notebook_complete()
+        self.assertIsNone(nb_man._heartbeat)
+        self.assertEqual(self.status()['status'], 'completed')
+
+    def test_write_failure_ignored(self):
+        nb_man = NotebookExecutionManager(self.nb, output_path=self.output_path, progress_bar=False, status_heartbeat=0)
+        with patch.object(engines, 'write_status', side_effect=OSError('unreachable')):
+            nb_man.notebook_start()
+            nb_man.notebook_complete()
+
+    def test_execute_notebook(self):
+        execute_notebook(
+            get_notebook_path('simple_execute.ipynb'),
+            self.output_path,
+            {'msg': 'status'},
+            kernel_name=kernel_name,
+            progress_bar=False,
+            status_heartbeat=0,
+        )
+        status = self.status()
+        self.assertEqual((status['status'], status['exception']), ('completed', False))
+        self.assertLess(os.path.getsize(status_path(self.output_path)), 1024)
@@ -6,13 +6,16 @@ from unittest.mock import Mock, call
 import pytest
 from nbformat.v4 import new_code_cell, new_notebook
 
-from ..exceptions import PapermillParameterOverwriteWarning
+from ..exceptions import PapermillException, PapermillParameterOverwriteWarning
 from ..utils import (
     any_tagged_cell,
+    cell_timeout,
     chdir,
+    glob_regex,
     merge_kwargs,
     remove_args,
     retry,
+    split_glob,
 )
 
 
@@ -58,3 +61,38 @@ def test_chdir():
             assert Path.cwd().resolve() == Path(temp_dir).resolve()
 
     assert Path.cwd() == old_cwd
+
+
+def test_cell_timeout():
+    assert cell_timeout(new_code_cell('a = 2')) is None
+    assert cell_timeout(new_code_cell('a = 2', metadata={"timeout": 30})) == 30.0
+    assert cell_timeout(new_code_cell('a = 2', metadata={"tags": ["slow", "timeout=600"]})) == 600.0
+    with pytest.raises(PapermillException):
+        cell_timeout(new_code_cell('a = 2', metadata={"tags": ["timeout=soon"]}))
+
+
+def test_split_glob():
+    assert split_glob('s3://bucket/runs/*.ipynb') == ('s3://bucket/runs/', False)
+    assert split_glob('s3://bucket/run[12]/out.ipynb') == ('s3://bucket/run', True)
+    assert split_glob('runs/**') == ('runs/', True)
+    assert split_glob('runs/report.ipynb') == ('runs/report.ipynb', False)
+
+
+@pytest.mark.parametrize(
+    "pattern,path,expected",
+    [
+        ('runs/*.ipynb', 'runs/a.ipynb', True),
+        ('runs/*.ipynb', 'runs/a/b.ipynb', False),
+        ('runs/**/*.ipynb', 'runs/a.ipynb', True),
+        ('runs/**/*.ipynb', 'runs/a/b/c.ipynb', True),
+        ('runs/**/*.ipynb', 'other/runs/a.ipynb', False),
+        ('runs/**', 'runs/a/b.txt', True),
+        ('run?/a.ipynb', 'run1/a.ipynb', True),
+        ('run?/a.ipynb', 'run/a.ipynb', False),
+        ('run[!2]/a.ipynb', 'run1/a.ipynb', True),
+        ('run[!2]/a.ipynb', 'run2/a.ipynb', False),
+        ('a+b(1).ipynb', 'a+b(1).ipynb', True),
+    ],
+)
+def test_glob_regex(pattern, path, expected):
+    assert bool(glob_regex(pattern).match(path)) is expected
@@ -0,0 +1,185 @@
+import os
+import shutil
+import tempfile
+import threading
+import unittest
+from unittest.mock import patch
+
+from click.testing import CliRunner
+
+from .. import workqueue
+from ..cli import worker
+from ..exceptions import PapermillException
+from ..iorw import load_notebook_node
+from ..workqueue import COMPLETED, FAILED, QUEUED, RUNNING, SQLiteQueue, Worker, enqueue_notebook, papermill_queues
+from . import get_notebook_path, kernel_name
+
+
+class TestSQLiteQueue(unittest.TestCase):
+    def setUp(self):
+        self.test_dir = tempfile.mkdtemp()
+        self.path = os.path.join(self.test_dir, 'queue.db')
+        self.queue = SQLiteQueue(self.path)
+
+    def tearDown(self):
+        shutil.rmtree(self.test_dir)
+
+    def test_from_url(self):
+        queue = papermill_queues.get_queue(f'sqlite://{self.path}')
+        self.assertIsInstance(queue, SQLiteQueue)
+        self.assertEqual(queue.path, self.path)
+
+    def test_unknown_scheme(self):
+        with self.assertRaises(PapermillException):
+            papermill_queues.get_queue('redis://localhost/0')
+
+    def test_claim_in_order(self):
+        first = self.queue.put('a.ipynb', 'a_out.ipynb', {'x': 1}, {'kernel_name': 'python3'})
+        second = self.queue.put('b.ipynb', 'b_out.ipynb')
+
+        job = self.queue.claim('worker-1')
+        self.assertEqual((job.job_id, job.status, job.worker), (first, RUNNING, 'worker-1'))
+        self.assertEqual(job.parameters, {'x': 1})
+        self.assertEqual(job.execute_kwargs, {'kernel_name': 'python3'})
+        self.assertEqual(self.queue.claim('worker-2').job_id, second)
+        self.assertIsNone(self.queue.claim('worker-3'))
+
+    def test_complete(self):
+        ok = self.queue.put('a.ipynb', 'a_out.ipynb')
+        broken = self.queue.put('b.ipynb', 'b_out.ipynb')
+        self.queue.claim('worker')
+        self.queue.claim('worker')
+        self.queue.complete(ok)
+        self.queue.complete(broken, error='ValueError: boom')
+        self.assertEqual(self.queue.get(ok).status, COMPLETED)
+        self.assertEqual(self.queue.get(broken).error, 'ValueError: boom')
+        self.assertEqual(self.queue.counts(), {COMPLETED: 1, FAILED: 1})
+        self.assertIsNone(self.queue.get('missing'))
+
+    def test_concurrent_claims(self):
+        job_ids = {self.queue.put(f'{i}.ipynb', f'{i}_out.ipynb') for i in range(40)}
+        claimed = []
+
+        def claim_all(name):
+            queue = SQLiteQueue(self.path)
+            while True:
+                job = queue.claim(name)
+                if job is None:
+                    return
+                claimed.append(job.job_id)
+
+        threads = [threading.Thread(target=claim_all, args=(f'worker-{i}',)) for i in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(sorted(claimed), sorted(job_ids))
+
+    def test_failed_claim_rolled_back(self):
+        job_id = self.queue.put('a.ipynb', 'a_out.ipynb')
+        with self.queue._connect() as conn:
+            conn.execute("UPDATE jobs SET parameters = '{' WHERE job_id = ?", (job_id,))
+        with self.assertRaises(ValueError):
+            self.queue.claim('worker')
+        self.assertEqual(self.queue.counts(), {QUEUED: 1})
+        # The write lock was released
+        SQLiteQueue(self.path, timeout=0.1).put('b.ipynb', 'b_out.ipynb')
+
+    def test_requeue_stale(self):
+        job_id = self.queue.put('a.ipynb', 'a_out.ipynb')
+        self.queue.claim('worker')
+        self.assertEqual(self.queue.requeue_stale(3600), 0)
+        with patch('time.time', return_value=self.queue.get(job_id).started_at + 3601):
+            self.assertEqual(self.queue.requeue_stale(3600), 1)
+        self.assertEqual(self.queue.get(job_id).status, QUEUED)
+
+    def test_requeue(self):
+        job_id = self.queue.put('a.ipynb', 'a_out.ipynb')
+        self.queue.claim('worker')
+        self.queue.requeue(job_id)
+        job = self.queue.get(job_id)
+        self.assertEqual((job.status, job.started_at, job.worker), (QUEUED, None, None))
+        # Only running jobs are queued again
+        self.queue.claim('worker')
+        self.queue.complete(job_id)
+        self.queue.requeue(job_id)
+        self.assertEqual(self.queue.get(job_id).status, COMPLETED)
+
+    def test_enqueue_requires_json(self):
+        with self.assertRaises(PapermillException):
+            enqueue_notebook(self.queue, 'a.ipynb', 'a_out.ipynb', {'x': object()})
+
+
+class TestWorker(unittest.TestCase):
+    def setUp(self):
+        self.test_dir = tempfile.mkdtemp()
+        self.url = f"sqlite://{os.path.join(self.test_dir, 'queue.db')}"
+
+    def tearDown(self):
+        shutil.rmtree(self.test_dir)
+
+    def test_run(self):
+        output_path = os.path.join(self.test_dir, 'output.ipynb')
+        job_id = enqueue_notebook(
+            self.url, get_notebook_path('simple_execute.ipynb'), output_path, {'msg': 'queued'}, kernel_name=kernel_name
+        )
+        broken_id = enqueue_notebook(
+            self.url, get_notebook_path('broken1.ipynb'), os.path.join(self.test_dir, 'broken.ipynb')
+        )
+
+        stats = Worker(self.url, worker_id='test', poll_interval=0).run(idle_timeout=0)
+        self.assertEqual((stats.completed, stats.failed), (1, 1))
+        self.assertGreater(stats.throughput, 0)
+        self.assertGreaterEqual(stats.mean_latency, 0)
+
+        queue = papermill_queues.get_queue(self.url)
+        self.assertEqual(queue.get(job_id).status, COMPLETED)
+        self.assertEqual(queue.get(broken_id).status, FAILED)
+        self.assertIn('PapermillExecutionError', queue.get(broken_id).error)
+        self.assertEqual(load_notebook_node(output_path).metadata.papermill['parameters'], {'msg': 'queued'})
+
+    def test_job_kwargs_override_worker_defaults(self):
+        enqueue_notebook(self.url, 'in.ipynb', 'out.ipynb', kernel_name='other')
+        with patch.object(workqueue, 'execute_notebook') as execute_mock:
+            Worker(self.url, kernel_name='python3', log_output=True).run(max_jobs=1)
+        execute_mock.assert_called_once_with(
+            'in.ipynb', 'out.ipynb', {}, progress_bar=False, kernel_name='other', log_output=True
+        )
+
+    def test_interrupted_job_requeued(self):
+        job_id = enqueue_notebook(self.url, 'in.ipynb', 'out.ipynb')
+        with patch.object(workqueue, 'execute_notebook', side_effect=KeyboardInterrupt):
+            stats = Worker(self.url).run()
+        self.assertEqual((stats.completed, stats.failed), (0, 0))
+        job = papermill_queues.get_queue(self.url).get(job_id)
+        self.assertEqual((job.status, job.worker), (QUEUED, None))
+
+    def test_requeue_stale_at_startup(self):
+        queue = papermill_queues.get_queue(self.url)
+        job_id = enqueue_notebook(queue, 'in.ipynb', 'out.ipynb')
+        started_at = queue.claim('dead-worker').started_at
+        with patch.object(workqueue, 'execute_notebook'):
+            Worker(queue, poll_interval=0, requeue_stale=3600).run(idle_timeout=0)
+            self.assertEqual(queue.get(job_id).status, RUNNING)
+            with patch('time.time', return_value=started_at + 3601):
+                Worker(queue, worker_id='test', poll_interval=0, requeue_stale=3600).run(idle_timeout=0)
+        job = queue.get(job_id)
+        self.assertEqual((job.status, job.worker), (COMPLETED, 'test'))
+
+    def test_cli_requeue_stale(self):
+        queue = papermill_queues.get_queue(self.url)
+        enqueue_notebook(queue, 'in.ipynb', 'out.ipynb')
+        queue.claim('dead-worker')
+        with patch.object(workqueue, 'execute_notebook'):
+            result = CliRunner().invoke(
+                worker, [self.url, '--idle-timeout', '0', '--poll-interval', '0', '--requeue-stale', '0']
+            )
+        self.assertEqual(result.exit_code, 0)
+        self.assertEqual(queue.counts(), {COMPLETED: 1})
+
+    def test_cli(self):
+        enqueue_notebook(self.url, 'in.ipynb', 'out.ipynb')
+        with patch.object(workqueue, 'execute_notebook'):
+            result = CliRunner().invoke(worker, [self.url, '--idle-timeout', '0', '--poll-interval', '0'])
+        self.assertEqual(result.exit_code, 0)
+        self.assertEqual(papermill_queues.get_queue(self.url).counts(), {COMPLETED: 1})
@@ -1,13 +1,36 @@
 import logging
 import os
+import re
 import warnings
 from contextlib import contextmanager
 from functools import wraps
 
-from .exceptions import PapermillParameterOverwriteWarning
+import nbformat
+
+from .exceptions import PapermillException, PapermillExecutionError, PapermillParameterOverwriteWarning
 
 logger = logging.getLogger('papermill.utils')
 
+ERROR_MARKER_TAG = "papermill-error-cell-tag"
+
+# Cell metadata key and tag prefix overriding the execution timeout of a cell, e.g. the tag ``timeout=600``
+CELL_TIMEOUT_METADATA = "timeout"
+CELL_TIMEOUT_TAG_PREFIX = "timeout="
+
+GLOB_WILDCARDS = "*?["
+
+ERROR_STYLE = 'style="color:red; font-family:Helvetica Neue, Helvetica, Arial, sans-serif; font-size:2em;"'
+
+ERROR_MESSAGE_TEMPLATE = (
+    f"<span {ERROR_STYLE}>An Exception was encountered at '<a href=\"#papermill-error-cell\">In [%s]</a>'.</span>"
+)
+
+ERROR_ANCHOR_MSG = (
+    f'<span id="papermill-error-cell" {ERROR_STYLE}>'
+    'Execution using papermill encountered an exception here and stopped:'
+    '</span>'
+)
+
 
 def any_tagged_cell(nb, tag):
     """Whether the notebook contains at least one cell tagged ``tag``?
@@ -106,6 +129,126 @@ def find_first_tagged_cell_index(nb, tag):
     return parameters_indices[0]
 
 
+def cell_timeout(cell):
+    """Find the execution timeout of a cell, set in its metadata or by a ``timeout=<seconds>`` tag.
+
+    Parameters
+    ----------
+    cell : nbformat.NotebookNode
+        The cell to introspect
+
+    Returns
+    -------
+    float or None
+        The timeout in seconds, 0 or less for no timeout, or None if the cell
+        doesn't override the execution timeout
+
+    Raises
+    ------
+    PapermillException
+        If the timeout is not a number
+    """
+    timeout = cell.metadata.get(CELL_TIMEOUT_METADATA)
+    for tag in cell.metadata.get('tags', []):
+        if tag.startswith(CELL_TIMEOUT_TAG_PREFIX):
+            timeout = tag[len(CELL_TIMEOUT_TAG_PREFIX) :]
+    if timeout is None:
+        return None
+    try:
+        return float(timeout)
+    except (TypeError, ValueError):
+        raise PapermillException(f"Invalid timeout {timeout!r} for cell, expected a number of seconds") from None
+
+
+def find_cell_error(cell, cell_index):
+    """Build the execution error raised by a cell, if any.
+
+    Parameters
+    ----------
+    cell : nbformat.NotebookNode
+        The executed cell to introspect
+    cell_index : int
+        Index of the cell in the notebook
+
+    Returns
+    -------
+    PapermillExecutionError or None
+        The error of the first error output of the cell, ignoring successful
+        ``SystemExit`` calls, or a generic error if the cell was flagged as
+        raising a ``CellExecutionError`` without producing an error output
+    """
+    has_sys_exit = False
+    for output in cell.get("outputs", []):
+        if output.output_type == "error":
+            if output.ename == "SystemExit" and (output.evalue == "" or output.evalue == "0"):
+                has_sys_exit = True
+                continue
+            return PapermillExecutionError(
+                cell_index=cell_index,
+                exec_count=cell.execution_count,
+                source=cell.source,
+                ename=output.ename,
+                evalue=output.evalue,
+                traceback=output.traceback,
+            )
+
+    # handle the CellExecutionError exceptions raised that didn't produce a cell error output
+    if not has_sys_exit and cell.get("metadata", {}).get("papermill", {}).get("exception") is True:
+        return PapermillExecutionError(
+            cell_index=cell_index,
+            exec_count=cell.execution_count,
+            source=cell.source,
+            ename="CellExecutionError",
+            evalue="",
+            traceback=[],
+        )
+    return None
+
+
+def has_error_markers(nb):
+    """Whether error markers were inserted at the top of the notebook.
+
+    Parameters
+    ----------
+    nb : nbformat.NotebookNode
+        The notebook to introspect
+
+    Returns
+    -------
+    bool
+        Whether the first cell of the notebook is an error marker
+    """
+    return bool(nb.cells) and ERROR_MARKER_TAG in nb.cells[0].get("metadata", {}).get("tags", [])
+
+
+def add_error_markers(nb, error):
+    """Insert a message at the top of the notebook and an anchor before the failing cell.
+
+    Parameters
+    ----------
+    nb : nbformat.NotebookNode
+        The notebook to mark, modified in place
+    error : PapermillExecutionError
+        The error raised by the notebook
+
+    Returns
+    -------
+    nbformat.NotebookNode
+        The notebook with error markers
+    """
+    error_msg = ERROR_MESSAGE_TEMPLATE % str(error.exec_count)
+    error_msg_cell = nbformat.v4.new_markdown_cell(error_msg)
+    error_msg_cell.metadata['tags'] = [ERROR_MARKER_TAG]
+    error_anchor_cell = nbformat.v4.new_markdown_cell(ERROR_ANCHOR_MSG)
+    error_anchor_cell.metadata['tags'] = [ERROR_MARKER_TAG]
+
+    # put the anchor before the cell with the error, before all the indices change due to the
+    # heading-prepending
+    nb.cells.insert(error.cell_index, error_anchor_cell)
+    nb.cells.insert(0, error_msg_cell)
+    return nb
+
+
 def merge_kwargs(caller_args, **callee_args):
     """Merge named argument.
 
@@ -190,3 +333,66 @@ def chdir(path):
             yield
         finally:
             os.chdir(old_dir)
+
+
+def split_glob(pattern):
+    """Split a glob pattern into what a storage backend can list.
+
+    Parameters
+    ----------
+    pattern : str
+        Path pattern with ``*``, ``?`` and ``[...]`` wildcards matching within
+        a path segment, and ``**`` matching any number of segments
+
+    Returns
+    -------
+    tuple of (str, bool)
+        The literal prefix of the pattern before its first wildcard, and
+        whether matches can lie in subdirectories of the prefix's directory
+    """
+    wildcards = [index for index in map(pattern.find, GLOB_WILDCARDS) if index != -1]
+    prefix = pattern[: min(wildcards)] if wildcards else pattern
+    rest = pattern[len(prefix) :]
+    return prefix, '/' in rest or '**' in rest
+
+
+def glob_regex(pattern):
+    """Compile the regular expression matching the paths selected by a glob pattern.
+
+    Parameters
+    ----------
+    pattern : str
+        Path pattern, as accepted by `split_glob`
+
+    Returns
+    -------
+    re.Pattern
+    """
+    parts = []
+    index = 0
+    while index < len(pattern):
+        char = pattern[index]
+        if pattern.startswith('**/', index):
+            parts.append('(?:.*/)?')
+            index += 3
+            continue
+        if pattern.startswith('**', index):
+            parts.append('.*')
+            index += 2
+            continue
+        if char == '*':
+            parts.append('[^/]*')
+        elif char == '?':
+            parts.append('[^/]')
+        elif char == '[' and pattern.find(']', index + 2) != -1:
+            end = pattern.find(']', index + 2)
+            chars = pattern[index + 1 : end].replace('\\', '\\\\')
+            if chars.startswith('!'):
+                chars = '^' + chars[1:]
+            parts.append(f'[{chars}]')
+            index = end + 1
+            continue
+        else:
+            parts.append(re.escape(char))
+        index += 1
+    return re.compile(''.join(parts) + r'\Z', re.DOTALL)
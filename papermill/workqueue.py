@@ -0,0 +1,417 @@
+"""Queue notebook executions for workers running on other machines."""
+
+import json
+import os
+import socket
+import sqlite3
+import time
+import uuid
+from collections import namedtuple
+from urllib.parse import urlparse
+
+import entrypoints
+
+from .exceptions import PapermillException
+from .execute import execute_notebook
+from .log import logger
+
+QUEUED = 'queued'
+RUNNING = 'running'
+COMPLETED = 'completed'
+FAILED = 'failed'
+
+Job = namedtuple(
+    'Job',
+    [
+        'job_id',
+        'input_path',
+        'output_path',
+        'parameters',
+        'execute_kwargs',
+        'status',
+        'enqueued_at',
+        'started_at',
+        'finished_at',
+        'worker',
+        'error',
+    ],
+)
+
+
+class PapermillQueues:
+    '''
+    The holder which houses any queue registered with the system.
+    This object is used in a singleton manner to save and load particular
+    named Queue classes for reference externally.
+    '''
+
+    def __init__(self):
+        self._queues = {}
+
+    def register(self, scheme, queue):
+        """Register a queue class for the URLs of a scheme"""
+        self._queues[scheme] = queue
+
+    def register_entry_points(self):
+        """Register entrypoints for a queue
+
+        Load queues provided by other packages
+        """
+        for entrypoint in entrypoints.get_group_all("papermill.queue"):
+            self.register(entrypoint.name, entrypoint.load())
+
+    def get_queue(self, url):
+        """Open the queue at `url`, e.g. ``sqlite:///shared/papermill.db``."""
+        scheme = urlparse(url).scheme
+        queue = self._queues.get(scheme)
+        if queue is None:
+            raise PapermillException(f"No queue registered for '{scheme}' URLs: {url}")
+        return queue.from_url(url)
+
+
+class Queue:
+    """Base class for job queues.
+
+    Implementations store jobs so that any number of workers can claim them
+    concurrently, each job being claimed by a single worker, and register
+    their class for a URL scheme with the ``papermill.queue`` entry point.
+    """
+
+    @classmethod
+    def from_url(cls, url):
+        raise NotImplementedError('from_url not implemented for {}'.format(cls))
+
+    def put(self, input_path, output_path, parameters=None, execute_kwargs=None):
+        """Enqueue a notebook execution and return the id of the job."""
+        raise NotImplementedError('put not implemented for {}'.format(type(self)))
+
+    def claim(self, worker):
+        """Mark the oldest queued job as running for `worker` and return it, or None if there is none."""
+        raise NotImplementedError('claim not implemented for {}'.format(type(self)))
+
+    def complete(self, job_id, error=None):
+        """Mark a running job as completed, or failed if an error message is given."""
+        raise NotImplementedError('complete not implemented for {}'.format(type(self)))
+
+    def requeue(self, job_id):
+        """Queue a running job again, e.g. when its worker was interrupted."""
+        raise NotImplementedError('requeue not implemented for {}'.format(type(self)))
+
+    def requeue_stale(self, max_age):
+        """Queue again the jobs running for more than `max_age` seconds and return their number."""
+        raise NotImplementedError('requeue_stale not implemented for {}'.format(type(self)))
+
+    def get(self, job_id):
+        """Return the job with id `job_id`, or None if it doesn't exist."""
+        raise NotImplementedError('get not implemented for {}'.format(type(self)))
+
+    def counts(self):
+        """Return the number of jobs by status."""
+        raise NotImplementedError('counts not implemented for {}'.format(type(self)))
+
+
+class SQLiteQueue(Queue):
+    """Queue stored in a SQLite database.
+
+    Suitable for workers sharing a disk, as long as the file system supports
+    the file locks SQLite relies on (local disks and most cluster file
+    systems, but not every NFS setup).
+
+    Parameters
+    ----------
+    path : str
+        Path of the database, created if missing
+    timeout : float, optional
+        Seconds to wait for the database lock held by another worker
+    """
+
+    COLUMNS = ', '.join(Job._fields)
+
+    def __init__(self, path, timeout=30.0):
+        self.path = path
+        self.timeout = timeout
+        with self._connect() as conn:
+            conn.execute(
+                'CREATE TABLE IF NOT EXISTS jobs ('
+                'job_id TEXT PRIMARY KEY, input_path TEXT, output_path TEXT, parameters TEXT, execute_kwargs TEXT, '
+                'status TEXT, enqueued_at REAL, started_at REAL, finished_at REAL, worker TEXT, error TEXT)'
+            )
+            conn.execute('CREATE INDEX IF NOT EXISTS jobs_status ON jobs (status, enqueued_at)')
+
+    @classmethod
+    def from_url(cls, url):
+        parsed = urlparse(url)
+        return cls(parsed.netloc + parsed.path)
+
+    def __repr__(self):
+        return f"SQLiteQueue({self.path!r})"
+
+    def _connect(self):
+        # Autocommit mode, transactions are opened explicitly where needed
+        return _closing(sqlite3.connect(self.path, timeout=self.timeout, isolation_level=None))
+
+    def _job(self, row):
+        values = dict(zip(Job._fields, row))
+        values['parameters'] = json.loads(values['parameters'])
+        values['execute_kwargs'] = json.loads(values['execute_kwargs'])
+        return Job(**values)
+
+    def put(self, input_path, output_path, parameters=None, execute_kwargs=None):
+        job_id = uuid.uuid4().hex
+        with self._connect() as conn:
+            conn.execute(
+                'INSERT INTO jobs (job_id, input_path, output_path, parameters, execute_kwargs, status, enqueued_at) '
+                'VALUES (?, ?, ?, ?, ?, ?, ?)',
+                (
+                    job_id,
+                    input_path,
+                    output_path,
+                    json.dumps(parameters or {}),
+                    json.dumps(execute_kwargs or {}),
+                    QUEUED,
+                    time.time(),
+                ),
+            )
+        return job_id
+
+    def claim(self, worker):
+        # The connection's own context manager commits the claim, or rolls it back on any error
+        with self._connect() as conn, conn:
+            # Take the write lock before reading so two workers never claim the same job
+            conn.execute('BEGIN IMMEDIATE')
+            row = conn.execute(
+                f'SELECT {self.COLUMNS} FROM jobs WHERE status = ? ORDER BY enqueued_at, rowid LIMIT 1', (QUEUED,)
+            ).fetchone()
+            if row is None:
+                return None
+            started_at = time.time()
+            conn.execute(
+                'UPDATE jobs SET status = ?, started_at = ?, worker = ? WHERE job_id = ?',
+                (RUNNING, started_at, worker, row[0]),
+            )
+            return self._job(row)._replace(status=RUNNING, started_at=started_at, worker=worker)
+
+    def complete(self, job_id, error=None):
+        with self._connect() as conn:
+            conn.execute(
+                'UPDATE jobs SET status = ?, finished_at = ?, error = ? WHERE job_id = ?',
+                (FAILED if error else COMPLETED, time.time(), error, job_id),
+            )
+
+    def requeue(self, job_id):
+        with self._connect() as conn:
+            conn.execute(
+                'UPDATE jobs SET status = ?, started_at = NULL, worker = NULL WHERE job_id = ? AND status = ?',
+                (QUEUED, job_id, RUNNING),
+            )
+
+    def get(self, job_id):
+        with self._connect() as conn:
+            row = conn.execute(f'SELECT {self.COLUMNS} FROM jobs WHERE job_id = ?', (job_id,)).fetchone()
+        return self._job(row) if row else None
+
+    def counts(self):
+        with self._connect() as conn:
+            return dict(conn.execute('SELECT status, COUNT(*) FROM jobs GROUP BY status').fetchall())
+
+    def requeue_stale(self, max_age):
+        """Queue again the jobs running for more than `max_age` seconds, e.g. after a worker died.
+
+        Returns
+        -------
+        int
+            Number of jobs queued again
+        """
+        with self._connect() as conn:
+            cursor = conn.execute(
+                'UPDATE jobs SET status = ?, started_at = NULL, worker = NULL WHERE status = ? AND started_at < ?',
+                (QUEUED, RUNNING, time.time() - max_age),
+            )
+            return cursor.rowcount
+
+
+class _closing:
+    """Close a sqlite3 connection on exit, which its own context manager doesn't do."""
+
+    def __init__(self, conn):
+        self.conn = conn
+
+    def __enter__(self):
+        return self.conn
+
+    def __exit__(self, *exc_info):
+        self.conn.close()
+
+
+def enqueue_notebook(queue, input_path, output_path, parameters=None, **execute_kwargs):
+    """Enqueue a notebook execution for a worker.
+
+    Parameters
+    ----------
+    queue : Queue or str
+        The queue, or its URL
+    input_path : str
+        Path to the input notebook, readable by the workers
+    output_path : str
+        Path to save the executed notebook, writable by the workers
+    parameters : dict, optional
+        Arbitrary keyword arguments to pass to the notebook parameters
+    **execute_kwargs
+        Keyword arguments passed to `execute_notebook` by the worker
+
+    Returns
+    -------
+    str
+        Id of the job
+    """
+    if isinstance(queue, str):
+        queue = papermill_queues.get_queue(queue)
+    try:
+        json.dumps([parameters, execute_kwargs])
+    except TypeError as e:
+        raise PapermillException(f"Queued parameters and execute arguments must be JSON serializable: {e}")
+    return queue.put(input_path, output_path, parameters, execute_kwargs)
+
+
+class WorkerStats:
+    """Throughput and latency of the jobs processed by a worker.
+
+    Attributes
+    ----------
+    completed : int
+        Number of jobs which completed
+    failed : int
+        Number of jobs which failed
+    latencies : list of float
+        Seconds each job waited in the queue before a worker claimed it
+    durations : list of float
+        Seconds each job took to execute
+    """
+
+    def __init__(self):
+        self.start = time.monotonic()
+        self.completed = 0
+        self.failed = 0
+        self.latencies = []
+        self.durations = []
+
+    def add(self, job, duration, failed=False):
+        self.latencies.append(job.started_at - job.enqueued_at)
+        self.durations.append(duration)
+        if failed:
+            self.failed += 1
+        else:
+            self.completed += 1
+
+    @property
+    def elapsed(self):
+        return time.monotonic() - self.start
+
+    @property
+    def throughput(self):
+        """Jobs processed per minute since the worker started."""
+        return 60.0 * len(self.durations) / self.elapsed if self.elapsed else 0.0
+
+    @property
+    def mean_latency(self):
+        return sum(self.latencies) / len(self.latencies) if self.latencies else 0.0
+
+    @property
+    def mean_duration(self):
+        return sum(self.durations) / len(self.durations) if self.durations else 0.0
+
+    def format(self):
+        """Render the statistics as text."""
+        return (
+            f"{self.completed} jobs completed, {self.failed} failed in {self.elapsed:.1f}s "
+            f"({self.throughput:.2f} jobs/min, mean queue latency {self.mean_latency:.2f}s, "
+            f"mean duration {self.mean_duration:.2f}s)"
+        )
+
+
+class Worker:
+    """Executes the jobs of a queue one at a time.
+
+    Parameters
+    ----------
+    queue : Queue or str
+        The queue, or its URL
+    worker_id : str, optional
+        Name of the worker recorded on its jobs (default: host name and process id)
+    poll_interval : float, optional
+        Seconds to wait before polling an empty queue again
+    requeue_stale : float, optional
+        Queue again, at startup, the jobs running for more than this many
+        seconds, assuming the worker which claimed them died
+    **execute_kwargs
+        Default keyword arguments of `execute_notebook`, overridden by the job's
+    """
+
+    def __init__(self, queue, worker_id=None, poll_interval=1.0, requeue_stale=None, **execute_kwargs):
+        if isinstance(queue, str):
+            queue = papermill_queues.get_queue(queue)
+        self.queue = queue
+        self.worker_id = worker_id or f"{socket.gethostname()}-{os.getpid()}"
+        self.poll_interval = poll_interval
+        self.requeue_stale = requeue_stale
+        self.execute_kwargs = {'progress_bar': False, **execute_kwargs}
+        self.stats = WorkerStats()
+
+    def run_job(self, job):
+        """Execute a claimed job and publish its status to the queue."""
+        logger.info(f"Worker {self.worker_id} running job {job.job_id}: {job.input_path} -> {job.output_path}")
+        start = time.monotonic()
+        error = None
+        try:
+            execute_notebook(
+                job.input_path, job.output_path, job.parameters, **{**self.execute_kwargs, **job.execute_kwargs}
+            )
+        except KeyboardInterrupt:
+            # Hand the job back rather than leaving it running forever
+            self.queue.requeue(job.job_id)
+            logger.warning(f"Job {job.job_id} interrupted and queued again")
+            raise
+        except Exception as e:
+            error = f"{type(e).__name__}: {e}"
+            logger.error(f"Job {job.job_id} failed: {error}")
+        self.queue.complete(job.job_id, error=error)
+        self.stats.add(job, time.monotonic() - start, failed=error is not None)
+
+    def run(self, max_jobs=None, idle_timeout=None):
+        """Process jobs until `max_jobs` were run or the queue stayed empty for `idle_timeout` seconds.
+
+        Without limits the worker runs until interrupted.
+
+        Returns
+        -------
+        WorkerStats
+            Statistics of the jobs processed
+        """
+        if self.requeue_stale is not None:
+            requeued = self.queue.requeue_stale(self.requeue_stale)
+            if requeued:
+                logger.warning(f"Worker {self.worker_id} queued again {requeued} stale jobs")
+        idle_since = time.monotonic()
+        processed = 0
+        try:
+            while max_jobs is None or processed < max_jobs:
+                job = self.queue.claim(self.worker_id)
+                if job is None:
+                    if idle_timeout is not None and time.monotonic() - idle_since >= idle_timeout:
+                        break
+                    time.sleep(self.poll_interval)
+                    continue
+                self.run_job(job)
+                processed += 1
+                logger.info(self.stats.format())
+                idle_since = time.monotonic()
+        except KeyboardInterrupt:
+            logger.warning(f"Worker {self.worker_id} interrupted")
+        logger.info(f"Worker {self.worker_id} stopped: {self.stats.format()}")
+        return self.stats
+
+
+# Instantiate a PapermillQueues instance, register queues and entrypoints
+papermill_queues = PapermillQueues()
+papermill_queues.register('sqlite', SQLiteQueue)
+papermill_queues.register_entry_points()